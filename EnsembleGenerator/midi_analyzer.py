@@ -1,5 +1,18 @@
 import pretty_midi
 import math
+import numpy as np
+try:
+    from .note_array import note_array, instrument_notes, track_notes, sorted_notes
+except ImportError:
+    from note_array import note_array, instrument_notes, track_notes, sorted_notes
+
+SUB_BEAT_TOLERANCE = 0.05
+DOTTED_TARGETS = (0.75, 1.5, 3.0)
+
+# Style features: inter-onset interval bins (upper edges in beats) and sub-beat names
+IOI_BIN_EDGES = (0.3125, 0.4167, 0.625, 0.875, 1.5)
+IOI_BIN_NAMES = ('16th', '8th_triplet', '8th', 'dotted_8th', 'quarter', 'long')
+SUB_BEAT_NAMES = (('1', '1'), ('e', 'e'), ('&', 'and'), ('a', 'a'), ('off', 'off'))
 
 class NoteAnalysis:
     def __init__(self, note, is_on_beat, sub_beat_type, is_syncopated, is_mute, is_dotted, harmonic_pitch):
@@ -11,11 +24,108 @@ class NoteAnalysis:
         self.is_dotted = is_dotted         # True if dotted duration
         self.harmonic_pitch = harmonic_pitch 
 
+class BeatIndex:
+    """
+    Sorted beat/downbeat arrays with vectorized lookups.
+    Locates all notes of a track in one searchsorted pass instead of
+    walking the beat list from index 0 for every note.
+    """
+    def __init__(self, beats, downbeats=None):
+        self.beats = np.asarray(beats, dtype=float)
+        self.downbeats = np.asarray(downbeats if downbeats is not None else [], dtype=float)
+
+    def locate(self, starts, ends):
+        """
+        starts/ends: arrays of note times in seconds.
+        Returns dict of arrays:
+          beat_idx, beat_dur, fraction, duration_beats,
+          valid (note lies before the last beat and has a usable beat length),
+          sub_beat ('1', 'e', '&', 'a', 'off'), is_dotted, is_syncopated
+        """
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        n_beats = len(self.beats)
+
+        # Last beat with beats[idx] <= start + 1ms (same tolerance as the old linear scan)
+        idx = np.searchsorted(self.beats, starts + 0.001, side='right') - 1
+        idx = np.clip(idx, 0, max(n_beats - 1, 0))
+        has_next = idx < n_beats - 1
+
+        beat_dur = np.full(len(starts), 0.5)
+        if n_beats > 1:
+            next_idx = np.minimum(idx + 1, n_beats - 1)
+            beat_dur = np.where(has_next, self.beats[next_idx] - self.beats[idx], 0.5)
+        positive = beat_dur > 0
+        valid = has_next & positive
+
+        fraction = np.zeros(len(starts))
+        if n_beats:
+            np.divide(starts - self.beats[idx], beat_dur, out=fraction, where=valid)
+
+        duration_beats = np.zeros(len(starts))
+        np.divide(ends - starts, beat_dur, out=duration_beats, where=positive)
+
+        return {
+            'beat_idx': idx,
+            'beat_dur': beat_dur,
+            'fraction': fraction,
+            'duration_beats': duration_beats,
+            'valid': valid,
+            'sub_beat': self.sub_beat_types(fraction),
+            'is_dotted': self.dotted_flags(duration_beats),
+            'is_syncopated': self.bar_crossings(starts, ends),
+        }
+
+    @staticmethod
+    def sub_beat_types(fractions, tol=SUB_BEAT_TOLERANCE):
+        f = fractions - np.trunc(fractions)
+        conditions = [
+            (f < tol) | (f > 1.0 - tol),
+            np.abs(f - 0.25) < tol,
+            np.abs(f - 0.50) < tol,
+            np.abs(f - 0.75) < tol,
+        ]
+        return np.select(conditions, ['1', 'e', '&', 'a'], default='off')
+
+    @staticmethod
+    def dotted_flags(duration_beats, tolerance=0.1):
+        flags = np.zeros(len(duration_beats), dtype=bool)
+        for t in DOTTED_TARGETS:
+            flags |= np.abs(duration_beats - t) < tolerance
+        return flags
+
+    def bar_crossings(self, starts, ends):
+        # Only the first downbeat after the onset can be crossed by more than 10ms
+        n_down = len(self.downbeats)
+        if n_down == 0:
+            return np.zeros(len(starts), dtype=bool)
+        first_after = np.searchsorted(self.downbeats, starts, side='right')
+        in_range = first_after < n_down
+        db = self.downbeats[np.minimum(first_after, n_down - 1)]
+        return in_range & (ends > db + 0.01)
+
 class MidiAnalyzer:
     def __init__(self, midi_data):
         self.midi_data = midi_data
         self.beats = midi_data.get_beats()
         self.downbeats = midi_data.get_downbeats()
+        self.beat_index = BeatIndex(self.beats, self.downbeats)
+        self._groove_cache = {} # id(instrument) -> groove string
+        self._notes = None
+
+    @property
+    def notes(self):
+        """All notes of the file as a NOTE_DTYPE array (built once, shared by callers)."""
+        if self._notes is None:
+            self._notes = note_array(self.midi_data)
+        return self._notes
+
+    def track_array(self, instrument):
+        """NOTE_DTYPE notes of instrument (a slice of self.notes for the file's own tracks)."""
+        for track, inst in enumerate(self.midi_data.instruments):
+            if inst is instrument:
+                return track_notes(self.notes, track)
+        return instrument_notes(instrument)
 
     def get_sub_beat_type(self, fraction):
         """
@@ -32,33 +142,21 @@ class MidiAnalyzer:
         return 'off'
 
     def detect_groove(self, instrument):
-        # ... (Previous Logic, kept simple) ...
-        # Re-using the sub-beat logic here could be better but let's keep the existing structure if it works,
-        # or simplify using the new fractions.
-        # Let's keep the previous implementation logic but refined? 
-        # Actually I'll copy the previous detect_groove but use get_sub_beat_type logic implicitly.
-        onset_fractions = []
-        for note in instrument.notes:
-            # Simple linear search for beat
-            idx = 0
-            while idx < len(self.beats) - 1 and self.beats[idx+1] <= note.start + 0.001:
-                idx += 1
-            if idx < len(self.beats) - 1:
-                beat_start = self.beats[idx]
-                beat_duration = self.beats[idx+1] - beat_start
-                if beat_duration > 0:
-                    fraction = (note.start - beat_start) / beat_duration
-                    onset_fractions.append(fraction)
-        
-        if not onset_fractions: return '8-beat'
-        
-        score_16 = 0
-        for frac in onset_fractions:
-            sb = self.get_sub_beat_type(frac)
-            if sb in ['e', 'a']:
-                score_16 += 1
+        key = id(instrument)
+        if key not in self._groove_cache:
+            starts = np.array([n.start for n in instrument.notes], dtype=float)
+            ends = np.array([n.end for n in instrument.notes], dtype=float)
+            located = self.beat_index.locate(starts, ends)
+            self._groove_cache[key] = self._groove_from_located(located)
+        return self._groove_cache[key]
+
+    def _groove_from_located(self, located):
+        # Share of onsets on the 'e'/'a' 16th positions, among notes inside the beat grid
+        sub_beats = located['sub_beat'][located['valid']]
+        if len(sub_beats) == 0: return '8-beat'
         
-        ratio = score_16 / len(onset_fractions)
+        score_16 = np.count_nonzero((sub_beats == 'e') | (sub_beats == 'a'))
+        ratio = score_16 / len(sub_beats)
         return '16-beat' if ratio > 0.15 else '8-beat'
 
     def is_bar_crossing(self, start, end):
@@ -87,43 +185,36 @@ class MidiAnalyzer:
         # Store last 3 harmonic pitches to detect stable range
         pitch_window = [] 
         
-        print(f"Detected Groove: {self.detect_groove(instrument)}")
+        # Beat position of every note in one vectorized pass
+        notes = instrument.notes
+        track = self.track_array(instrument)
+        starts, ends = track['start'], track['end']
+        located = self.beat_index.locate(starts, ends)
         
-        for note in instrument.notes:
-            start = note.start
-            end = note.end
-            duration_sec = end - start
-            
-            # Beat Calc
-            idx = 0
-            while idx < len(self.beats) - 1 and self.beats[idx+1] <= start + 0.001:
-                idx += 1
-            
-            beat_dur = 0.5
-            fraction = 0.0
-            if idx < len(self.beats) - 1:
-                beat_dur = self.beats[idx+1] - self.beats[idx]
-                if beat_dur > 0:
-                    fraction = (start - self.beats[idx]) / beat_dur
-            
-            duration_beats = duration_sec / beat_dur if beat_dur > 0 else 0
+        groove = self._groove_from_located(located)
+        self._groove_cache[id(instrument)] = groove
+        print(f"Detected Groove: {groove}")
+        
+        for i, note in enumerate(notes):
+            duration_sec = ends[i] - starts[i]
+            duration_beats = located['duration_beats'][i]
             
             # 1. Sub-beat
-            sub_beat = self.get_sub_beat_type(fraction)
+            sub_beat = str(located['sub_beat'][i])
             on_beat = (sub_beat == '1')
             
             # 2. Syncopation
-            syncopated = self.is_bar_crossing(start, end)
+            syncopated = bool(located['is_syncopated'][i])
             
             # 3. Mute (Dynamic)
             # - Short time (< 0.02s) OR
             # - Short beat (< 0.25 beat) AND Low Velocity (< 60% of avg)
             is_mute_time = duration_sec < 0.02
             is_mute_vel = (duration_beats < 0.25) and (note.velocity < avg_velocity * 0.6)
-            is_mute = is_mute_time or is_mute_vel
+            is_mute = bool(is_mute_time or is_mute_vel)
             
             # 4. Dotted
-            is_dotted = self.is_dotted_note(duration_beats)
+            is_dotted = bool(located['is_dotted'][i])
             
             # 5. Harmonic Pitch (Windowed)
             current_pitch = note.pitch
@@ -167,6 +258,79 @@ class MidiAnalyzer:
             
         return analysis_list
 
+    def primary_track(self):
+        """First non-drum instrument (first instrument if all are drums), or None."""
+        for inst in self.midi_data.instruments:
+            if not inst.is_drum:
+                return inst
+        return self.midi_data.instruments[0] if self.midi_data.instruments else None
+
+    def extract_style_features(self, instrument=None):
+        """
+        Numeric style descriptors of a track (default: primary_track) for LearningManager.
+        One vectorized pass over the notes; returns {} for an empty track.
+          poly_ratio, avg_duration (sec), avg_interval (semitones), is_octave, is_walking
+          onset_density_<1|e|and|a|off> (onsets per beat), pitch_hist_<0..11>,
+          ioi_<bin> (share of inter-onset intervals), vel_mean/vel_std/vel_range (0-1),
+          syncopation_ratio (bar-crossing notes), offbeat_ratio (onsets off the beat)
+        """
+        if instrument is None:
+            instrument = self.primary_track()
+        if instrument is None or not instrument.notes:
+            return {}
+            
+        data = sorted_notes(self.track_array(instrument), 'start', 'pitch')
+        starts, ends = data['start'], data['end']
+        pitches, velocities = data['pitch'].astype(float), data['velocity'].astype(float)
+        n = len(starts)
+        located = self.beat_index.locate(starts, ends)
+        
+        # Polyphony: a note starting before an earlier note ends (10ms slack) makes both polyphonic
+        running_end = np.maximum.accumulate(ends)
+        overlaps_prev = np.zeros(n, dtype=bool)
+        overlaps_prev[1:] = starts[1:] < running_end[:-1] - 0.01
+        poly = overlaps_prev.copy()
+        poly[:-1] |= overlaps_prev[1:]
+        
+        intervals = np.abs(np.diff(pitches))
+        octave_share = np.mean(intervals == 12) if len(intervals) else 0.0
+        step_share = np.mean((intervals >= 1) & (intervals <= 2)) if len(intervals) else 0.0
+        poly_ratio = float(np.mean(poly))
+        
+        features = {
+            'poly_ratio': poly_ratio,
+            'avg_duration': float(np.mean(ends - starts)),
+            'avg_interval': float(np.mean(intervals)) if len(intervals) else 0.0,
+            'is_octave': float(octave_share >= 0.25),
+            'is_walking': float(step_share >= 0.5 and poly_ratio < 0.1),
+        }
+        
+        # Onsets per beat for each 16th position
+        n_beats = max(1, len(self.beat_index.beats))
+        sub_beats = located['sub_beat']
+        for label, name in SUB_BEAT_NAMES:
+            features[f'onset_density_{name}'] = np.count_nonzero(sub_beats == label) / n_beats
+            
+        pitch_hist = np.bincount(pitches.astype(int) % 12, minlength=12) / n
+        for pc in range(12):
+            features[f'pitch_hist_{pc}'] = float(pitch_hist[pc])
+            
+        # Inter-onset intervals in beats (chord tones share one onset)
+        positions = np.unique(np.round(located['beat_idx'] + located['fraction'], 3))
+        iois = np.diff(positions)
+        ioi_counts = np.bincount(np.searchsorted(IOI_BIN_EDGES, iois, side='right'), minlength=len(IOI_BIN_NAMES))
+        for name, count in zip(IOI_BIN_NAMES, ioi_counts):
+            features[f'ioi_{name}'] = count / len(iois) if len(iois) else 0.0
+            
+        features['vel_mean'] = float(np.mean(velocities)) / 127.0
+        features['vel_std'] = float(np.std(velocities)) / 127.0
+        features['vel_range'] = float(np.ptp(velocities)) / 127.0
+        features['syncopation_ratio'] = float(np.mean(located['is_syncopated']))
+        valid = located['valid']
+        features['offbeat_ratio'] = float(np.mean(sub_beats[valid] != '1')) if valid.any() else 0.0
+        
+        return {k: round(float(v), 4) for k, v in features.items()}
+
     def analyze(self):
         """
         Main entry point for analysis. 
@@ -4,7 +4,8 @@ import os
 import random
 import random
 import sys
-import pandas as pd # New for Excel export
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 # Import components
 # Using relative imports if running as package, or absolute for script compat
@@ -14,11 +15,11 @@ if __package__ is None or __package__ == '':
     from constants import NOTE_NAMES, get_note_name
     from constants import MAJOR_SCALE, MINOR_SCALE, HARMONIC_MINOR_SCALE, MELODIC_MINOR_SCALE # Import scale constants
     from constants import MAJOR_7TH_QUALITIES, MINOR_7TH_QUALITIES, HARMONIC_MINOR_7TH_QUALITIES, MELODIC_MINOR_7TH_QUALITIES
-    from utils import detect_key, get_tempo_at_time
+    from utils import detect_key, get_tempo_at_time, get_tempo_map
     from registries import CHORD_REGISTRY, STYLE_REGISTRY
     import chord_strategies # Triggers registration
     import style_strategies # Triggers registration
-    from style_strategies import load_style_catalog, ExternalStyleStrategy
+    from style_strategies import load_style_catalog, compile_style_program, get_rename_src, ExternalStyleStrategy
     from midi_analyzer import MidiAnalyzer
     from expansion_strategies import DiatonicTriadStrategy, Diatonic7thStrategy, \
     HarmonicMinorStrategy, MelodicMinorStrategy, \
@@ -27,11 +28,11 @@ if __package__ is None or __package__ == '':
 else:
     from .constants import NOTE_NAMES, get_note_name, MAJOR_SCALE, MINOR_SCALE, HARMONIC_MINOR_SCALE, MELODIC_MINOR_SCALE
     from .constants import MAJOR_7TH_QUALITIES, MINOR_7TH_QUALITIES, HARMONIC_MINOR_7TH_QUALITIES, MELODIC_MINOR_7TH_QUALITIES
-    from .utils import detect_key, get_tempo_at_time
+    from .utils import detect_key, get_tempo_at_time, get_tempo_map
     from .registries import CHORD_REGISTRY, STYLE_REGISTRY
     from . import chord_strategies
     from . import style_strategies
-    from .style_strategies import load_style_catalog, ExternalStyleStrategy
+    from .style_strategies import load_style_catalog, compile_style_program, get_rename_src, ExternalStyleStrategy
     from .midi_analyzer import MidiAnalyzer
     from .expansion_strategies import DiatonicTriadStrategy, Diatonic7thStrategy, \
     HarmonicMinorStrategy, MelodicMinorStrategy, \
@@ -49,19 +50,30 @@ PRESETS = {
 }
 
 def register_external_styles(registry):
+    """
+    Binds the registry to ensemble_styles.xlsx.
+    Nothing is read here: the catalog loads on the first registry lookup, and
+    each style is compiled only when it is actually requested.
+    """
+    registry.clear() # Fix for caching issue
+    registry.set_loader(_load_external_styles)
+
+def _build_style_factory(voices_data):
+    # Compile once; the factory only wraps the shared StyleProgram
+    program = compile_style_program(voices_data)
+    return lambda p=program: ExternalStyleStrategy(p)
+
+def _load_external_styles(registry):
     script_dir = os.path.dirname(os.path.abspath(__file__))
     excel_path = os.path.join(script_dir, "ensemble_styles.xlsx")
-    print("Clearing Registry and reloading...")
-    registry.clear() # Fix for caching issue
     external_styles = load_style_catalog(excel_path)
     
     for name, voices_data in external_styles.items():
-        # Store as lambda to act as a factory
         # We need default argument to capture value in closure
-        registry[name] = lambda d=voices_data: ExternalStyleStrategy(d)
-        print(f"Registered External Style: {name}")
+        registry.register_lazy(name, lambda d=voices_data: _build_style_factory(d), rename_src=get_rename_src(voices_data))
+    print(f"Registered {len(external_styles)} External Styles from {os.path.basename(excel_path)}")
 
-# Initialize Registry
+# Initialize Registry (lazy)
 register_external_styles(STYLE_REGISTRY)
 
 class EnsembleGenerator:
@@ -195,13 +207,19 @@ class EnsembleGenerator:
         merged.append(current)
         return merged
 
-    def generate(self, input_path, velocity_scale=0.9, key_arg=None, chord_filter=None, style_filter=None, preset_name=None, output_subdir=None, expansion_flags=None, strict_validation=False, allowed_types=None, timing_jitter=0.01, stop_event=None):
+    def generate(self, input_path, velocity_scale=0.9, key_arg=None, chord_filter=None, style_filter=None, preset_name=None, output_subdir=None, expansion_flags=None, strict_validation=False, allowed_types=None, timing_jitter=0.01, stop_event=None, export_report=True):
+        # export_report=False leaves the _Import_Source rows in self.last_metadata
+        # so generate_batch can merge them into a single report.
+        metadata_list = [] # For Auto-Registration Report
+        self.last_metadata = metadata_list
+
         midi_data = self.load_midi(input_path)
         if not midi_data: return []
+        # Built once here; strategies reuse it through get_tempo_map(midi_data)
+        tempo_map = get_tempo_map(midi_data)
         
         original_name = os.path.splitext(os.path.basename(input_path))[0]
         generated_files = []
-        metadata_list = [] # For Auto-Registration Report
         
         # --- Resolve Filters ---
         target_combinations = [] 
@@ -249,8 +267,8 @@ class EnsembleGenerator:
         else:
             print(f"Using Key: {get_note_name(key_info[0])} {key_info[1]}")
 
-        if not hasattr(self, 'analyzer'):
-             self.analyzer = MidiAnalyzer(midi_data)
+        # Always rebuild: a cached analyzer would keep the beats of the first input file
+        self.analyzer = MidiAnalyzer(midi_data)
         
         analysis = self.analyzer.analyze()
         
@@ -545,10 +563,9 @@ class EnsembleGenerator:
                 
                 # --- Metadata Collection ---
                 try:
-                    # Calculate Bars (Approximate)
-                    tempo = get_tempo_at_time(midi_data, 0)
+                    # Calculate Bars (Approximate, 4/4)
                     duration = new_midi.get_end_time()
-                    bars = max(1, int(round(duration / (60.0 / tempo) / 4.0)))
+                    bars = max(1, int(round(tempo_map.seconds_to_beats(duration) / 4.0)))
                     
                     root_name = "C"
                     if key_info:
@@ -573,27 +590,116 @@ class EnsembleGenerator:
                 except Exception as meta_e:
                     print(f"Metadata Warning: {meta_e}")
         # --- Export Auto-Registration Excel ---
-        if metadata_list:
+        if metadata_list and export_report:
+            export_import_source(metadata_list, os.path.join(final_output_dir, "_Import_Source.xlsx"))
+
+        return generated_files
+
+IMPORT_SOURCE_COLUMNS = ['FileName', 'FilePath', 'Category', 'Instruments', 'Bar', 'Chord', 'Root', 'Group', 'Comment', '_SourceFile']
+
+def export_import_source(metadata_list, export_path):
+    """Writes the Auto-Registration rows to an _Import_Source.xlsx file."""
+    import pandas as pd # Deferred to keep module import light
+    try:
+        df = pd.DataFrame(metadata_list)
+        # Ensure column order matches MasterLibraly if possible
+        # reorder only if columns exist
+        final_cols = [c for c in IMPORT_SOURCE_COLUMNS if c in df.columns]
+        df = df[final_cols]
+        
+        df.to_excel(export_path, index=False)
+        print(f"Exported Registration Source: {export_path}")
+        return export_path
+    except Exception as e:
+        print(f"Error exporting Excel report: {e}")
+        return None
+
+def _generate_one(input_path, generate_kwargs, stop_event):
+    """Process pool entry point: one fresh generator per input file."""
+    gen = EnsembleGenerator()
+    generated = gen.generate(input_path, stop_event=stop_event, export_report=False, **generate_kwargs)
+    return generated, gen.last_metadata
+
+def generate_batch(input_paths, jobs=None, stop_event=None, progress_callback=None, report_path=None, **generate_kwargs):
+    """
+    Runs EnsembleGenerator.generate over many bass files using a process pool.
+    
+    jobs: number of worker processes (None = CPU count, 1 = run in this process).
+    stop_event: threading.Event. Setting it cancels queued files and asks running ones to stop.
+    progress_callback: called as (done, total, input_path, generated_files, error) after each file.
+    report_path: merged _Import_Source.xlsx path. Defaults to the common parent of all output folders.
+    generate_kwargs: forwarded to EnsembleGenerator.generate (velocity_scale, key_arg, ...).
+    Returns: dict {input_path: [generated file paths]}
+    """
+    input_paths = list(input_paths)
+    total = len(input_paths)
+    results = {}
+    metadata_list = []
+    if not input_paths:
+        return results
+
+    def collect(path, generated, metadata, error):
+        results[path] = generated
+        metadata_list.extend(metadata)
+        if error:
+            print(f"Batch Error ({os.path.basename(path)}): {error}")
+        if progress_callback:
+            progress_callback(len(results), total, path, generated, error)
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, total))
+
+    if jobs == 1:
+        for path in input_paths:
+            if stop_event and stop_event.is_set():
+                print("Batch cancelled by user.")
+                break
             try:
-                import pandas as pd
-                df = pd.DataFrame(metadata_list)
-                # Ensure column order matches MasterLibraly if possible
-                cols = ['FileName', 'FilePath', 'Category', 'Instruments', 'Bar', 'Chord', 'Root', 'Group', 'Comment', '_SourceFile']
-                # reorder only if columns exist
-                final_cols = [c for c in cols if c in df.columns]
-                df = df[final_cols]
-                
-                export_path = os.path.join(final_output_dir, "_Import_Source.xlsx")
-                df.to_excel(export_path, index=False)
-                print(f"Exported Registration Source: {export_path}")
+                generated, metadata = _generate_one(path, generate_kwargs, stop_event)
+                collect(path, generated, metadata, None)
             except Exception as e:
-                print(f"Error exporting Excel report: {e}")
+                collect(path, [], [], e)
+    else:
+        # threading.Event cannot cross process boundaries; mirror it into a managed Event.
+        with multiprocessing.Manager() as manager:
+            shared_stop = manager.Event()
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                pending = {pool.submit(_generate_one, path, generate_kwargs, shared_stop): path for path in input_paths}
+                while pending:
+                    if stop_event and stop_event.is_set() and not shared_stop.is_set():
+                        print("Batch cancelled by user.")
+                        shared_stop.set()
+                        for future in list(pending):
+                            if future.cancel():
+                                del pending[future]
+
+                    done, _ = wait(list(pending), timeout=0.2, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = pending.pop(future)
+                        try:
+                            generated, metadata = future.result()
+                            collect(path, generated, metadata, None)
+                        except Exception as e:
+                            collect(path, [], [], e)
+
+    # --- Merged Auto-Registration Excel ---
+    if metadata_list:
+        if not report_path:
+            out_dirs = {os.path.dirname(m['FilePath']) for m in metadata_list}
+            try:
+                report_dir = os.path.commonpath(list(out_dirs))
+            except ValueError:
+                # Different drives: fall back to the first output folder
+                report_dir = sorted(out_dirs)[0]
+            report_path = os.path.join(report_dir, "_Import_Source.xlsx")
+        export_import_source(metadata_list, report_path)
 
-        return generated_files
+    return results
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("input_file")
+    parser.add_argument("input_files", nargs="+", help="Bass MIDI file(s) or folder(s) containing them")
     parser.add_argument("--velocity_scale", type=float, default=0.9)
     parser.add_argument("--key", default="Auto", help="Key (e.g. 'C Major')")
     parser.add_argument("--chord", default=None, help="Comma-separated chord strategies (e.g. 'Diatonic,Major')")
@@ -601,17 +707,36 @@ if __name__ == "__main__":
     parser.add_argument("--preset", default=None, help="Preset name (pop, rock, game, dance, lofi)")
     parser.add_argument("--output", default=None, help="Output subdirectory name")
     parser.add_argument("--expand_scale", action="store_true", help="[EXPERIMENTAL] Generate all scale degrees from input")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for batch mode (default: CPU count)")
+    parser.add_argument("--report", default=None, help="Merged _Import_Source.xlsx path for batch mode")
     
     args = parser.parse_args()
     
-    gen = EnsembleGenerator()
-    gen.generate(
-        args.input_file, 
+    input_files = []
+    for path in args.input_files:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(('.mid', '.midi')):
+                    input_files.append(os.path.join(path, name))
+        else:
+            input_files.append(path)
+    
+    generate_kwargs = dict(
         velocity_scale=args.velocity_scale, 
         key_arg=args.key,
         chord_filter=args.chord,
         style_filter=args.style,
         preset_name=args.preset,
         output_subdir=args.output,
-        expand_scale=args.expand_scale
+        expansion_flags={'triad': True, '7th': True} if args.expand_scale else None
     )
+    
+    if len(input_files) == 1:
+        gen = EnsembleGenerator()
+        gen.generate(input_files[0], **generate_kwargs)
+    else:
+        def print_progress(done, total, path, generated, error):
+            state = "FAILED" if error else f"{len(generated)} files"
+            print(f"[{done}/{total}] {os.path.basename(path)}: {state}")
+        
+        generate_batch(input_files, jobs=args.jobs, progress_callback=print_progress, report_path=args.report, **generate_kwargs)
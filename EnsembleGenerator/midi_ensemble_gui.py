@@ -6,7 +6,7 @@ import sys
 
 # Ensure script directory is in path to import generator
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from midi_ensemble_generator import EnsembleGenerator, STYLE_REGISTRY, register_external_styles
+from midi_ensemble_generator import EnsembleGenerator, STYLE_REGISTRY, register_external_styles, generate_batch
 
 class EnsembleApp(ctk.CTk, TkinterDnD.DnDWrapper):
     def __init__(self):
@@ -119,7 +119,7 @@ class EnsembleApp(ctk.CTk, TkinterDnD.DnDWrapper):
         self.label_ver.grid(row=8, column=0, sticky="se", padx=5, pady=0)
         
         # State
-        self.current_file = None
+        self.current_files = []
         self.generator = EnsembleGenerator()
         
         # Initial Log & Populate Filters
@@ -133,31 +133,27 @@ class EnsembleApp(ctk.CTk, TkinterDnD.DnDWrapper):
         self.filter_checkboxes = {}
         
         # Scan registry for unique rename_src
+        # Excel styles carry rename_src as registry info, so nothing is compiled here.
         unique_types = set()
-        from midi_ensemble_generator import ExternalStyleStrategy
         
-        for name, strategy_cls_or_obj in STYLE_REGISTRY.items():
-            # Strategy might be class or instance or lambda
-            # We need to peek at 'rename_src'. 
-            # If it's a class, we might need to instantiate? No, that's heavy.
-            # Usually registry has instances or lambdas?
-            # Existing code: STYLE_REGISTRY[name] = ExternalStyleStrategy(...)
-            
-            # Let's try to get rename_src
+        for name in STYLE_REGISTRY.keys():
             src_val = 'Default'
-            obj = strategy_cls_or_obj
+            info = STYLE_REGISTRY.get_info(name)
             
-            # If callable (lambda or class), try to inspect? 
-            # For this purpose, we assume registry stores instantiated objects OR we instantiate temp
-            if callable(obj):
-                try:
-                    # Try calling if it's a factory
-                    temp = obj()
-                    src_val = getattr(temp, 'rename_src', 'Default')
-                except:
-                    pass
+            if info is not None:
+                src_val = info.get('rename_src') or 'Default'
             else:
-                src_val = getattr(obj, 'rename_src', 'Default')
+                # Plain factory/class/instance registered directly: peek at 'rename_src'
+                obj = STYLE_REGISTRY[name]
+                if callable(obj):
+                    try:
+                        # Try calling if it's a factory
+                        temp = obj()
+                        src_val = getattr(temp, 'rename_src', 'Default')
+                    except:
+                        pass
+                else:
+                    src_val = getattr(obj, 'rename_src', 'Default')
             
             if src_val is None: src_val = 'Default'
             unique_types.add(str(src_val))
@@ -202,15 +198,18 @@ class EnsembleApp(ctk.CTk, TkinterDnD.DnDWrapper):
         self.label_jitter.configure(text=f"Jitter: {ms}ms")
 
     def on_drop(self, event):
-        file_path = event.data
-        if file_path.startswith('{') and file_path.endswith('}'):
-            file_path = file_path[1:-1]
+        # Multiple files arrive as a Tcl list: "{C:/a b.mid} C:/c.mid"
+        file_paths = [p for p in self.tk.splitlist(event.data) if os.path.isfile(p)]
             
-        if os.path.isfile(file_path):
-            self.current_file = file_path
-            self.label_drop.configure(text=os.path.basename(file_path))
+        if file_paths:
+            self.current_files = file_paths
+            if len(file_paths) == 1:
+                self.label_drop.configure(text=os.path.basename(file_paths[0]))
+            else:
+                self.label_drop.configure(text=f"{len(file_paths)} files (Batch)")
             self.btn_run.configure(state="normal")
-            self.log(f"Loaded: {file_path}")
+            for file_path in file_paths:
+                self.log(f"Loaded: {file_path}")
         else:
             self.log("Invalid file dropped.")
 
@@ -219,7 +218,7 @@ class EnsembleApp(ctk.CTk, TkinterDnD.DnDWrapper):
         self.textbox_log.see("end")
 
     def run_generation(self):
-        if not self.current_file:
+        if not self.current_files:
             return
         
         # Toggle Logic: If running, STOP.
@@ -256,13 +255,16 @@ class EnsembleApp(ctk.CTk, TkinterDnD.DnDWrapper):
         # Change Button to Stop
         self.btn_run.configure(text="Stop", fg_color="red", command=self.run_generation) # Command stays same, logic handles toggle
         
-        self.log(f"Starting generation for {os.path.basename(self.current_file)}...")
+        if len(self.current_files) == 1:
+            self.log(f"Starting generation for {os.path.basename(self.current_files[0])}...")
+        else:
+            self.log(f"Starting batch generation for {len(self.current_files)} files...")
         self.log(f"Settings: Velocity={vel_scale:.1f}, Key={selected_key}")
         self.log(f"Expansion: {expansion_flags}, StrictVoice: {strict_val}")
         self.log(f"Style Types Allowed: {allowed}")
         
         # Run in thread
-        threading.Thread(target=self._generate_thread, args=(self.current_file, vel_scale, selected_key, expansion_flags, strict_val, allowed, jitter_val), daemon=True).start()
+        threading.Thread(target=self._generate_thread, args=(list(self.current_files), vel_scale, selected_key, expansion_flags, strict_val, allowed, jitter_val), daemon=True).start()
 
     def stop_generation(self):
         if not self.stop_event.is_set():
@@ -270,18 +272,25 @@ class EnsembleApp(ctk.CTk, TkinterDnD.DnDWrapper):
             self.log(">>> Stopping generation... (Please wait for current file)")
             self.btn_run.configure(state="disabled") # Disable until thread finishes
 
-    def _generate_thread(self, input_file, vel_scale, key_arg, expansion_flags, strict_val, allowed_types, jitter_val):
+    def _generate_thread(self, input_files, vel_scale, key_arg, expansion_flags, strict_val, allowed_types, jitter_val):
         try:
-            generated = self.generator.generate(
-                input_file, 
+            generate_kwargs = dict(
                 velocity_scale=vel_scale, 
                 key_arg=key_arg, 
                 expansion_flags=expansion_flags,
                 strict_validation=strict_val,
                 allowed_types=allowed_types,
-                timing_jitter=jitter_val,
-                stop_event=self.stop_event
+                timing_jitter=jitter_val
             )
+            if len(input_files) == 1:
+                generated = self.generator.generate(input_files[0], stop_event=self.stop_event, **generate_kwargs)
+            else:
+                def on_progress(done, total, path, files, error):
+                    state = f"Error: {error}" if error else f"{len(files)} files"
+                    self.log(f"[{done}/{total}] {os.path.basename(path)}: {state}")
+                
+                results = generate_batch(input_files, stop_event=self.stop_event, progress_callback=on_progress, **generate_kwargs)
+                generated = [f for files in results.values() for f in files]
             
             if self.stop_event.is_set():
                 self.log(f"Cancelled. Generated {len(generated)} files so far.")
@@ -0,0 +1,50 @@
+import numpy as np
+
+# One record per note (26 bytes instead of a pretty_midi.Note or a dict per note).
+# track: index into pm.instruments, index: position in that track's note list.
+NOTE_DTYPE = np.dtype([
+    ('start', 'f8'),
+    ('end', 'f8'),
+    ('pitch', 'i2'),
+    ('velocity', 'i2'),
+    ('track', 'i2'),
+    ('index', 'i4'),
+])
+
+
+def empty_notes():
+    return np.zeros(0, dtype=NOTE_DTYPE)
+
+
+def instrument_notes(inst, track=0):
+    """Notes of one pretty_midi.Instrument as a NOTE_DTYPE array (track field = track)."""
+    return np.array([(note.start, note.end, note.pitch, note.velocity, track, i)
+                     for i, note in enumerate(inst.notes)], dtype=NOTE_DTYPE)
+
+
+def note_array(pm, tracks=None):
+    """
+    All notes of a PrettyMIDI as one structured array (NOTE_DTYPE), in track order
+    and, within a track, in the track's own note order.
+    tracks: optional list of track indices to include.
+    """
+    return np.array([(note.start, note.end, note.pitch, note.velocity, track, i)
+                     for track, inst in enumerate(pm.instruments)
+                     if tracks is None or track in tracks
+                     for i, note in enumerate(inst.notes)], dtype=NOTE_DTYPE)
+
+
+def track_notes(notes, track):
+    """View-like selection of one track's notes (a copy only if tracks are interleaved)."""
+    mask = notes['track'] == track
+    hits = np.flatnonzero(mask)
+    if len(hits) and hits[-1] - hits[0] + 1 == len(hits):
+        return notes[hits[0]:hits[-1] + 1] # Contiguous: zero-copy slice
+    return notes[mask]
+
+
+def sorted_notes(notes, *fields):
+    """Notes sorted by the given fields (first field = primary key); stable."""
+    if not fields:
+        return notes
+    return notes[np.lexsort(tuple(notes[f] for f in reversed(fields)))]
@@ -1,6 +1,104 @@
+import threading
+from collections.abc import MutableMapping
+
+class _PendingStyle:
+    """Placeholder for a style whose factory is built on first lookup."""
+    __slots__ = ('builder',)
+
+    def __init__(self, builder):
+        self.builder = builder
+
+class LazyStyleRegistry(MutableMapping):
+    """
+    Style registry that defers loading until the first lookup.
+    set_loader(fn): fn(registry) is called once, on the first key/lookup access,
+                    and registers styles via register_lazy() or item assignment.
+    register_lazy(name, builder, **info): builder() returns the style factory and
+                    is only called when registry[name] is requested.
+    get_info(name): metadata passed to register_lazy (e.g. rename_src) without
+                    materializing the style.
+    """
+    def __init__(self):
+        self._entries = {}
+        self._info = {}
+        self._loader = None
+        self._loaded = True
+        self._loading = False # Set while the loader runs (its own lookups must not re-enter it)
+        self._lock = threading.RLock()
+
+    def set_loader(self, loader):
+        with self._lock:
+            self._loader = loader
+            self._loaded = loader is None
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            # Other threads wait here until the loader has finished
+            if self._loaded or self._loading:
+                return
+            self._loading = True
+            try:
+                self._loader(self)
+                # Only a successful load is final; a failing loader is retried on the next lookup
+                self._loader = None
+                self._loaded = True
+            finally:
+                self._loading = False
+
+    def register_lazy(self, name, builder, **info):
+        with self._lock:
+            self._entries[name] = _PendingStyle(builder)
+            self._info[name] = info
+
+    def get_info(self, name):
+        self._ensure_loaded()
+        return self._info.get(name)
+
+    def __getitem__(self, name):
+        self._ensure_loaded()
+        value = self._entries[name]
+        if isinstance(value, _PendingStyle):
+            with self._lock:
+                value = self._entries[name]
+                if isinstance(value, _PendingStyle):
+                    value = value.builder()
+                    self._entries[name] = value
+        return value
+
+    def __setitem__(self, name, value):
+        with self._lock:
+            self._entries[name] = value
+            self._info.pop(name, None)
+
+    def __delitem__(self, name):
+        self._ensure_loaded()
+        with self._lock:
+            del self._entries[name]
+            self._info.pop(name, None)
+
+    def __contains__(self, name):
+        self._ensure_loaded()
+        return name in self._entries
+
+    def __iter__(self):
+        self._ensure_loaded()
+        return iter(list(self._entries))
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._entries)
+
+    def clear(self):
+        # Does not trigger the loader (MutableMapping.clear would)
+        with self._lock:
+            self._entries.clear()
+            self._info.clear()
+
 # --- Registry ---
 CHORD_REGISTRY = {}
-STYLE_REGISTRY = {}
+STYLE_REGISTRY = LazyStyleRegistry()
 
 def register_chord(name):
     def decorator(cls):
@@ -1,15 +1,15 @@
 import pretty_midi
 import random
 import os
-import pandas as pd
+import pickle
 try:
     from .registries import register_style
     # Removed: from base_strategies import StyleStrategy
-    from .utils import get_tempo_at_time
+    from .utils import get_tempo_map, file_sha1
 except ImportError:
     from registries import register_style
     # Removed: from base_strategies import StyleStrategy
-    from utils import get_tempo_at_time
+    from utils import get_tempo_map, file_sha1
 
 # New StyleStrategy base class definition
 # New StyleStrategy base class definition
@@ -45,32 +45,113 @@ INTERVAL_RULES = {
     "M7(#11)": [4, 3, 4, 7, -6] 
 }
 
+def build_pitch_table(rule, length):
+    """
+    Cumulative semitone offsets of a step rule.
+    table[n] = pitch offset (above root + 12) of step n, for n in 0..length-1.
+    """
+    table = [0]
+    for idx in range(length - 1):
+        table.append(table[-1] + rule[idx % len(rule)])
+    return table
+
+# chord_type -> offset table, extended on demand by get_pitch_table
+PITCH_TABLES = {name: build_pitch_table(rule, 32) for name, rule in INTERVAL_RULES.items()}
+
+def get_pitch_table(chord_type, min_length=0):
+    rule_name = chord_type if chord_type in INTERVAL_RULES else "Default"
+    table = PITCH_TABLES[rule_name]
+    if len(table) < min_length:
+        table = build_pitch_table(INTERVAL_RULES[rule_name], min_length)
+        PITCH_TABLES[rule_name] = table
+    return table
+
+def parse_step_value(seq_val):
+    """
+    Parses one Excel step cell into a tuple of interval indices.
+    '-1' / '' is a rest (None). '0&2', '1+3', '0 2' are chords; unparsable parts are skipped.
+    """
+    seq_val_str = str(seq_val)
+    if seq_val_str == '-1' or seq_val_str == '':
+        return None
+    val_clean = seq_val_str.replace('&', ',').replace('+', ',').replace(' ', ',')
+    indices = []
+    for idx_str in val_clean.split(','):
+        idx_str = idx_str.strip()
+        if not idx_str: continue
+        try:
+            indices.append(int(float(idx_str)))
+        except ValueError:
+            pass
+    return tuple(indices)
+
+class VoiceProgram:
+    """One compiled voice: per-step interval indices, gate and velocity multipliers."""
+    __slots__ = ('steps', 'gate', 'vel', 'swing', 'length', 'max_step')
+
+    def __init__(self, seq, gate, vel, swing):
+        self.steps = [parse_step_value(v) for v in seq]
+        self.length = len(self.steps)
+        # Missing gate/vel cells default to 1.0 (same as the old per-note fallback)
+        self.gate = [float(gate[i]) if i < len(gate) else 1.0 for i in range(self.length)]
+        self.vel = [float(vel[i]) if i < len(vel) else 1.0 for i in range(self.length)]
+        self.swing = float(swing)
+        self.max_step = max((i for step in self.steps if step for i in step), default=0)
+
+class StyleProgram:
+    """
+    Compiled form of a style's catalog rows (see load_style_catalog).
+    voices: dict voice_index -> VoiceProgram
+    """
+    def __init__(self, voices, rename_src=None):
+        self.voices = voices
+        self.rename_src = rename_src
+        self.max_step = max((v.max_step for v in voices.values()), default=0)
+
+def get_rename_src(voices_data):
+    """First rename_src found in a style's catalog rows (once is enough), or None."""
+    for row in voices_data:
+        if row.get('rename_src'):
+            return row['rename_src']
+    return None
+
+def compile_style_program(voices_data):
+    """Compiles catalog rows ({'voice', 'type', 'data', 'swing', 'rename_src'}) into a StyleProgram."""
+    raw_voices = {}
+    for row in voices_data:
+        v_idx = row['voice']
+        if v_idx not in raw_voices:
+            raw_voices[v_idx] = {'seq': [], 'gate': [], 'vel': [], 'swing': 0.0}
+        
+        p_type = row['type']
+        if p_type == 'seq':
+            raw_voices[v_idx]['seq'] = row['data']
+            raw_voices[v_idx]['swing'] = row['swing']
+        elif p_type == 'gate':
+            raw_voices[v_idx]['gate'] = row['data']
+        elif p_type == 'vel':
+            raw_voices[v_idx]['vel'] = row['data']
+
+    voices = {
+        v_idx: VoiceProgram(raw['seq'], raw['gate'], raw['vel'], raw['swing'])
+        for v_idx, raw in raw_voices.items()
+    }
+    return StyleProgram(voices, get_rename_src(voices_data))
+
 class ExternalStyleStrategy(StyleStrategy):
     """
     Unified Style Strategy defined by external Excel data (Row based).
     Supports multiple voices (layers) and extended step lengths (32+).
+    Accepts raw catalog rows or a StyleProgram compiled once at load time.
     """
     def __init__(self, voices_data):
-        # voices_data is a list of dicts: {'voice': 1, 'type': 'seq', 'data': [...], 'swing': 0.0} ...
-        # We need to organize by voice index for playback
-        self.voices = {}
-        for row in voices_data:
-            v_idx = row['voice']
-            if v_idx not in self.voices:
-                self.voices[v_idx] = {'seq': [], 'gate': [], 'vel': [], 'swing': 0.0}
-            
-            # Store rename_src if present (once is enough)
-            if row.get('rename_src') and not hasattr(self, 'rename_src'):
-                self.rename_src = row['rename_src']
-            
-            p_type = row['type']
-            if p_type == 'seq':
-                self.voices[v_idx]['seq'] = row['data']
-                self.voices[v_idx]['swing'] = row['swing']
-            elif p_type == 'gate':
-                self.voices[v_idx]['gate'] = row['data']
-            elif p_type == 'vel':
-                self.voices[v_idx]['vel'] = row['data']
+        if isinstance(voices_data, StyleProgram):
+            self.program = voices_data
+        else:
+            self.program = compile_style_program(voices_data)
+        self.voices = self.program.voices
+        if self.program.rename_src is not None:
+            self.rename_src = self.program.rename_src
 
     def _detect_chord_type(self, chord_notes, root_pitch):
         if not chord_notes or not root_pitch: return "Default"
@@ -106,16 +187,8 @@ class ExternalStyleStrategy(StyleStrategy):
 
     def _get_pitch_from_step(self, step_val, root_pitch, chord_type):
         if root_pitch is None: return 60 
-        rule = INTERVAL_RULES.get(chord_type, INTERVAL_RULES["Default"])
-        current_pitch = root_pitch + 12
-        steps_remaining = step_val
-        idx = 0
-        while steps_remaining > 0:
-            interval = rule[idx % len(rule)]
-            current_pitch += interval
-            steps_remaining -= 1
-            idx += 1
-        return current_pitch
+        if step_val <= 0: return root_pitch + 12
+        return root_pitch + 12 + get_pitch_table(chord_type, step_val + 1)[step_val]
 
     def apply(self, chord_notes, bass_note, velocity_scale=1.0, midi_data=None, root_pitch=None):
         if not chord_notes: return []
@@ -126,7 +199,7 @@ class ExternalStyleStrategy(StyleStrategy):
         
         bpm = 120.0
         if midi_data:
-            bpm = get_tempo_at_time(midi_data, base_start)
+            bpm = get_tempo_map(midi_data).bpm_at(base_start)
         
         beat_dur = 60.0 / bpm
         step_dur = beat_dur / 4.0 # 16th note
@@ -134,18 +207,16 @@ class ExternalStyleStrategy(StyleStrategy):
         global_step_offset = int(round(base_start / step_dur))
         loop_steps = int((end - base_start) / step_dur) + 2
         
-        chord_type = self._detect_chord_type(chord_notes, root_pitch)
+        # Step index -> semitone offset above root + 12 (negative steps stay on the base pitch)
+        pitch_table = get_pitch_table(self._detect_chord_type(chord_notes, root_pitch), self.program.max_step + 1)
+        base_pitch = root_pitch + 12 if root_pitch is not None else None
+        base_velocity = bass_note.velocity * velocity_scale
 
         # Iterate through VOICES
-        for v_idx, voice_data in self.voices.items():
-            sequence = voice_data['seq']
-            gate_data = voice_data['gate']
-            vel_data = voice_data['vel']
-            swing_amount = voice_data['swing']
-            
-            # Safety check for lengths
-            seq_len = len(sequence)
+        for v_idx, voice in self.voices.items():
+            seq_len = voice.length
             if seq_len == 0: continue
+            swing_offset = voice.swing * step_dur
 
             for i in range(loop_steps):
                 abs_step_idx = global_step_offset + i
@@ -156,63 +227,104 @@ class ExternalStyleStrategy(StyleStrategy):
                 
                 # Sequence Lookup (Modulo Length)
                 seq_idx = abs_step_idx % seq_len
+                step_indices = voice.steps[seq_idx]
+                if step_indices is None: continue # Rest
                 
-                # Safe Access
-                seq_val_str = sequence[seq_idx] if seq_idx < len(sequence) else '-1'
+                # Gate & Vel are pre-scaled by the loader (Excel 10 -> 1.0)
+                duration = step_dur * voice.gate[seq_idx]
+                if duration <= 0.001: continue
+                vel = max(1, min(127, int(base_velocity * voice.vel[seq_idx])))
                 
-                # Gate & Vel
-                # Note: Excel inputs 10 -> 1.0. We divide by 10.0 here or in loader?
-                # Let's do it in Loader for consistency. Assuming data is already scaled in Loader.
-                gate = gate_data[seq_idx] if seq_idx < len(gate_data) else 1.0
-                vel_mult = vel_data[seq_idx] if seq_idx < len(vel_data) else 1.0
+                # Interpret swing as ratio of step_dur (e.g. 0.3 => 30% delay)
+                onset_base = grid_onset + (swing_offset if (abs_step_idx % 2) == 1 else 0.0)
                 
-                timing_offset = 0.0
-                if (abs_step_idx % 2) == 1: 
-                    # Interpret swing as ratio of step_dur (e.g. 0.3 => 30% delay)
-                    # Previous: timing_offset += swing_amount (treated as seconds, caused massive lag)
-                    timing_offset += swing_amount * step_dur
-
-                if str(seq_val_str) != '-1' and str(seq_val_str) != '':
-                    if True: 
-                         print(f"DEBUG: V{v_idx} Step {abs_step_idx} | Seq:'{seq_val_str}' G:{gate:.2f}")
-
-                    val_clean = str(seq_val_str).replace('&', ',').replace('+', ',').replace(' ', ',')
-                    indices = [s.strip() for s in val_clean.split(',') if s.strip()]
+                for strum_idx, idx_val in enumerate(step_indices):
+                    if base_pitch is None:
+                        final_pitch = 60
+                    else:
+                        final_pitch = base_pitch + (pitch_table[idx_val] if idx_val > 0 else 0)
                     
-                    strum_idx = 0
-                    for idx_str in indices:
-                        try:
-                            idx_val = int(float(idx_str)) 
-                            final_pitch = self._get_pitch_from_step(idx_val, root_pitch, chord_type)
-                            
-                            strum_delay = strum_idx * 0.005
-                            onset = grid_onset + timing_offset + strum_delay
-                            
-                            if onset < end:
-                                duration = step_dur * gate
-                                note_end = onset + duration 
-                                
-                                if duration > 0.001:
-                                    vel = bass_note.velocity * velocity_scale * vel_mult
-                                    vel = max(1, min(127, int(vel)))
-                                    
-                                    all_notes.append(pretty_midi.Note(
-                                        velocity=vel,
-                                        pitch=final_pitch,
-                                        start=onset,
-                                        end=note_end
-                                    ))
-                            strum_idx += 1
-                        except ValueError:
-                            pass
+                    onset = onset_base + strum_idx * 0.005
+                    if onset < end:
+                        all_notes.append(pretty_midi.Note(
+                            velocity=vel,
+                            pitch=final_pitch,
+                            start=onset,
+                            end=onset + duration
+                        ))
                             
         return all_notes
 
-def load_style_catalog(file_path="ensemble_styles.xlsx"):
+STYLE_CACHE_VERSION = 1
+MAX_STEPS = 128 # 8 bars of 16th steps
+
+def get_style_cache_path(file_path):
+    """Binary cache stored next to the workbook (e.g. ensemble_styles.xlsx.cache)."""
+    return file_path + ".cache"
+
+def _read_style_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+        if cached.get('version') == STYLE_CACHE_VERSION:
+            return cached
+    except Exception:
+        pass
+    return None
+
+def _write_style_cache(cache_path, cached):
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"Warning: Could not write style cache {cache_path}: {e}")
+
+def load_style_catalog(file_path="ensemble_styles.xlsx", use_cache=True):
+    """
+    Returns {style_name: [row dicts]} parsed from the style workbook.
+    The parsed catalog is cached next to the workbook and reused while the
+    file path, size, mtime (or, failing that, content hash) are unchanged.
+    """
     if not os.path.exists(file_path):
         print(f"Warning: Style catalog not found at {file_path}")
         return {}
     
+    if not use_cache:
+        return _parse_style_catalog(file_path)
+
+    abs_path = os.path.abspath(file_path)
+    st = os.stat(abs_path)
+    cache_path = get_style_cache_path(abs_path)
+    cached = _read_style_cache(cache_path)
+    
+    if cached and cached['path'] == abs_path and cached['size'] == st.st_size:
+        if cached['mtime_ns'] == st.st_mtime_ns:
+            return cached['catalog']
+        # Touched but maybe not edited (e.g. re-saved, synced): compare content
+        content_hash = file_sha1(abs_path)
+        if cached['hash'] == content_hash:
+            cached['mtime_ns'] = st.st_mtime_ns
+            _write_style_cache(cache_path, cached)
+            return cached['catalog']
+    else:
+        content_hash = file_sha1(abs_path)
+    
+    catalog = _parse_style_catalog(abs_path)
+    if catalog:
+        _write_style_cache(cache_path, {
+            'version': STYLE_CACHE_VERSION,
+            'path': abs_path,
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'hash': content_hash,
+            'catalog': catalog
+        })
+    return catalog
+
+def _parse_style_catalog(file_path):
+    import pandas as pd # Deferred: only needed when the cache is cold
     try:
         try:
             df = pd.read_excel(file_path, sheet_name='Patterns')
@@ -225,6 +337,15 @@ def load_style_catalog(file_path="ensemble_styles.xlsx"):
         # New Schema: style_name, voice, type, 01..32, swing
         # We need to iterate and group.
         
+        # Resolve step columns once: "01", "1" or 1 for steps 1..128 (8 bars)
+        # Usually patterns are contiguous. If "17" is missing, we stop.
+        step_columns = []
+        for i in range(1, MAX_STEPS + 1):
+            key = next((k for k in (f"{i:02}", str(i), i) if k in df.columns), None)
+            if key is None:
+                break
+            step_columns.append(key)
+        
         for index, row in df.iterrows():
             try:
                 name = row['style_name']
@@ -236,41 +357,22 @@ def load_style_catalog(file_path="ensemble_styles.xlsx"):
                 rename_val = row.get('rename_src', None)
                 if pd.isna(rename_val): rename_val = None
                 
-                # Extract 01..128 (8 bars)
                 data_list = []
-                # Support up to 128 steps (8 bars)
-                # Robust Column Lookup: Check "01", "1", 1
-                for i in range(1, 129):
-                    val = None
-                    found = False
-                    
-                    # Try keys
-                    possible_keys = [f"{i:02}", str(i), i]
-                    for key in possible_keys:
-                         if key in df.columns:
-                             val = row[key]
-                             found = True
-                             break
+                for key in step_columns:
+                    val = row[key]
+                    # Process value based on type
+                    if pd.isna(val) or val == '':
+                        if p_type == 'seq': val = '-1'
+                        else: val = 10 # Default for gate/vel
                     
-                    if found:
-                        # Process value based on type
-                        if pd.isna(val) or val == '':
-                            if p_type == 'seq': val = '-1'
-                            else: val = 10 # Default for gate/vel
-                        
-                        if p_type == 'seq':
-                            data_list.append(str(val))
-                        else:
-                            # Scale Gate/Vel by 10.0
-                            try:
-                                data_list.append(float(val) / 10.0)
-                            except:
-                                data_list.append(1.0)
+                    if p_type == 'seq':
+                        data_list.append(str(val))
                     else:
-                        # If a column in the middle is missing, should we consistency break?
-                        # Usually patterns are contiguous. If "17" is missing, we stop.
-                        break 
-
+                        # Scale Gate/Vel by 10.0
+                        try:
+                            data_list.append(float(val) / 10.0)
+                        except:
+                            data_list.append(1.0)
                 
                 row_data = {
                     'style_name': name,
@@ -1,9 +1,20 @@
 import pretty_midi
+import bisect
+import hashlib
+import weakref
 try:
     from .constants import NOTE_NAMES
 except ImportError:
     from constants import NOTE_NAMES
 
+def file_sha1(file_path):
+    """SHA-1 hex digest of a file's content (read in 1MB chunks)."""
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
 def detect_key(midi_data):
     """
     Simple Key Detection using simple pitch class counting matching against Major/Minor profiles.
@@ -47,20 +58,74 @@ def detect_key(midi_data):
             
     return best_key
 
+DEFAULT_BPM = 120.0
+STEPS_PER_BEAT = 4 # 16th-note grid
+
+class TempoMap:
+    """
+    Tempo changes of one MIDI file with bisect lookups.
+    Converts between seconds, beats and 16th steps across tempo changes.
+    Use get_tempo_map(midi_data) to share one instance per loaded PrettyMIDI.
+    """
+    def __init__(self, times, bpms):
+        times = [float(t) for t in times]
+        bpms = [float(b) for b in bpms]
+        
+        # Before the first change we assume DEFAULT_BPM (same as the old linear scan)
+        if not times or times[0] > 0:
+            times.insert(0, 0.0)
+            bpms.insert(0, DEFAULT_BPM)
+        self.times = times
+        self.bpms = bpms
+        
+        # Beat position of every tempo change
+        self.beat_times = [0.0]
+        for i in range(1, len(times)):
+            seg_beats = (times[i] - times[i-1]) * bpms[i-1] / 60.0
+            self.beat_times.append(self.beat_times[-1] + seg_beats)
+
+    @classmethod
+    def from_midi(cls, midi_data):
+        times, bpms = midi_data.get_tempo_changes()
+        return cls(times, bpms)
+
+    def bpm_at(self, time):
+        """BPM in effect at the given time (seconds)."""
+        idx = bisect.bisect_right(self.times, time) - 1
+        if idx < 0:
+            return DEFAULT_BPM
+        return self.bpms[idx]
+
+    def seconds_to_beats(self, time):
+        idx = max(0, bisect.bisect_right(self.times, time) - 1)
+        return self.beat_times[idx] + (time - self.times[idx]) * self.bpms[idx] / 60.0
+
+    def beats_to_seconds(self, beats):
+        idx = max(0, bisect.bisect_right(self.beat_times, beats) - 1)
+        return self.times[idx] + (beats - self.beat_times[idx]) * 60.0 / self.bpms[idx]
+
+    def seconds_to_steps(self, time):
+        return self.seconds_to_beats(time) * STEPS_PER_BEAT
+
+    def steps_to_seconds(self, steps):
+        return self.beats_to_seconds(steps / STEPS_PER_BEAT)
+
+    def step_duration_at(self, time):
+        """Length of one 16th step (seconds) at the given time."""
+        return 60.0 / self.bpm_at(time) / STEPS_PER_BEAT
+
+_TEMPO_MAPS = weakref.WeakKeyDictionary()
+
+def get_tempo_map(midi_data):
+    """Returns the TempoMap of a PrettyMIDI, building it on first use."""
+    tempo_map = _TEMPO_MAPS.get(midi_data)
+    if tempo_map is None:
+        tempo_map = TempoMap.from_midi(midi_data)
+        _TEMPO_MAPS[midi_data] = tempo_map
+    return tempo_map
+
 def get_tempo_at_time(midi_data, time):
     """
     Get BPM at specific time using tempo changes.
     """
-    tempo_changes = midi_data.get_tempo_changes()
-    # tempo_changes is unique: (times, bpms) arrays
-    
-    last_bpm = 120.0 # Default
-    times, bpms = tempo_changes
-    
-    # Linear search (optimized for standard MIDI size)
-    for t, bpm in zip(times, bpms):
-        if t <= time:
-            last_bpm = bpm
-        else:
-            break
-    return last_bpm
+    return get_tempo_map(midi_data).bpm_at(time)
@@ -0,0 +1,186 @@
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from file_signature import file_sha1, stat_signature, is_unchanged
+
+# Bump when MidiHandler's base analysis output changes; older entries are ignored
+ANALYSIS_VERSION = 3
+
+def default_cache_dir():
+    """Per-user local cache folder (kept out of the shared MIDI_Library)."""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "MidiDictionary", "analysis")
+
+
+class AnalysisCache:
+    """
+    Two-level cache for per-file analysis results.
+
+    - Memory: LRU of up to max_entries results, keyed by absolute path.
+    - Disk: one pickle per file in cache_dir (name = SHA-1 of the path), pruned
+      to max_disk_entries oldest-first.
+
+    An entry is valid while the file's size/mtime match; if only the mtime changed,
+    the content hash decides (see file_signature.is_unchanged).
+    """
+    def __init__(self, cache_dir=None, max_entries=256, max_disk_entries=20000):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self._writes_since_prune = 0
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError as e:
+            print(f"AnalysisCache: Disk cache disabled ({e})")
+            self.cache_dir = None
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".pkl")
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                entry = pickle.load(f)
+        except Exception:
+            return None
+        if entry.get('version') != ANALYSIS_VERSION or entry.get('path') != key:
+            return None
+        return entry
+
+    def _write_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+        disk_path = self._disk_path(key)
+        tmp_path = f"{disk_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, disk_path)
+        except Exception as e:
+            print(f"AnalysisCache: Could not write cache for {key}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= 100:
+            self._writes_since_prune = 0
+            self.prune()
+
+    def get(self, file_path):
+        """Cached result for file_path if the file is unchanged, else None."""
+        key = os.path.abspath(file_path)
+        try:
+            with self._lock:
+                entry = self._memory.get(key)
+            from_disk = entry is None
+            if from_disk:
+                entry = self._read_disk(key)
+            if entry is None:
+                return None
+
+            mtime_before = entry.get('mtime_ns')
+            if not is_unchanged(key, entry):
+                return None
+            if from_disk:
+                self._remember(key, entry)
+            else:
+                with self._lock:
+                    self._memory.move_to_end(key)
+            if entry.get('mtime_ns') != mtime_before:
+                self._write_disk(key, entry) # Content same, mtime refreshed
+            return entry['result']
+        except OSError:
+            return None
+
+    def put(self, file_path, result, remember=True):
+        """remember=False writes only the disk cache (background indexing keeps the LRU for clicks)."""
+        key = os.path.abspath(file_path)
+        try:
+            size, mtime_ns = stat_signature(key)
+            content_hash = file_sha1(key)
+        except OSError:
+            return
+        entry = {
+            'version': ANALYSIS_VERSION,
+            'path': key,
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'hash': content_hash,
+            'result': result
+        }
+        if remember:
+            self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def get_or_compute(self, file_path, compute):
+        """Returns the cached result or compute(file_path), caching non-None results."""
+        result = self.get(file_path)
+        if result is None:
+            result = compute(file_path)
+            if result is not None:
+                self.put(file_path, result)
+        return result
+
+    def contains(self, file_path):
+        return self.get(file_path) is not None
+
+    def is_fresh(self, file_path):
+        """True if a valid entry exists, without loading it into the memory LRU."""
+        key = os.path.abspath(file_path)
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is None:
+            entry = self._read_disk(key)
+        if entry is None:
+            return False
+        try:
+            mtime_before = entry.get('mtime_ns')
+            if not is_unchanged(key, entry):
+                return False
+        except OSError:
+            return False
+        if entry.get('mtime_ns') != mtime_before:
+            self._write_disk(key, entry) # Content same, mtime refreshed
+        return True
+
+    def prune(self):
+        """Deletes the oldest disk entries beyond max_disk_entries."""
+        if not self.cache_dir:
+            return
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".pkl")]
+            if len(entries) <= self.max_disk_entries:
+                return
+            entries.sort(key=lambda e: e.stat().st_mtime_ns)
+            for e in entries[:len(entries) - self.max_disk_entries]:
+                os.remove(e.path)
+        except OSError as e:
+            print(f"AnalysisCache: Prune failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if not self.cache_dir:
+            return
+        for e in os.scandir(self.cache_dir):
+            if e.name.endswith(".pkl"):
+                try:
+                    os.remove(e.path)
+                except OSError:
+                    pass
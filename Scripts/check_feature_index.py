@@ -0,0 +1,61 @@
+import sys
+import os
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import feature_index
+from feature_index import FeatureIndex
+
+def brute_force(vectors, mean, scale, query, k):
+    # The previous predict(): full norm over every row (here in the same normalized space)
+    z = (vectors - mean) / scale
+    d = np.linalg.norm(z - (query - mean) / scale, axis=1)
+    order = np.argsort(d, kind='stable')[:k]
+    return d[order] / np.sqrt(vectors.shape[1]), order
+
+def benchmark(n_rows=50000, dims=8, queries=500, k=5):
+    backend = "scipy cKDTree" if feature_index.cKDTree is not None else "NumPy KD-tree"
+    print(f"--- Benchmark: FeatureIndex vs brute force ({n_rows} rows, {dims} features, k={k}, {backend}) ---")
+    rng = np.random.default_rng(0)
+    # Clustered data, like corrections grouped by style
+    centers = rng.normal(size=(40, dims)) * 3
+    vectors = centers[rng.integers(0, 40, n_rows)] + rng.normal(size=(n_rows, dims)) * 0.5
+    probes = centers[rng.integers(0, 40, queries)] + rng.normal(size=(queries, dims)) * 0.5
+    
+    t0 = time.perf_counter()
+    index = FeatureIndex(dims, vectors)
+    index.query(probes[0], k)
+    print(f"Build: {(time.perf_counter() - t0) * 1000:.1f} ms")
+    
+    t0 = time.perf_counter()
+    results = [index.query(p, k) for p in probes]
+    t_index = time.perf_counter() - t0
+    
+    t0 = time.perf_counter()
+    expected = [brute_force(vectors, index._mean, index._scale, p, k) for p in probes]
+    t_brute = time.perf_counter() - t0
+    
+    print(f"Index:       {t_index / queries * 1000:.3f} ms/query")
+    print(f"Brute force: {t_brute / queries * 1000:.3f} ms/query")
+    
+    mismatches = sum(1 for (d1, _), (d2, _) in zip(results, expected) if not np.allclose(d1, d2))
+    if mismatches == 0:
+        print("[PASS] Same neighbour distances as brute force.")
+    else:
+        print(f"[FAIL] {mismatches} queries differ from brute force.")
+    
+    # Incremental insertion: buffered points must be found before the next rebuild
+    t0 = time.perf_counter()
+    for p in probes[:300]:
+        row_id = index.add(p)
+        d, ids = index.query(p, 1)
+        if d[0] > 1e-9:
+            print(f"[FAIL] Inserted row {row_id} not found.")
+            return
+    print(f"[PASS] 300 insert+query in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    benchmark(n_rows=1000)
+    benchmark()
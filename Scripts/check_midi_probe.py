@@ -0,0 +1,150 @@
+import sys
+import os
+import io
+import glob
+import tempfile
+import time
+import warnings
+import numpy as np
+import mido
+import pretty_midi
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from midi_probe import probe_midi, MidiProbeError
+
+def pretty_midi_record(path):
+    # The same fields, the way the app used to get them
+    pm = pretty_midi.PrettyMIDI(path)
+    times, bpms = pm.get_tempo_changes()
+    ts = pm.time_signature_changes
+    return {
+        'tempo_changes': list(zip(times.tolist(), bpms.tolist())),
+        'time_signature': f"{ts[0].numerator}/{ts[0].denominator}" if ts else "4/4",
+        'time_signatures': [(t.time, t.numerator, t.denominator) for t in ts],
+        'n_notes': sum(len(inst.notes) for inst in pm.instruments),
+        'end_time': pm.get_end_time()
+    }
+
+def compare(files):
+    mismatches = {}
+    for path in files:
+        try:
+            expected = pretty_midi_record(path)
+        except Exception:
+            continue
+        got = probe_midi(path)
+        for key, value in expected.items():
+            other = got[key]
+            if key == 'tempo_changes':
+                same = len(value) == len(other) and np.allclose(value, other)
+            elif key == 'end_time':
+                same = abs(value - other) < 1e-9
+            else:
+                same = value == other
+            if not same:
+                mismatches.setdefault(key, []).append(os.path.basename(path))
+    return mismatches
+
+def benchmark(files):
+    print(f"--- Benchmark: midi_probe vs pretty_midi ({len(files)} files) ---")
+    t0 = time.perf_counter()
+    for path in files:
+        try:
+            pretty_midi_record(path)
+        except Exception:
+            pass
+    t_pm = time.perf_counter() - t0
+
+    for notes in (True, False):
+        t0 = time.perf_counter()
+        for path in files:
+            try:
+                probe_midi(path, notes=notes)
+            except Exception:
+                pass
+        t_probe = time.perf_counter() - t0
+        label = "probe (notes)" if notes else "probe (meta only)"
+        print(f"{label:18} {t_probe * 1000 / len(files):.3f} ms/file  ({t_pm / t_probe:.1f}x faster)")
+    print(f"{'pretty_midi':18} {t_pm * 1000 / len(files):.3f} ms/file")
+
+    mismatches = compare(files)
+    if not mismatches:
+        print("[PASS] Tempo, time signature, note count and end time match pretty_midi.")
+    for key, names in mismatches.items():
+        print(f"[FAIL] {key}: {len(names)} files differ (e.g. {', '.join(names[:3])})")
+
+def smf_bytes(tempo_us=500000):
+    # Small well-formed file: tempo, time signature, a few notes with running status
+    mid = mido.MidiFile(ticks_per_beat=480)
+    track = mido.MidiTrack()
+    track.append(mido.MetaMessage('set_tempo', tempo=tempo_us, time=0))
+    track.append(mido.MetaMessage('time_signature', numerator=3, denominator=4, time=0))
+    track.append(mido.Message('sysex', data=[0x7E, 0x7F, 0x09, 0x01], time=0))
+    for i in range(8):
+        track.append(mido.Message('note_on', note=60 + i, velocity=100, time=0 if i == 0 else 120))
+        track.append(mido.Message('note_off', note=60 + i, velocity=0, time=240))
+    mid.tracks.append(track)
+    buf = io.BytesIO()
+    mid.save(file=buf)
+    return buf.getvalue()
+
+def with_division(data, division):
+    return data[:12] + division.to_bytes(2, 'big') + data[14:]
+
+def probe_bytes(data, tmp_path):
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    return probe_midi(tmp_path)
+
+def check_malformed():
+    # Malformed input must raise MidiProbeError, never IndexError/ZeroDivisionError/...
+    print("--- Malformed files ---")
+    good = smf_bytes()
+    must_reject = {
+        "zero tempo": smf_bytes(tempo_us=0),
+        "zero division": with_division(good, 0),
+        # Track chunk claiming more bytes than the file has, cut inside the last note
+        "short track chunk": good[:-6],
+    }
+    cases = [("truncated at byte %d" % n, good[:n]) for n in range(len(good))]
+    cases += list(must_reject.items())
+
+    escaped = []
+    accepted = []
+    rejected = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = os.path.join(tmp, "case.mid")
+        for label, data in cases:
+            try:
+                probe_bytes(data, tmp_path)
+                if label in must_reject:
+                    accepted.append(label)
+            except MidiProbeError:
+                rejected += 1
+            except Exception as e:
+                escaped.append(f"{label}: {type(e).__name__}: {e}")
+        info = probe_bytes(good, tmp_path)
+
+    if escaped:
+        print(f"[FAIL] {len(escaped)} of {len(cases)} cases raised something else (e.g. {escaped[0]})")
+    else:
+        print(f"[PASS] {len(cases)} cases: {rejected} rejected with MidiProbeError, none escaped.")
+    if accepted:
+        print(f"[FAIL] Accepted malformed input: {', '.join(accepted)}")
+    else:
+        print("[PASS] Zero tempo, zero division and the short track chunk are rejected.")
+    if info['n_notes'] == 8 and info['time_signature'] == "3/4":
+        print("[PASS] The well-formed file still probes (8 notes, 3/4).")
+    else:
+        print(f"[FAIL] Well-formed file probed as {info['n_notes']} notes, {info['time_signature']}.")
+
+if __name__ == "__main__":
+    warnings.simplefilter("ignore")
+    check_malformed()
+    root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "MIDI_Library")
+    files = sorted(glob.glob(os.path.join(root, "**", "*.mid"), recursive=True))
+    if not files:
+        print(f"No MIDI files under {root}")
+    else:
+        benchmark(files)
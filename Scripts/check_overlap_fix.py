@@ -0,0 +1,102 @@
+import sys
+import os
+import io
+import copy
+import time
+import numpy as np
+import mido
+import pretty_midi
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from checker_core import find_overlap_fixes, check_overlap
+
+def fix_overlaps_iterative(pm, max_iterations=10):
+    # Previous algorithm (without file writing): regroup, re-sort and fix until stable
+    total_fixes = 0
+    for iteration in range(max_iterations):
+        fixes_this_pass = 0
+        for inst in pm.instruments:
+            if inst.is_drum: continue
+            notes_by_pitch = {}
+            for note in inst.notes:
+                notes_by_pitch.setdefault(note.pitch, []).append(note)
+            for pitch, notes in notes_by_pitch.items():
+                sorted_notes = sorted(notes, key=lambda x: x.start)
+                for i in range(len(sorted_notes) - 1):
+                    curr = sorted_notes[i]
+                    next_n = sorted_notes[i+1]
+                    if curr.end > next_n.start + 0.001:
+                        start_tick = pm.time_to_tick(next_n.start)
+                        new_end_tick = start_tick - 5
+                        if new_end_tick <= pm.time_to_tick(curr.start):
+                            new_end_tick = pm.time_to_tick(curr.start) + 1
+                        curr.end = pm.tick_to_time(int(new_end_tick))
+                        fixes_this_pass += 1
+        total_fixes += fixes_this_pass
+        if fixes_this_pass == 0:
+            break
+    return total_fixes
+
+def make_midi(n_notes, seed=0):
+    # Legato line with many same-pitch overlaps, a tempo change and a few same-start duplicates
+    rng = np.random.default_rng(seed)
+    # Tempo track: 120 BPM, 90 BPM from 60 s, a marker so the tick map covers every note
+    mid = mido.MidiFile(ticks_per_beat=220)
+    track = mido.MidiTrack()
+    change_tick = 120 * mid.ticks_per_beat
+    end_tick = change_tick + int((n_notes * 0.25 + 10) * 1.5 * mid.ticks_per_beat)
+    track.append(mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(120), time=0))
+    track.append(mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(90), time=change_tick))
+    track.append(mido.MetaMessage('marker', text='end', time=end_tick - change_tick))
+    mid.tracks.append(track)
+    buf = io.BytesIO()
+    mid.save(file=buf)
+    buf.seek(0)
+    pm = pretty_midi.PrettyMIDI(buf)
+    inst = pretty_midi.Instrument(0)
+    for i in range(n_notes):
+        start = i * 0.125 + rng.random() * 0.01
+        pitch = int(rng.integers(48, 56))
+        inst.notes.append(pretty_midi.Note(100, pitch, start, start + rng.random() * 1.5 + 0.05))
+        if i % 500 == 0:
+            inst.notes.append(pretty_midi.Note(90, pitch, start, start + 0.3))
+    pm.instruments.append(inst)
+    return pm
+
+def benchmark(n_notes=20000):
+    print(f"--- Benchmark: overlap fix, iterative vs single pass ({n_notes} notes) ---")
+    base = make_midi(n_notes)
+    old_pm = copy.deepcopy(base)
+    new_pm = copy.deepcopy(base)
+    
+    import warnings
+    warnings.simplefilter("ignore")
+    t0 = time.perf_counter()
+    old_fixes = fix_overlaps_iterative(old_pm)
+    t_old = time.perf_counter() - t0
+    
+    t0 = time.perf_counter()
+    changes = find_overlap_fixes(new_pm)
+    for c in changes:
+        new_pm.instruments[c['instrument']].notes[c['note_index']].end = c['new_end']
+    t_new = time.perf_counter() - t0
+    
+    unresolved = sum(c['unresolved'] for c in changes)
+    print(f"Iterative:   {t_old * 1000:.1f} ms ({old_fixes} fixes counted over all passes)")
+    print(f"Single pass: {t_new * 1000:.1f} ms ({len(changes)} notes changed, {unresolved} unresolved)")
+    
+    old_ends = np.array([n.end for n in old_pm.instruments[0].notes])
+    new_ends = np.array([n.end for n in new_pm.instruments[0].notes])
+    if np.array_equal(old_ends, new_ends):
+        print("[PASS] Identical note ends.")
+    else:
+        print(f"[FAIL] {np.count_nonzero(old_ends != new_ends)} notes differ.")
+    if check_overlap(new_pm) == (unresolved > 0):
+        print("[PASS] check_overlap agrees with unresolved count.")
+    else:
+        print("[FAIL] check_overlap disagrees.")
+
+if __name__ == "__main__":
+    benchmark(2000)
+    benchmark()
@@ -0,0 +1,169 @@
+import sys
+import os
+import io
+import time
+import mido
+import pretty_midi
+
+# Add project root and module dir to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(project_root, 'EnsembleGenerator'))
+
+from style_strategies import load_style_catalog, compile_style_program, ExternalStyleStrategy, INTERVAL_RULES
+from utils import get_tempo_map
+
+class LegacyExternalStyle:
+    """
+    ExternalStyleStrategy.apply as it was before StyleProgram (walks INTERVAL_RULES
+    per note, reads the raw catalog rows). Kept here as the reference output.
+    """
+    def __init__(self, voices_data):
+        self.voices = {}
+        for row in voices_data:
+            voice = self.voices.setdefault(row['voice'], {'seq': [], 'gate': [], 'vel': [], 'swing': 0.0})
+            if row['type'] == 'seq':
+                voice['seq'] = row['data']
+                voice['swing'] = row['swing']
+            elif row['type'] in ('gate', 'vel'):
+                voice[row['type']] = row['data']
+
+    def _detect_chord_type(self, chord_notes, root_pitch):
+        return ExternalStyleStrategy._detect_chord_type(self, chord_notes, root_pitch)
+
+    def _get_pitch_from_step(self, step_val, root_pitch, chord_type):
+        if root_pitch is None: return 60
+        rule = INTERVAL_RULES.get(chord_type, INTERVAL_RULES["Default"])
+        current_pitch = root_pitch + 12
+        for idx in range(max(0, step_val)):
+            current_pitch += rule[idx % len(rule)]
+        return current_pitch
+
+    def apply(self, chord_notes, bass_note, velocity_scale=1.0, midi_data=None, root_pitch=None):
+        if not chord_notes: return []
+        all_notes = []
+        base_start = bass_note.start
+        end = bass_note.end
+        bpm = get_tempo_map(midi_data).bpm_at(base_start) if midi_data else 120.0
+        step_dur = 60.0 / bpm / 4.0
+        global_step_offset = int(round(base_start / step_dur))
+        loop_steps = int((end - base_start) / step_dur) + 2
+        chord_type = self._detect_chord_type(chord_notes, root_pitch)
+
+        for voice_data in self.voices.values():
+            sequence = voice_data['seq']
+            gate_data = voice_data['gate']
+            vel_data = voice_data['vel']
+            seq_len = len(sequence)
+            if seq_len == 0: continue
+            for i in range(loop_steps):
+                abs_step_idx = global_step_offset + i
+                grid_onset = abs_step_idx * step_dur
+                if grid_onset < base_start - 0.01: continue
+                if grid_onset >= end - 0.01: break
+                seq_idx = abs_step_idx % seq_len
+                seq_val_str = sequence[seq_idx]
+                gate = gate_data[seq_idx] if seq_idx < len(gate_data) else 1.0
+                vel_mult = vel_data[seq_idx] if seq_idx < len(vel_data) else 1.0
+                timing_offset = voice_data['swing'] * step_dur if abs_step_idx % 2 == 1 else 0.0
+                if str(seq_val_str) in ('-1', ''): continue
+
+                val_clean = str(seq_val_str).replace('&', ',').replace('+', ',').replace(' ', ',')
+                strum_idx = 0
+                for idx_str in [s.strip() for s in val_clean.split(',') if s.strip()]:
+                    try:
+                        final_pitch = self._get_pitch_from_step(int(float(idx_str)), root_pitch, chord_type)
+                        onset = grid_onset + timing_offset + strum_idx * 0.005
+                        if onset < end:
+                            duration = step_dur * gate
+                            if duration > 0.001:
+                                vel = max(1, min(127, int(bass_note.velocity * velocity_scale * vel_mult)))
+                                all_notes.append(pretty_midi.Note(velocity=vel, pitch=final_pitch, start=onset, end=onset + duration))
+                        strum_idx += 1
+                    except ValueError:
+                        pass
+        return all_notes
+
+# Chords covering every INTERVAL_RULES entry the detector can return
+COMPARE_CHORDS = [
+    ([48, 52, 55], 36), ([48, 51, 55], 36), ([48, 52, 55, 59], 36), ([45, 48, 52, 55], 33),
+    ([43, 47, 50, 53], 31), ([47, 50, 53, 56], 35), ([48, 52, 56], 36), ([48, 52, 55, 59, 62], 36),
+    ([45, 48, 52, 55, 59], 33), ([43, 47, 50, 53, 57], 31), ([43, 47, 50, 53, 56], 31),
+    ([45, 48, 52, 55, 62], 33), ([47, 50, 53, 57, 64], 35), ([48, 50, 53], 36),
+]
+
+def tempo_change_midi():
+    # 96 BPM, 140 BPM from beat 6 (3.75 s)
+    mid = mido.MidiFile(ticks_per_beat=480)
+    track = mido.MidiTrack()
+    track.append(mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(96), time=0))
+    track.append(mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(140), time=480 * 6))
+    mid.tracks.append(track)
+    buf = io.BytesIO()
+    mid.save(file=buf)
+    buf.seek(0)
+    return pretty_midi.PrettyMIDI(buf)
+
+def note_key(note):
+    return (note.pitch, note.velocity, note.start, note.end)
+
+def compare_outputs(catalog):
+    """Compiled apply() vs the legacy apply() on a fixed input set, every style."""
+    print(f"--- Compare: StyleProgram vs legacy apply ({len(catalog)} styles) ---")
+    midis = [None, pretty_midi.PrettyMIDI(initial_tempo=120), tempo_change_midi()]
+    bass_notes = [pretty_midi.Note(100, 36, 0.0, 2.0), pretty_midi.Note(90, 36, 1.37, 2.61),
+                  pretty_midi.Note(110, 36, 3.9, 6.2), pretty_midi.Note(64, 36, 7.03, 7.21)]
+
+    failed = []
+    n_notes = 0
+    for name, rows in catalog.items():
+        legacy = LegacyExternalStyle(rows)
+        compiled = ExternalStyleStrategy(compile_style_program(rows))
+        for midi_data in midis:
+            for chord, root in COMPARE_CHORDS:
+                for bass in bass_notes:
+                    for scale in (1.0, 0.7):
+                        expected = [note_key(n) for n in legacy.apply(chord, bass, scale, midi_data, root_pitch=root)]
+                        got = [note_key(n) for n in compiled.apply(chord, bass, scale, midi_data, root_pitch=root)]
+                        n_notes += len(expected)
+                        if expected != got and name not in failed:
+                            failed.append(name)
+    if failed:
+        print(f"[FAIL] Output differs for: {', '.join(failed)}")
+    else:
+        print(f"[PASS] All {len(catalog)} styles match the legacy apply ({n_notes} notes).")
+    return not failed
+
+def benchmark_apply(bars=64):
+    catalog = load_style_catalog(os.path.join(project_root, "EnsembleGenerator", "ensemble_styles.xlsx"))
+    if not catalog:
+        print("[FAIL] Style catalog not loaded.")
+        return
+    compare_outputs(catalog)
+    
+    print(f"--- Benchmark: ExternalStyleStrategy.apply ({bars} bars of 8th-note bass) ---")
+    t0 = time.perf_counter()
+    programs = {name: compile_style_program(rows) for name, rows in catalog.items()}
+    t_compile = time.perf_counter() - t0
+    print(f"Compiled {len(programs)} styles in {t_compile * 1000:.2f} ms")
+    
+    midi_data = pretty_midi.PrettyMIDI(initial_tempo=120)
+    bass_notes = [pretty_midi.Note(100, 36, i * 0.25, i * 0.25 + 0.25) for i in range(bars * 8)]
+    chord = [48, 52, 55, 59] # CM7
+    
+    total_notes = 0
+    t0 = time.perf_counter()
+    for name, program in programs.items():
+        strategy = ExternalStyleStrategy(program)
+        for note in bass_notes:
+            total_notes += len(strategy.apply(chord, note, 0.9, midi_data, root_pitch=36))
+    elapsed = time.perf_counter() - t0
+    
+    calls = len(programs) * len(bass_notes)
+    print(f"{calls} apply() calls -> {total_notes} notes in {elapsed:.3f} s ({elapsed / calls * 1e6:.1f} us/call)")
+    if total_notes > 0:
+        print("[PASS] Styles produced notes.")
+    else:
+        print("[FAIL] No notes generated.")
+
+if __name__ == "__main__":
+    benchmark_apply()
@@ -0,0 +1,358 @@
+import os
+import sys
+import json
+import shutil
+import pathlib
+import concurrent.futures as cf
+import numpy as np
+import pretty_midi
+from file_signature import file_sha1, stat_signature, is_unchanged
+from checker_rules import run_rules, format_issues, rule_names, OVERLAP_TOLERANCE
+
+# Shared note array lives in EnsembleGenerator
+ensemble_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "EnsembleGenerator")
+if ensemble_dir not in sys.path:
+    sys.path.append(ensemble_dir)
+from note_array import instrument_notes, sorted_notes
+
+CHECK_CACHE_VERSION = 4
+REPORT_COLUMNS = ["RelativePath", "HasOverlap", "Issues", "Duration_ms", "Status"]
+
+FIX_GAP_TICKS = 5
+
+
+def times_to_ticks(pm, times):
+    """
+    Vectorized pm.time_to_tick: nearest tick (ties to the later tick) on the tempo map
+    from pm.get_tempo_changes(), extrapolated with the last tempo.
+    """
+    change_times, tempi = pm.get_tempo_changes()
+    scales = 60.0 / (tempi * pm.resolution) # Seconds per tick
+    change_ticks = np.array([pm.time_to_tick(t) for t in change_times], dtype=np.int64)
+
+    def tick_time(ticks):
+        seg = np.maximum(np.searchsorted(change_ticks, ticks, side="right") - 1, 0)
+        return change_times[seg] + scales[seg] * (ticks - change_ticks[seg])
+
+    times = np.asarray(times, dtype=float)
+    seg = np.maximum(np.searchsorted(change_times, times, side="right") - 1, 0)
+    lower = np.floor(change_ticks[seg] + (times - change_times[seg]) / scales[seg]).astype(np.int64)
+    prev_closer = np.abs(times - tick_time(lower)) < np.abs(times - tick_time(lower + 1))
+    return np.maximum(np.where(prev_closer, lower, lower + 1), 0)
+
+
+def _pitch_sorted(inst):
+    """Notes of inst sorted by (pitch, start) - stable, like sorting each pitch group by start."""
+    notes = instrument_notes(inst)
+    starts, ends = notes['start'], notes['end']
+    order = sorted_notes(notes, 'pitch', 'start')['index']
+    pitches = notes['pitch']
+    # curr/next index pairs of consecutive notes with the same pitch
+    same = pitches[order[1:]] == pitches[order[:-1]]
+    return starts, ends, order[:-1][same], order[1:][same]
+
+
+def find_overlap_fixes(pm):
+    """
+    Single pass over every non-drum track: each note that runs into the next note of the
+    same pitch is cut to end FIX_GAP_TICKS ticks before that note starts (at least 1 tick
+    long). Notes are sorted once by pitch/start and only overlapping notes are converted
+    to ticks. The rule only ever shortens a note, so one pass reaches the state the old
+    repeat-until-stable loop converged to.
+
+    Returns a list of changes (not yet applied):
+      {'instrument', 'note_index', 'pitch', 'start', 'old_end', 'new_end', 'unresolved'}
+    unresolved: the next note starts within a tick of this one, so it still overlaps.
+    """
+    changes = []
+    for inst_idx, inst in enumerate(pm.instruments):
+        if inst.is_drum or len(inst.notes) < 2:
+            continue
+        starts, ends, curr, nxt = _pitch_sorted(inst)
+        hit = ends[curr] > starts[nxt] + OVERLAP_TOLERANCE
+        if not hit.any():
+            continue
+        curr, nxt = curr[hit], nxt[hit]
+
+        start_ticks = times_to_ticks(pm, starts[curr])
+        new_end_ticks = times_to_ticks(pm, starts[nxt]) - FIX_GAP_TICKS
+        too_short = new_end_ticks <= start_ticks
+        new_end_ticks[too_short] = start_ticks[too_short] + 1
+        new_ends = np.array([pm.tick_to_time(int(t)) for t in new_end_ticks]) # Only the overlapping notes
+        unresolved = new_ends > starts[nxt] + OVERLAP_TOLERANCE
+
+        for c, new_end, bad in zip(curr, new_ends, unresolved):
+            note = inst.notes[c]
+            changes.append({
+                'instrument': inst_idx,
+                'note_index': int(c),
+                'pitch': note.pitch,
+                'start': note.start,
+                'old_end': note.end,
+                'new_end': float(new_end),
+                'unresolved': bool(bad)
+            })
+    return changes
+
+
+def fix_overlaps(pm, file_path, log=print):
+    """
+    Fixes overlaps by shortening prev note to end 5 ticks before the next one
+    (see find_overlap_fixes).
+    Saves the file (keeping a .bak backup) and returns the list of changes.
+    """
+    changes = find_overlap_fixes(pm)
+    for change in changes:
+        pm.instruments[change['instrument']].notes[change['note_index']].end = change['new_end']
+
+    if changes:
+        # Create Backup
+        backup_path = str(file_path) + ".bak"
+        if not os.path.exists(backup_path):
+            shutil.copy2(file_path, backup_path)
+
+        # Save
+        try:
+            pm.write(str(file_path))
+        except Exception as e:
+            log(f"Error saving fixed file {file_path}: {e}")
+
+    return changes
+
+
+def check_overlap(pm):
+    """True if any non-drum note runs into the next note of the same pitch."""
+    for inst in pm.instruments:
+        if inst.is_drum or len(inst.notes) < 2:
+            continue
+        starts, ends, curr, nxt = _pitch_sorted(inst)
+        # If current note ends after next note starts -> Overlap
+        if np.any(ends[curr] > starts[nxt] + OVERLAP_TOLERANCE):
+            return True
+    return False
+
+
+def check_file(file_path, rel_path, auto_fix=False, rules=None):
+    """
+    Checks (and optionally fixes) one MIDI file. Runs in worker processes, so it
+    returns log lines in result['_log'] instead of emitting them.
+    rules: checker_rules names to run (default: all registered rules).
+    """
+    messages = []
+    status = "OK"
+
+    try:
+        # Load MIDI
+        pm = pretty_midi.PrettyMIDI(str(file_path))
+
+        # Auto-Fix
+        if auto_fix:
+            changes = fix_overlaps(pm, file_path, log=messages.append)
+            if changes:
+                status = f"Fixed ({len(changes)} overlaps)"
+                messages.append(f"Fixed {len(changes)} overlaps in {rel_path}")
+                unresolved = [c for c in changes if c['unresolved']]
+                if unresolved:
+                    starts = ", ".join(f"{c['start']:.3f}s" for c in unresolved[:5])
+                    messages.append(f"  {len(unresolved)} overlaps in {rel_path} remain (same-start notes at {starts})")
+
+        # 1. Rule Checks (Post-Fix), one shared note table
+        findings = run_rules(pm, rules)
+        if "overlaps" in findings:
+            is_overlap = bool(findings["overlaps"])
+        else:
+            is_overlap = check_overlap(pm)
+        issues = format_issues({k: v for k, v in findings.items() if k != "overlaps"})
+
+        # 2. Duration (ms)
+        duration_sec = pm.get_end_time()
+        duration_ms = int(duration_sec * 1000)
+
+        result = {
+            "RelativePath": str(rel_path),
+            "HasOverlap": is_overlap,
+            "Issues": issues,
+            "Duration_ms": duration_ms,
+            "Status": status
+        }
+
+    except Exception as e:
+        messages.append(f"Error processing {rel_path}: {e}")
+        result = {
+            "RelativePath": str(rel_path),
+            "HasOverlap": "Error",
+            "Issues": "",
+            "Duration_ms": 0,
+            "Status": f"Error: {e}"
+        }
+
+    result["_log"] = messages
+    return result
+
+
+def _check_file_task(args):
+    return check_file(*args)
+
+
+class CheckCache:
+    """
+    Previous results per relative path with the file's size/mtime/hash, stored as
+    <folder>_check.cache.json next to the report. A file whose signature still
+    matches is not loaded again.
+    """
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CHECK_CACHE_VERSION:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, file_path, rel_path, auto_fix, rules):
+        entry = self.entries.get(rel_path)
+        if entry is not None and entry.get('rules') != list(rules):
+            return None # Checked with a different rule set
+        try:
+            mtime_before = entry.get('mtime_ns') if entry else None
+            if not is_unchanged(file_path, entry):
+                return None
+            self.dirty |= entry.get('mtime_ns') != mtime_before # Touched but same content
+        except OSError:
+            return None
+        result = entry['result']
+        if auto_fix and result.get("HasOverlap") is True:
+            return None # Needs fixing
+        return dict(result, _log=[])
+
+    def store(self, file_path, rel_path, result, rules):
+        # State of the file as it is now (after any fix): a fixed file checks OK next time
+        try:
+            size, mtime_ns = stat_signature(file_path)
+            content_hash = file_sha1(file_path)
+        except OSError:
+            return
+        cached = {k: v for k, v in result.items() if not k.startswith("_")}
+        if str(cached.get("Status", "")).startswith("Fixed"):
+            cached["Status"] = "OK"
+        self.entries[rel_path] = {'size': size, 'mtime_ns': mtime_ns, 'hash': content_hash,
+                                  'rules': list(rules), 'result': cached}
+        self.dirty = True
+
+    def save(self, valid_paths=None):
+        if valid_paths is not None:
+            stale = set(self.entries) - set(valid_paths)
+            for rel_path in stale:
+                del self.entries[rel_path]
+            self.dirty |= bool(stale)
+        if not self.dirty:
+            return
+        tmp_path = str(self.cache_path) + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CHECK_CACHE_VERSION, 'entries': self.entries}, f)
+            os.replace(tmp_path, self.cache_path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Warning: Could not save check cache {self.cache_path}: {e}")
+
+
+def report_paths(target_folder):
+    """(<folder>_check.xlsx, <folder>_check.cache.json) next to the target folder."""
+    target_path = pathlib.Path(target_folder)
+    return (target_path.parent / f"{target_path.name}_check.xlsx",
+            target_path.parent / f"{target_path.name}_check.cache.json")
+
+
+def iter_check_folder(target_folder, auto_fix=False, jobs=None,
+                      use_cache=True, should_stop=None, log=print, rules=None):
+    """
+    Checks every *.mid under target_folder and yields (index, total, result) as results
+    arrive (cached results first, then in completion order). index is the file's
+    position in the scan, so callers can restore the original order.
+
+    Files run on a process pool (jobs workers, default CPU count) with at most
+    jobs * 4 files in flight; jobs=1 runs in this process.
+    should_stop() is polled between results; when it returns True the remaining
+    work is cancelled.
+    rules: checker_rules names to run (default: all); cached results are only
+    reused if they were produced by the same rule set.
+    """
+    target_path = pathlib.Path(target_folder)
+    midi_files = list(target_path.rglob("*.mid"))
+    total = len(midi_files)
+    if not midi_files:
+        log("No MIDI files found.")
+        return
+    log(f"Found {total} MIDI files.")
+
+    should_stop = should_stop or (lambda: False)
+    rules = list(rules or rule_names())
+    cache = CheckCache(report_paths(target_folder)[1]) if use_cache else None
+    rel_paths = [str(f.relative_to(target_path)) for f in midi_files]
+
+    todo = []
+    reused = 0
+    for index, (midi_file, rel_path) in enumerate(zip(midi_files, rel_paths)):
+        cached = cache.lookup(midi_file, rel_path, auto_fix, rules) if cache else None
+        if cached is not None:
+            reused += 1
+            yield index, total, cached
+        else:
+            todo.append(index)
+    if reused:
+        log(f"Reused {reused} unchanged results from the previous check.")
+
+    def finish(index, result):
+        if cache is not None:
+            cache.store(midi_files[index], rel_paths[index], result, rules)
+        return index, total, result
+
+    try:
+        jobs = jobs or os.cpu_count() or 1
+        if jobs <= 1 or len(todo) <= 1:
+            for index in todo:
+                if should_stop():
+                    return
+                yield finish(index, check_file(midi_files[index], rel_paths[index], auto_fix, rules))
+            return
+
+        max_in_flight = jobs * 4
+        pending = iter(todo)
+        with cf.ProcessPoolExecutor(max_workers=jobs) as pool:
+            in_flight = {}
+
+            def submit_next():
+                index = next(pending, None)
+                if index is not None:
+                    args = (midi_files[index], rel_paths[index], auto_fix, rules)
+                    in_flight[pool.submit(_check_file_task, args)] = index
+
+            for _ in range(max_in_flight):
+                submit_next()
+
+            while in_flight:
+                done, _ = cf.wait(in_flight, timeout=0.2, return_when=cf.FIRST_COMPLETED)
+                if should_stop():
+                    for future in in_flight:
+                        future.cancel()
+                    return
+                for future in done:
+                    index = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # Worker crashed (not a MIDI error): report like a failed file
+                        result = {"RelativePath": rel_paths[index], "HasOverlap": "Error",
+                                  "Issues": "", "Duration_ms": 0, "Status": f"Error: {e}",
+                                  "_log": [f"Error processing {rel_paths[index]}: {e}"]}
+                        yield index, total, result
+                    else:
+                        yield finish(index, result)
+                    submit_next()
+    finally:
+        if cache is not None:
+            cache.save(rel_paths)
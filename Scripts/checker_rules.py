@@ -0,0 +1,230 @@
+import os
+import sys
+import numpy as np
+from instrument_config import get_pitch_range, DRUM_PITCH_RANGE, DRUM_KIT_PROGRAMS, MELODIC_TRACK_WORDS, DRUM_TRACK_WORDS
+
+# Shared note array lives in EnsembleGenerator (same lookup as MidiHandler._analyze_base)
+ensemble_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "EnsembleGenerator")
+if ensemble_dir not in sys.path:
+    sys.path.append(ensemble_dir)
+from note_array import note_array, sorted_notes
+
+OVERLAP_TOLERANCE = 0.001
+ZERO_LENGTH_SEC = 1e-6
+BAR_OVERHANG_SEC = 0.01
+TEMPO_RANGE = (20.0, 300.0)
+TEMPO_JUMP_RATIO = 2.0
+
+RULES = {} # name -> Rule, in registration order
+
+
+class Rule:
+    def __init__(self, name, func, description):
+        self.name = name
+        self.func = func
+        self.description = description
+
+
+def register_rule(name, description=""):
+    """
+    Decorator for check rules. A rule gets the file's NoteTable and returns a list of
+    issue messages (empty = pass). Rules must only read the table.
+    """
+    def decorator(func):
+        RULES[name] = Rule(name, func, description or (func.__doc__ or "").strip())
+        return func
+    return decorator
+
+
+class NoteTable:
+    """
+    All notes of a PrettyMIDI as flat arrays, sorted once by (instrument, pitch, start),
+    plus per-file data the rules share (end time, downbeats, tempo changes).
+    Built once per file; every rule reads from it.
+    """
+    def __init__(self, pm, notes=None):
+        self.pm = pm
+        self.instruments = pm.instruments
+
+        # notes: the file's NOTE_DTYPE array if the caller already has one
+        if notes is None:
+            notes = note_array(pm)
+        self.notes = sorted_notes(notes, 'track', 'pitch', 'start')
+
+        self.inst = self.notes['track'].astype(int)
+        self.note_index = self.notes['index'].astype(int)
+        self.pitch = self.notes['pitch'].astype(int)
+        self.start = self.notes['start']
+        self.end = self.notes['end']
+        self.velocity = self.notes['velocity'].astype(int)
+
+        is_drum = np.array([inst.is_drum for inst in pm.instruments], dtype=bool)
+        program = np.array([inst.program for inst in pm.instruments], dtype=int)
+        self.is_drum = is_drum[self.inst] if len(is_drum) else np.zeros(0, dtype=bool)
+        self.program = program[self.inst] if len(program) else np.zeros(0, dtype=int)
+
+        # Consecutive notes of the same pitch on the same track (curr, next)
+        same = (self.inst[1:] == self.inst[:-1]) & (self.pitch[1:] == self.pitch[:-1])
+        self.pair_curr = np.flatnonzero(same)
+        self.pair_next = self.pair_curr + 1
+
+        self._end_time = None
+        self._downbeats = None
+        self._tempo_changes = None
+
+    def __len__(self):
+        return len(self.pitch)
+
+    @property
+    def end_time(self):
+        if self._end_time is None:
+            self._end_time = self.pm.get_end_time()
+        return self._end_time
+
+    @property
+    def downbeats(self):
+        if self._downbeats is None:
+            self._downbeats = self.pm.get_downbeats()
+        return self._downbeats
+
+    @property
+    def tempo_changes(self):
+        if self._tempo_changes is None:
+            self._tempo_changes = self.pm.get_tempo_changes()
+        return self._tempo_changes
+
+    def describe(self, idx):
+        return f"pitch {self.pitch[idx]} at {self.start[idx]:.3f}s (track {self.inst[idx]})"
+
+
+def _summarize(table, mask, what, limit=3):
+    idx = np.flatnonzero(mask)
+    if len(idx) == 0:
+        return []
+    examples = ", ".join(table.describe(i) for i in idx[:limit])
+    more = f" (+{len(idx) - limit} more)" if len(idx) > limit else ""
+    return [f"{len(idx)} {what}: {examples}{more}"]
+
+
+@register_rule("overlaps", "Same-pitch notes on a track that overlap (non-drum)")
+def rule_overlaps(table):
+    c, n = table.pair_curr, table.pair_next
+    hit = (table.end[c] > table.start[n] + OVERLAP_TOLERANCE) & ~table.is_drum[c]
+    mask = np.zeros(len(table), dtype=bool)
+    mask[c[hit]] = True
+    return _summarize(table, mask, "overlapping notes")
+
+
+@register_rule("zero_length", "Notes whose end is not after their start")
+def rule_zero_length(table):
+    return _summarize(table, table.end - table.start <= ZERO_LENGTH_SEC, "zero-length notes")
+
+
+@register_rule("beyond_bar_count", "Notes running past the last whole bar of the clip")
+def rule_beyond_bar_count(table, expected_bars=None):
+    downbeats = np.asarray(table.downbeats, dtype=float)
+    if len(table) == 0 or len(downbeats) == 0:
+        return []
+    # Bar line times, extrapolated with the last bar length
+    bar_len = downbeats[-1] - downbeats[-2] if len(downbeats) > 1 else 2.0
+    if bar_len <= 0:
+        return []
+    extra = int(np.ceil(max(0.0, table.end_time - downbeats[-1]) / bar_len)) + 2
+    bar_lines = np.concatenate([downbeats, downbeats[-1] + bar_len * np.arange(1, extra + 1)])
+
+    if expected_bars is None:
+        # Clip length as the library counts it: end time rounded to whole bars
+        position = np.interp(table.end_time, bar_lines, np.arange(len(bar_lines)))
+        expected_bars = max(1, int(round(position)))
+    expected_bars = min(int(expected_bars), len(bar_lines) - 1)
+    clip_end = bar_lines[expected_bars]
+    return _summarize(table, table.end > clip_end + BAR_OVERHANG_SEC, f"notes beyond bar {expected_bars}")
+
+
+@register_rule("tempo_anomalies", "Extreme tempi, duplicate tempo events and sudden tempo jumps")
+def rule_tempo_anomalies(table):
+    times, bpms = table.tempo_changes
+    issues = []
+    low, high = TEMPO_RANGE
+    extreme = (bpms < low) | (bpms > high)
+    if extreme.any():
+        issues.append(f"{np.count_nonzero(extreme)} tempo events outside {low:g}-{high:g} BPM (e.g. {bpms[extreme][0]:.1f} BPM at {times[extreme][0]:.3f}s)")
+    if len(times) > 1:
+        duplicate = np.diff(times) <= 1e-6
+        if duplicate.any():
+            issues.append(f"{np.count_nonzero(duplicate)} duplicate tempo events at the same time")
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = bpms[1:] / bpms[:-1]
+        jump = (ratio > TEMPO_JUMP_RATIO) | (ratio < 1.0 / TEMPO_JUMP_RATIO)
+        if jump.any():
+            k = np.flatnonzero(jump)[0]
+            issues.append(f"{np.count_nonzero(jump)} tempo jumps over x{TEMPO_JUMP_RATIO:g} (e.g. {bpms[k]:.1f} -> {bpms[k + 1]:.1f} BPM at {times[k + 1]:.3f}s)")
+    return issues
+
+
+@register_rule("out_of_range_pitch", "Pitches outside the playable range of the track's GM instrument")
+def rule_out_of_range_pitch(table):
+    issues = []
+    for inst_idx, inst in enumerate(table.instruments):
+        if inst.is_drum:
+            continue
+        low, high = get_pitch_range(inst.program)
+        on_track = table.inst == inst_idx
+        mask = on_track & ((table.pitch < low) | (table.pitch > high))
+        issues += _summarize(table, mask, f"notes outside {low}-{high} for program {inst.program}")
+    return issues
+
+
+def _melodic_drum_reason(inst):
+    # Why a drum-channel track looks like a melodic part on the wrong channel (None = looks like drums)
+    if inst.program not in DRUM_KIT_PROGRAMS:
+        return f"melodic program {inst.program}"
+    name = (inst.name or "").lower()
+    if not any(word in name for word in DRUM_TRACK_WORDS):
+        for word in MELODIC_TRACK_WORDS:
+            if word in name:
+                return f"melodic track name '{inst.name}'"
+    return None
+
+
+@register_rule("stray_drum_channel", "Drum-channel tracks with a melodic program or name, or drum notes outside the GM kit")
+def rule_stray_drum_channel(table):
+    issues = []
+    for inst_idx, inst in enumerate(table.instruments):
+        if not inst.is_drum or not inst.notes:
+            continue
+        reason = _melodic_drum_reason(inst)
+        if reason:
+            issues.append(f"drum channel track {inst_idx} has a {reason} ({len(inst.notes)} notes)")
+    low, high = DRUM_PITCH_RANGE
+    mask = table.is_drum & ((table.pitch < low) | (table.pitch > high))
+    issues += _summarize(table, mask, f"drum notes outside the GM kit ({low}-{high})")
+    return issues
+
+
+def rule_names():
+    return list(RULES)
+
+
+def run_rules(pm, rules=None, options=None, notes=None):
+    """
+    Builds the NoteTable once and runs the selected rules (default: all).
+    options: {rule_name: {keyword: value}} passed to individual rules
+             (e.g. {'beyond_bar_count': {'expected_bars': 4}}).
+    notes: optional NOTE_DTYPE array of pm (avoids rebuilding it).
+    Returns {rule_name: [messages]} for every rule that ran.
+    """
+    table = NoteTable(pm, notes)
+    options = options or {}
+    results = {}
+    for name in (rules or RULES):
+        rule = RULES.get(name)
+        if rule is None:
+            raise KeyError(f"Unknown check rule: {name}")
+        results[name] = rule.func(table, **options.get(name, {}))
+    return results
+
+
+def format_issues(results):
+    """One-line summary for reports, e.g. 'zero_length: 2 zero-length notes: ...; tempo_anomalies: ...'."""
+    return "; ".join(f"{name}: {msg}" for name, messages in results.items() for msg in messages)
@@ -35,6 +35,13 @@ class ConfigManager:
     def get_note_colors_all(self):
         return [self.get_note_color(i) for i in range(12)]
 
+    def get_storage_backend(self):
+        # "excel" (default) or "sqlite"
+        return str(self.settings.value("Storage/Backend", "excel")).lower()
+
+    def set_storage_backend(self, backend):
+        self.settings.setValue("Storage/Backend", backend)
+
     def save_window_state(self, window):
         self.settings.setValue("Window/Geometry", window.saveGeometry())
         self.settings.setValue("Window/State", window.saveState())
@@ -2,9 +2,21 @@ import os
 import pandas as pd
 import platform
 import glob
+import json
+import pickle
+import threading
+import numpy as np
+from library_index import LibraryIndex
+from library_store import ExcelLibraryStore
+from file_signature import file_sha1, stat_signature, is_unchanged
+
+MANIFEST_VERSION = 1
+JOURNAL_SUFFIX = ".journal.jsonl"
+# add_entry compacts the journal into the host xlsx once it holds this many rows
+JOURNAL_COMPACT_THRESHOLD = 500
 
 class DataManager:
-    def __init__(self, db_path_ignored, root_dir):
+    def __init__(self, db_path_ignored, root_dir, store=None):
         # db_path is now mostly ignored or used as base pattern?
         # We will use root_dir to find library_*.xlsx
         self.root_dir = root_dir
@@ -26,6 +38,14 @@ class DataManager:
             os.makedirs(self.host_dir)
             
         self.local_db_path = os.path.join(self.host_dir, self.local_db_name)
+        # New entries are appended here and compacted into local_db_path later
+        self.journal_path = os.path.join(self.host_dir, hostname + JOURNAL_SUFFIX)
+        self._journal_count = None
+        self.master_path = os.path.join(self.root_dir, "MasterLibraly.xlsx")
+        # Per-workbook stat/hash + parsed rows for incremental integration
+        self.manifest_path = os.path.join(self.root_dir, "MasterLibraly.manifest.pkl")
+        # Where the integrated library lives (MasterLibraly.xlsx unless a SQLite store is passed)
+        self.store = store or ExcelLibraryStore(self.master_path)
         
         self.columns = [
             "FileName", "FilePath", "Category", "Instruments", 
@@ -33,7 +53,52 @@ class DataManager:
             "Root", "Group", "Comment"
         ]
         
-        self.df = self.load_db()
+        self._library_index = None
+        self._index_lock = threading.Lock() # Index may be built on the search thread
+        self._index_version = 0 # Bumped whenever the index is invalidated
+        # SQLite row_id of every self.df row while self.df mirrors the store's library;
+        # queries then run in the store (its indexes) instead of a LibraryIndex
+        self._store_rows = None
+        self._set_frame(*self._load_library())
+
+    @property
+    def df(self):
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        # Any replacement of the library frame invalidates the search index
+        with self._index_lock:
+            self._df = value
+            self._library_index = None
+            self._index_version += 1
+            self._store_rows = None # Callers that keep the frame in sync with the store set it again
+
+    @property
+    def library_index(self):
+        """LibraryIndex over self.df, rebuilt lazily after the frame changes."""
+        with self._index_lock:
+            df, index, version = self._df, self._library_index, self._index_version
+        if index is None:
+            # Built outside the lock; only kept if the frame did not change meanwhile
+            index = LibraryIndex(df)
+            with self._index_lock:
+                if self._index_version == version:
+                    self._library_index = index
+        return index
+
+    def invalidate_index(self):
+        """Call after editing self.df in place (e.g. df.loc[...] = ...)."""
+        with self._index_lock:
+            self._library_index = None
+            self._index_version += 1
+            self._store_rows = None # The edit is not in the store: query self.df from now on
+
+    def _set_frame(self, df, store_rows):
+        # df plus the store row_ids of its rows (None if df does not mirror the store)
+        self.df = df
+        if store_rows is not None and self.store.name == "sqlite":
+            self._store_rows = np.asarray(store_rows, dtype=np.int64)
 
     def load_db(self):
         # We don't load everything into self.df for the runtime "Active DB" usually?
@@ -58,102 +123,215 @@ class DataManager:
         # On Startup: self.df = MasterLibrary.xlsx (after integration)
         # On Add: Append to self.df AND Append to Local Excel.
         
-        master_path = os.path.join(self.root_dir, "MasterLibraly.xlsx")
-        if os.path.exists(master_path):
-            try:
-                df = pd.read_excel(master_path)
-                
-                # Consolidation: Merge 'Bar' into 'BAR'
-                if 'Bar' in df.columns:
-                    if 'BAR' not in df.columns:
-                        df['BAR'] = df['Bar']
-                    else:
-                        df['BAR'] = df['BAR'].fillna(df['Bar'])
-                        try:
-                             mask = (df['BAR'] == "") & (df['Bar'] != "")
-                             df.loc[mask, 'BAR'] = df.loc[mask, 'Bar']
-                        except:
-                             pass
+        return self._load_library()[0]
 
-                # Normalize BAR values (remove .0)
-                if 'BAR' in df.columns:
-                    df['BAR'] = df['BAR'].astype(str).str.replace(r'\.0$', '', regex=True).replace('nan', '')
+    def _load_library(self):
+        """(library frame, SQLite row_ids of its rows or None)"""
+        try:
+            df = self.store.load_library()
+            if df is not None:
+                row_ids = None
+                if self.store.name == "sqlite":
+                    row_ids = df.index.to_numpy() # Indexed by row_id
+                    df = df.reset_index(drop=True)
+                return self._normalize_frame(df).fillna(""), row_ids
+        except:
+            pass
+        
+        return pd.DataFrame(columns=self.columns), None
 
-                for col in self.columns:
-                    if col not in df.columns:
-                        df[col] = ""
-                return df.fillna("")
-            except:
-                pass
+    def _normalize_frame(self, df):
+        """Merges legacy 'Bar' into 'BAR', strips '.0' from BAR and adds missing columns."""
+        # Consolidation: Merge 'Bar' into 'BAR'
+        if 'Bar' in df.columns:
+            if 'BAR' not in df.columns:
+                df['BAR'] = df['Bar']
+            else:
+                df['BAR'] = df['BAR'].fillna(df['Bar'])
+                try:
+                     mask = (df['BAR'] == "") & (df['Bar'] != "")
+                     df.loc[mask, 'BAR'] = df.loc[mask, 'Bar']
+                except:
+                     pass
+
+        # Normalize BAR values (remove .0)
+        if 'BAR' in df.columns:
+            df['BAR'] = df['BAR'].astype(str).str.replace(r'\.0$', '', regex=True).replace('nan', '')
+
+        for col in self.columns:
+            if col not in df.columns:
+                df[col] = ""
+        return df
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'rb') as f:
+                manifest = pickle.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                return manifest
+        except Exception:
+            pass
+        return {'version': MANIFEST_VERSION, 'workbooks': {}, 'master': None}
+
+    def _save_manifest(self, manifest):
+        tmp_path = self.manifest_path + ".tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(manifest, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.manifest_path)
+        except Exception as e:
+            print(f"Warning: Could not save integration manifest: {e}")
+
+    @staticmethod
+    def _path_keys(df):
+        # FilePath as compared by integration (missing paths are "" in the master)
+        if 'FilePath' not in df.columns:
+            return pd.Series("", index=df.index)
+        return df['FilePath'].fillna("").astype(str)
+
+    def _master_delta(self, order, books, old_books, dirty):
+        """
+        Changes to apply to the master for re-read (dirty) and removed workbooks:
+        (affected FilePaths, their current rows). A path is affected if a dirty or
+        removed workbook had or has it; its row is re-resolved over all workbooks
+        in `order` with the same keep-last rule as a full rebuild.
+        """
+        affected = set()
+        for key in dirty:
+            affected.update(self._path_keys(books[key]['frame']))
+            if key in old_books:
+                affected.update(self._path_keys(old_books[key]['frame']))
+        for key in set(old_books) - set(books):
+            affected.update(self._path_keys(old_books[key]['frame']))
         
-        return pd.DataFrame(columns=self.columns)
+        parts = []
+        for key in order:
+            frame = books[key]['frame']
+            hits = self._path_keys(frame).isin(affected)
+            if hits.any():
+                parts.append(frame[hits])
+        if parts:
+            rows = pd.concat(parts, ignore_index=True)
+            rows = rows[~self._path_keys(rows).duplicated(keep="last")].reset_index(drop=True)
+        else:
+            rows = pd.DataFrame(columns=self.columns)
+        return affected, rows
 
     def integrate_master_db(self):
-        """Scans MIDI_Library/*/*.xlsx and creates MasterLibraly.xlsx"""
+        """
+        Scans MIDI_Library/**/*.xlsx and creates MasterLibraly.xlsx.
+        Incremental: each workbook's size/mtime/hash and parsed rows are kept in
+        MasterLibraly.manifest.pkl, so only changed workbooks are re-read. While the
+        master is the one the manifest describes, only the rows of changed/removed
+        workbooks are replaced in it (see _master_delta); otherwise it is rebuilt.
+        """
         # scan
         if not os.path.exists(self.midi_lib_path):
             return
             
-        dfs = []
+        # Fold our own pending journal into the host xlsx first
+        self.compact_local_journal()
+            
         # Glob pattern: MIDI_Library/**/*.xlsx (Recursive)
         pattern = os.path.join(self.midi_lib_path, "**", "*.xlsx")
-        files = glob.glob(pattern, recursive=True)
+        # Skip conflict files or temps
+        files = [f for f in glob.glob(pattern, recursive=True) if "~" not in f]
+        # Other hosts' uncompacted journals (newer than their xlsx, so read last)
+        journal_pattern = os.path.join(self.midi_lib_path, "**", "*" + JOURNAL_SUFFIX)
+        files += [f for f in glob.glob(journal_pattern, recursive=True) if "~" not in f]
         
         if not files:
             return
+        
+        manifest = self._load_manifest()
+        old_books = manifest['workbooks']
+        books = {}
+        changed = False
+        reread = 0
+        dirty = set() # Workbooks re-read this run
             
         for f in files:
-            # Skip conflict files or temps
-            if "~" in f: continue
+            key = os.path.relpath(f, self.root_dir)
+            entry = old_books.get(key)
             
             try:
-                d = pd.read_excel(f)
+                if is_unchanged(f, entry):
+                    books[key] = entry
+                    continue
                 
-                # Consolidation: Merge 'Bar' into 'BAR'
-                if 'Bar' in d.columns:
-                    if 'BAR' not in d.columns:
-                        d['BAR'] = d['Bar']
-                    else:
-                        d['BAR'] = d['BAR'].fillna(d['Bar'])
-                        try:
-                             mask = (d['BAR'] == "") & (d['Bar'] != "")
-                             d.loc[mask, 'BAR'] = d.loc[mask, 'Bar']
-                        except:
-                             pass
-                
-                # Normalize BAR values (remove .0)
-                if 'BAR' in d.columns:
-                    d['BAR'] = d['BAR'].astype(str).str.replace(r'\.0$', '', regex=True).replace('nan', '')
-                
-                # Normalize
-                for col in self.columns:
-                    if col not in d.columns:
-                        d[col] = ""
+                size, mtime_ns = stat_signature(f)
+                content_hash = file_sha1(f)
+                if f.endswith(JOURNAL_SUFFIX):
+                    d = self._normalize_frame(self._read_journal(f))
+                else:
+                    d = self._normalize_frame(pd.read_excel(f))
                 # Add Source Info if needed, but maybe not strictly required for Master view if paths are absolute/correct relative
                 # Ensure FilePath is usable.
                 # If they are relative to Project Root, they are fine.
-                dfs.append(d)
+                books[key] = {'size': size, 'mtime_ns': mtime_ns, 'hash': content_hash, 'frame': d}
+                changed = True
+                reread += 1
+                dirty.add(key)
             except Exception as e:
                 print(f"Error integrating {f}: {e}")
+        
+        if set(books) != set(old_books):
+            changed = True # Workbooks added or removed
+        
+        master_dest = self.master_path
+        master_intact = self.store.matches(manifest.get('master'))
+        manifest['workbooks'] = books
+        
+        if not changed and master_intact:
+            self._save_manifest(manifest) # Keeps refreshed mtimes
+            print(f"Master DB up to date ({len(books)} workbooks unchanged).")
+            return
                 
-        if dfs:
+        order = [os.path.relpath(f, self.root_dir) for f in files]
+        order = [key for key in order if key in books]
+        delta = None
+        if master_intact and old_books:
+            delta = self._master_delta(order, books, old_books, dirty)
+        
+        if delta is not None:
+            # Patch: drop every row of the affected paths, append their current winners
+            removed_paths, rows = delta
+            keep = ~self._path_keys(self.df).isin(removed_paths)
+            combined = pd.concat([self.df[keep], rows], ignore_index=True)
+        else:
+            dfs = [books[key]['frame'] for key in order]
+            if not dfs:
+                return
             combined = pd.concat(dfs, ignore_index=True)
             # Dedup? Maybe by FilePath?
             combined.drop_duplicates(subset=["FilePath"], keep="last", inplace=True)
-            
-            master_dest = os.path.join(self.root_dir, "MasterLibraly.xlsx")
-            try:
-                combined.to_excel(master_dest, index=False)
-                # Update self.df to reflect this fresh integration
-                self.df = combined.fillna("")
-                print("Master DB integrated successfully.")
-            except PermissionError:
-                print(f"Warning: Could not write to {master_dest}. File is open in Excel. Skipping integration save.")
-                # We can still use the combined data in memory if we want, or fallback?
-                # Usually better to use what we read, even if we can't save the consolidated version.
-                self.df = combined.fillna("")
-            except Exception as e:
-                 print(f"Error saving Master DB: {e}")
+        
+        try:
+            if delta is not None:
+                old_rows = self._store_rows
+                row_ids = self.store.update_library(combined, removed_paths, rows)
+                if old_rows is not None and row_ids is not None:
+                    row_ids = np.concatenate([old_rows[keep.to_numpy()], np.asarray(row_ids, dtype=np.int64)])
+                else:
+                    row_ids = None
+                print(f"Master DB updated: {len(removed_paths)} paths replaced ({reread} of {len(books)} workbooks re-read).")
+            else:
+                row_ids = self.store.save_library(combined)
+                print(f"Master DB integrated successfully ({reread} of {len(books)} workbooks re-read).")
+            manifest['master'] = self.store.fingerprint()
+            # Update self.df to reflect this fresh integration
+            self._set_frame(combined.fillna(""), row_ids)
+        except PermissionError:
+            print(f"Warning: Could not write to {master_dest}. File is open in Excel. Skipping integration save.")
+            # We can still use the combined data in memory if we want, or fallback?
+            # Usually better to use what we read, even if we can't save the consolidated version.
+            manifest['master'] = None # Force a rewrite next time
+            self.df = combined.fillna("")
+        except Exception as e:
+             print(f"Error saving Master DB: {e}")
+             manifest['master'] = None
+        
+        self._save_manifest(manifest)
 
     def save_db(self):
         # We only save NEW entries to the LOCAL DB.
@@ -164,34 +342,23 @@ class DataManager:
         # We ONLY append properly in `add_entry`.
         pass
         
-    def _append_to_local(self, row_dict):
-        # Helper to append just one row to local excel with Dropdowns
+    def _write_local_workbook(self, combined):
+        # Writes the host xlsx with Dropdowns.
+        # Built in a temp file and swapped in at the end: the host xlsx only changes
+        # if every step succeeded (a half-written one would duplicate journal rows on retry).
         import openpyxl
         from openpyxl.worksheet.datavalidation import DataValidation
         from openpyxl.utils import get_column_letter
         import ui_constants as C
         
+        # "~" keeps integration from picking up a leftover temp file
+        tmp_path = os.path.join(self.host_dir, "~" + self.local_db_name)
         try:
-            # 1. Update Data (Pandas)
-            if os.path.exists(self.local_db_path):
-                try:
-                    local_df = pd.read_excel(self.local_db_path)
-                except:
-                    local_df = pd.DataFrame(columns=self.columns)
-            else:
-                local_df = pd.DataFrame(columns=self.columns)
-            
-            new_df = pd.DataFrame([row_dict])
-            # Align columns
-            for col in self.columns:
-                if col not in new_df.columns:
-                    new_df[col] = ""
-                    
-            combined = pd.concat([local_df, new_df], ignore_index=True)
-            combined.to_excel(self.local_db_path, index=False)
+            # 1. Write Data (Pandas)
+            combined.to_excel(tmp_path, index=False)
             
             # 2. Add Validations (OpenPyXL)
-            wb = openpyxl.load_workbook(self.local_db_path)
+            wb = openpyxl.load_workbook(tmp_path)
             ws = wb.active
             
             # Helper to add validation
@@ -227,7 +394,7 @@ class DataManager:
                 # Apply to entire column (or just used range)
                 # Apply from row 2 to max_row + 100
                 ws.add_data_validation(dv)
-                dv.add(f"{col_letter}2:{col_letter}1000")
+                dv.add(f"{col_letter}2:{col_letter}{max(1000, len(combined) + 100)}")
 
             # Apply Validations
             add_dv("Root", C.KEY_LIST) # Mapped from text "Key" in user request, but column is Root? User said "Key". 
@@ -236,10 +403,85 @@ class DataManager:
             add_dv("Instruments", C.INSTRUMENT_LIST)
             add_dv("Chord", C.CHORD_LIST)
             
-            wb.save(self.local_db_path)
+            wb.save(tmp_path)
+            os.replace(tmp_path, self.local_db_path)
+            return True
             
         except Exception as e:
             print(f"Error saving to local db {self.local_db_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+
+    def _read_journal(self, journal_path):
+        rows = []
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    # Torn last line from an interrupted write
+                    print(f"Warning: Skipping broken journal line in {journal_path}")
+        return pd.DataFrame(rows)
+
+    def _append_to_local(self, row_dict):
+        # O(1) per entry: one JSON line appended to the host journal
+        try:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(row_dict, ensure_ascii=False, default=str) + "\n")
+        except Exception as e:
+            print(f"Error writing journal {self.journal_path}: {e}")
+            return
+        
+        if self._journal_count is None:
+            self._journal_count = len(self._read_journal(self.journal_path))
+        else:
+            self._journal_count += 1
+        
+        if self._journal_count >= JOURNAL_COMPACT_THRESHOLD:
+            self.compact_local_journal()
+
+    def compact_local_journal(self):
+        """
+        Materializes pending journal rows into the host xlsx (with dropdown validations)
+        and removes the journal. Called from integrate_master_db, on app close and
+        when the journal reaches JOURNAL_COMPACT_THRESHOLD rows.
+        """
+        if not os.path.exists(self.journal_path):
+            self._journal_count = 0
+            return
+        
+        pending = self._read_journal(self.journal_path)
+        if not pending.empty:
+            if os.path.exists(self.local_db_path):
+                try:
+                    local_df = pd.read_excel(self.local_db_path)
+                except:
+                    local_df = pd.DataFrame(columns=self.columns)
+            else:
+                local_df = pd.DataFrame(columns=self.columns)
+            
+            # Align columns
+            for col in self.columns:
+                if col not in pending.columns:
+                    pending[col] = ""
+            
+            combined = pd.concat([local_df, pending], ignore_index=True)
+            if not self._write_local_workbook(combined):
+                return # Keep the journal; retry on the next compaction
+            print(f"Compacted {len(pending)} journal entries into {self.local_db_name}.")
+        
+        try:
+            os.remove(self.journal_path)
+        except OSError as e:
+            print(f"Warning: Could not remove journal {self.journal_path}: {e}")
+            return
+        self._journal_count = 0
 
     def add_entry(self, metadata):
         # Ensure new entry has all columns
@@ -258,6 +500,7 @@ class DataManager:
                 row["FilePath"] = abs_path
         
         new_row_df = pd.DataFrame([row])
+        old_rows = self._store_rows
         self.df = pd.concat([self.df, new_row_df], ignore_index=True)
         # Ensure BAR is filled if Bar was somehow passed (though row construction filters it)
         # But row is constructed from self.columns, so Bar would be ignored if passed in metadata
@@ -266,6 +509,29 @@ class DataManager:
         
         # Save to local persistence
         self._append_to_local(row)
+        row_ids = self.store.append_entries([row])
+        if old_rows is not None and row_ids is not None:
+            self._set_frame(self.df, np.concatenate([old_rows, np.asarray(row_ids, dtype=np.int64)]))
+
+    def query(self, filters=None, search_text=""):
+        """
+        Returns row positions in self.df matching the radio filters (exact match)
+        and the search text (substring of FileName/Group/Comment, case-insensitive).
+        Runs in the SQLite store while self.df mirrors it, else on the LibraryIndex.
+        """
+        store_rows = self._store_rows
+        if store_rows is not None:
+            row_ids = np.asarray(self.store.query_row_ids(filters, search_text), dtype=np.int64)
+            pos = np.searchsorted(store_rows, row_ids)
+            found = pos < len(store_rows)
+            found[found] = store_rows[pos[found]] == row_ids[found]
+            return pos[found]
+        return self.library_index.query(filters, search_text)
+
+    def prepare_query(self):
+        """Builds what query() needs ahead of time (the LibraryIndex unless the store answers)."""
+        if self._store_rows is None:
+            _ = self.library_index
 
     def get_filtered_data(self, filters):
         # Return a Filtered VIEW of the DF
@@ -273,15 +539,4 @@ class DataManager:
         if self.df.empty:
             return self.df
             
-        result = self.df.copy()
-        
-        for key, value in filters.items():
-            if value and value != "No" and value != "None":
-                # Assuming exact match for now, or use str.contains?
-                # Using exact match for Radio buttons usually.
-                # Ensure column exists
-                if key in result.columns:
-                    # Filter
-                    result = result[result[key].astype(str) == value]
-        
-        return result
+        return self.df.iloc[self.query(filters)]
@@ -0,0 +1,169 @@
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None # Falls back to the NumPy KD-tree below
+
+
+class _KDTree:
+    """
+    Minimal KD-tree over a fixed point set (NumPy, no scipy needed).
+    Splits on the widest dimension at the median; leaves hold up to leaf_size points.
+    """
+    def __init__(self, points, leaf_size=16):
+        self.points = points
+        n = len(points)
+        self.perm = np.arange(n)
+        self.start, self.end = [], []
+        self.dim, self.val = [], []
+        self.left, self.right = [], []
+
+        stack = [(self._new_node(0, n), 0, n)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if hi - lo <= leaf_size:
+                continue
+            idx = self.perm[lo:hi]
+            block = points[idx]
+            dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+            mid = (hi - lo) // 2
+            order = np.argpartition(block[:, dim], mid)
+            self.perm[lo:hi] = idx[order]
+            self.dim[node] = dim
+            self.val[node] = points[self.perm[lo + mid], dim]
+            self.left[node] = self._new_node(lo, lo + mid)
+            self.right[node] = self._new_node(lo + mid, hi)
+            stack.append((self.left[node], lo, lo + mid))
+            stack.append((self.right[node], lo + mid, hi))
+
+    def _new_node(self, lo, hi):
+        self.start.append(lo)
+        self.end.append(hi)
+        self.dim.append(-1)
+        self.val.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        return len(self.start) - 1
+
+    def query(self, z, k):
+        """(squared distances, point ids) of the k nearest points, ascending."""
+        best_d = np.full(k, np.inf)
+        best_i = np.full(k, -1, dtype=np.int64)
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if bound >= best_d[-1]:
+                continue
+            dim = self.dim[node]
+            if dim < 0:
+                idx = self.perm[self.start[node]:self.end[node]]
+                d2 = ((self.points[idx] - z) ** 2).sum(axis=1)
+                all_d = np.concatenate([best_d, d2])
+                all_i = np.concatenate([best_i, idx])
+                keep = np.argsort(all_d, kind='stable')[:k]
+                best_d, best_i = all_d[keep], all_i[keep]
+                continue
+            diff = z[dim] - self.val[node]
+            near, far = (self.left[node], self.right[node]) if diff < 0 else (self.right[node], self.left[node])
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+        found = best_i >= 0
+        return best_d[found], best_i[found]
+
+
+class FeatureIndex:
+    """
+    Nearest-neighbour index over feature vectors (rows of LearningManager's FEAT_ columns).
+
+    - Vectors are z-normalized per column (std 0 -> 1) so no feature dominates by scale.
+    - Points are kept in a growable matrix; add() is O(1). New points go to a buffer that
+      is brute-forced at query time and merged into the tree once it gets large.
+    - Small sets (< BRUTE_FORCE_LIMIT) are searched brute force; larger ones with
+      scipy's cKDTree if installed, else the NumPy _KDTree.
+
+    query() distances are RMS per dimension in normalized units (dimension-independent).
+    """
+    BRUTE_FORCE_LIMIT = 2048
+    LEAF_SIZE = 16
+
+    def __init__(self, dims, vectors=None):
+        self.dims = dims
+        self.n = 0
+        self._raw = np.zeros((16, dims))
+        self._tree = None
+        self._tree_n = 0 # Points [0, _tree_n) are in the tree
+        self._mean = np.zeros(dims)
+        self._scale = np.ones(dims)
+        self._stale = True # Normalization needs recomputing
+        if vectors is not None and len(vectors):
+            self.add_many(vectors)
+
+    def _reserve(self, n):
+        if n > len(self._raw):
+            grown = np.zeros((max(n, len(self._raw) * 2), self.dims))
+            grown[:self.n] = self._raw[:self.n]
+            self._raw = grown
+
+    def add_many(self, vectors):
+        vectors = np.asarray(vectors, dtype=float).reshape(-1, self.dims)
+        self._reserve(self.n + len(vectors))
+        self._raw[self.n:self.n + len(vectors)] = vectors
+        self.n += len(vectors)
+        self._stale = True
+
+    def add(self, vector):
+        """Adds one vector and returns its row id."""
+        self._reserve(self.n + 1)
+        self._raw[self.n] = vector
+        self.n += 1
+        if self.n <= self.BRUTE_FORCE_LIMIT:
+            self._stale = True # Cheap to renormalize; keeps stats exact for small sets
+        return self.n - 1
+
+    @property
+    def vectors(self):
+        return self._raw[:self.n]
+
+    def _rebuild(self):
+        points = self._raw[:self.n]
+        self._mean = points.mean(axis=0) if self.n else np.zeros(self.dims)
+        std = points.std(axis=0) if self.n else np.ones(self.dims)
+        self._scale = np.where(std > 1e-12, std, 1.0)
+        self._tree = None
+        self._tree_n = 0
+        if self.n >= self.BRUTE_FORCE_LIMIT:
+            z = (points - self._mean) / self._scale
+            self._tree = cKDTree(z, leafsize=self.LEAF_SIZE) if cKDTree is not None else _KDTree(z, self.LEAF_SIZE)
+            self._tree_n = self.n
+        self._stale = False
+
+    def query(self, vector, k=1):
+        """(distances, row ids) of the k nearest vectors, nearest first."""
+        if self.n == 0 or self.dims == 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        # Merge the insertion buffer once it is a sizeable fraction of the tree
+        if self._stale or (self.n - self._tree_n) > max(256, self._tree_n // 8):
+            self._rebuild()
+
+        z = (np.asarray(vector, dtype=float) - self._mean) / self._scale
+        k = min(k, self.n)
+
+        if self._tree is not None:
+            if cKDTree is not None and isinstance(self._tree, cKDTree):
+                d, i = self._tree.query(z, k=k)
+                d2, ids = np.atleast_1d(d) ** 2, np.atleast_1d(i).astype(np.int64)
+            else:
+                d2, ids = self._tree.query(z, k)
+        else:
+            d2, ids = np.empty(0), np.empty(0, dtype=np.int64)
+
+        # Brute force the buffer (everything, when there is no tree)
+        if self._tree_n < self.n:
+            buf = (self._raw[self._tree_n:self.n] - self._mean) / self._scale
+            buf_d2 = ((buf - z) ** 2).sum(axis=1)
+            d2 = np.concatenate([d2, buf_d2])
+            ids = np.concatenate([ids, np.arange(self._tree_n, self.n)])
+
+        order = np.argsort(d2, kind='stable')[:k]
+        return np.sqrt(d2[order] / self.dims), ids[order]
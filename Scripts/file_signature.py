@@ -0,0 +1,31 @@
+import os
+import sys
+
+# file_sha1 is shared with EnsembleGenerator (style catalog cache)
+ensemble_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "EnsembleGenerator")
+if ensemble_dir not in sys.path:
+    sys.path.append(ensemble_dir)
+from utils import file_sha1
+
+def stat_signature(file_path):
+    """(size, mtime_ns) of a file; cheap first check before hashing."""
+    st = os.stat(file_path)
+    return st.st_size, st.st_mtime_ns
+
+def is_unchanged(file_path, entry):
+    """
+    True if file_path still matches a recorded entry {'size', 'mtime_ns', 'hash'}.
+    Size/mtime equality is trusted; otherwise the content hash decides and the
+    entry's size/mtime are refreshed in place on a match.
+    """
+    if not entry:
+        return False
+    size, mtime_ns = stat_signature(file_path)
+    if entry.get('size') == size and entry.get('mtime_ns') == mtime_ns:
+        return True
+    if entry.get('size') != size:
+        return False
+    if entry.get('hash') == file_sha1(file_path):
+        entry['mtime_ns'] = mtime_ns
+        return True
+    return False
@@ -152,3 +152,67 @@ def get_program_number(name):
             return v
             
     return 0 # Default Piano
+
+# Playable pitch range (MIDI note numbers) per GM program, used by the MIDI checker.
+# Families of 8 programs share a range unless listed in PROGRAM_PITCH_RANGES.
+PROGRAM_FAMILY_RANGES = [
+    # (first_program, last_program, low, high)
+    (0, 7, 21, 108),     # Piano
+    (8, 15, 36, 108),    # Chromatic Percussion
+    (16, 23, 24, 108),   # Organ
+    (24, 31, 40, 88),    # Guitar
+    (32, 39, 23, 67),    # Bass
+    (40, 47, 28, 103),   # Strings
+    (48, 55, 28, 103),   # Ensemble
+    (56, 63, 28, 86),    # Brass
+    (64, 71, 34, 94),    # Reed
+    (72, 79, 55, 108),   # Pipe
+    (80, 103, 21, 108),  # Synth Lead / Pad / FX
+    (104, 111, 36, 96),  # Ethnic
+    (112, 127, 0, 127),  # Percussive / Sound Effects
+]
+
+PROGRAM_PITCH_RANGES = {
+    38: (24, 72), 39: (24, 72),    # Synth Bass
+    40: (55, 103),                  # Violin
+    41: (48, 91),                   # Viola
+    42: (36, 76),                   # Cello
+    43: (28, 67),                   # Contrabass
+    46: (23, 103),                  # Orchestral Harp
+    47: (40, 57),                   # Timpani
+    56: (54, 86), 59: (54, 86),     # Trumpet
+    57: (40, 72),                   # Trombone
+    58: (28, 58),                   # Tuba
+    60: (34, 77),                   # French Horn
+    62: (24, 96), 63: (24, 96),     # SynthBrass
+    64: (56, 88),                   # Soprano Sax
+    65: (49, 81),                   # Alto Sax
+    66: (44, 76),                   # Tenor Sax
+    67: (36, 69),                   # Baritone Sax
+    68: (58, 91),                   # Oboe
+    69: (52, 81),                   # English Horn
+    70: (34, 75),                   # Bassoon
+    71: (50, 94),                   # Clarinet
+    72: (74, 108),                  # Piccolo
+}
+
+# GM percussion key map (channel 10) covers these notes (GM2 range)
+DRUM_PITCH_RANGE = (27, 87)
+
+# Program changes on channel 10 select a kit; these are the GM2 kit numbers
+DRUM_KIT_PROGRAMS = {0, 8, 16, 24, 25, 32, 40, 48, 56, 127}
+
+# Track-name words that mark a melodic part (drum names like "Synth Drum" are excluded by the checker)
+MELODIC_TRACK_WORDS = ("piano", "keys", "organ", "guitar", "bass", "string", "violin", "viola",
+                       "cello", "brass", "trumpet", "trombone", "horn", "sax", "flute", "clarinet",
+                       "oboe", "lead", "pad", "melody", "vocal", "choir")
+DRUM_TRACK_WORDS = ("drum", "kit", "perc")
+
+def get_pitch_range(program):
+    """(low, high) playable MIDI pitch for a GM program number (0-127)."""
+    if program in PROGRAM_PITCH_RANGES:
+        return PROGRAM_PITCH_RANGES[program]
+    for first, last, low, high in PROGRAM_FAMILY_RANGES:
+        if first <= program <= last:
+            return (low, high)
+    return (0, 127)
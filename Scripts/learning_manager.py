@@ -2,14 +2,49 @@ import os
 import pandas as pd
 import numpy as np
 import shutil
+import atexit
+import threading
 from datetime import datetime
+from library_store import ExcelLibraryStore
+from feature_index import FeatureIndex
+
+# Write-behind: pending samples are written once this many are queued, or after the delay
+FLUSH_BATCH_SIZE = 20
+FLUSH_DELAY_SEC = 5.0
+
+# Feature-based prediction: weighted vote of the k nearest samples, skipped when even the
+# nearest one is farther than PREDICT_MAX_DISTANCE (RMS per feature, in std units)
+PREDICT_NEIGHBORS = 5
+PREDICT_MAX_DISTANCE = 3.0
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def get_learning_manager(learning_file_path=None, store=None):
+    """Process-wide LearningManager for a learning file / store (created on first use)."""
+    key = (os.path.abspath(learning_file_path) if learning_file_path else None, store)
+    with _instances_lock:
+        lm = _instances.get(key)
+        if lm is None:
+            lm = LearningManager(learning_file_path, store)
+            _instances[key] = lm
+        return lm
+
+def flush_all():
+    """Writes pending samples of every shared LearningManager (called at exit)."""
+    for lm in list(_instances.values()):
+        lm.flush()
+
+atexit.register(flush_all)
 
 class LearningManager:
     """
     Centralized manager for AI Learning (Read/Write to Excel).
     Replaces MidiPredictor and duplicated logic in midi_utils/style_trainer.
+    Use get_learning_manager() to share one instance; samples are kept in memory
+    (FEAT_ values in a FeatureIndex) and written to the store in batches.
     """
-    def __init__(self, learning_file_path=None):
+    def __init__(self, learning_file_path=None, store=None):
         if learning_file_path:
             self.learning_file_path = learning_file_path
         else:
@@ -19,23 +54,89 @@ class LearningManager:
             script_dir = os.path.dirname(os.path.abspath(__file__))
             project_root = os.path.dirname(script_dir)
             self.learning_file_path = os.path.join(project_root, "MIDI_learning", "learning_data.xlsx")
-            
-        self.df = None
+        
+        # Backend for the learning rows (learning_data.xlsx unless a SQLite store is passed)
+        self.store = store or ExcelLibraryStore(learning_path=self.learning_file_path)
+
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._pending = [] # Samples not yet written to the store
+        self._timer = None
         self._load_data()
         
     def _load_data(self):
-        if os.path.exists(self.learning_file_path):
-            try:
-                self.df = pd.read_excel(self.learning_file_path)
-                # Ensure we have feature columns
-                self.feature_cols = [c for c in self.df.columns if c.startswith("FEAT_")]
-                # Ensure we have GT columns
-                self.gt_cols = [c for c in self.df.columns if c.startswith("GT_")]
-            except Exception as e:
-                print(f"LearningManager: Failed to load data: {e}")
-                self.df = pd.DataFrame()
-        else:
-            self.df = pd.DataFrame()
+        try:
+            df = self.store.load_learning()
+        except Exception as e:
+            print(f"LearningManager: Failed to load data: {e}")
+            df = pd.DataFrame()
+            
+        # Ensure we have feature columns
+        self.feature_cols = [c for c in df.columns if c.startswith("FEAT_")]
+        # Ensure we have GT columns
+        self.gt_cols = [c for c in df.columns if c.startswith("GT_")]
+        
+        # Row records + nearest-neighbour indexes over the FEAT_ columns
+        self._records = df.to_dict('records')
+        self._groups = {} # Feature set (tuple of FEAT_ columns) -> (FeatureIndex, record positions)
+        for i, row in enumerate(self._records):
+            self._index_row(i, row)
+        names = df['FileName'].tolist() if 'FileName' in df.columns else []
+        self._name_index = {name: i for i, name in enumerate(names)} # Latest row per filename
+        self._df_cache = df
+
+    @staticmethod
+    def _feature_value(value):
+        # FEAT_ value as float, None if missing (e.g. a row saved before that feature existed)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+        return None if np.isnan(value) else value
+
+    def _index_row(self, pos, row):
+        """
+        Adds a record to the index of its feature set. Rows are only compared on the
+        features they have: zero-filling missing ones (older extractor versions) would
+        make distances reflect which features a row has, not the music.
+        """
+        cols, vec = [], []
+        for col in self.feature_cols:
+            value = self._feature_value(row.get(col))
+            if value is not None:
+                cols.append(col)
+                vec.append(value)
+        if not cols:
+            return # No features at all (filename matches still work)
+        key = tuple(cols)
+        if key not in self._groups:
+            self._groups[key] = (FeatureIndex(len(cols)), [])
+        index, rows = self._groups[key]
+        index.add(vec)
+        rows.append(pos)
+
+    @property
+    def df(self):
+        """All learning rows (stored + unsaved) as a DataFrame."""
+        with self._lock:
+            if self._df_cache is None:
+                self._df_cache = pd.DataFrame(self._records)
+            return self._df_cache
+
+    def _append_record(self, row):
+        with self._lock:
+            # New FEAT_/GT_ keys become new columns
+            for key in row:
+                if key.startswith("FEAT_") and key not in self.feature_cols:
+                    self.feature_cols.append(key)
+                elif key.startswith("GT_") and key not in self.gt_cols:
+                    self.gt_cols.append(key)
+                    
+            n = len(self._records)
+            self._index_row(n, row)
+            self._records.append(row)
+            self._name_index[row.get("FileName")] = n
+            self._df_cache = None
 
     def predict(self, current_features, current_filename):
         """
@@ -43,48 +144,59 @@ class LearningManager:
         current_features: dict of features from analyzer (e.g. {'poly_ratio': 0.5, ...})
         current_filename: string
         """
-        if self.df is None or self.df.empty:
-            return {}
+        with self._lock:
+            n = len(self._records)
+            if n == 0:
+                return {}
+                
+            predictions = {}
             
-        predictions = {}
-        
-        # 1. Filename-based Match (Exact)
-        match_name = self.df[self.df['FileName'] == current_filename]
-        if not match_name.empty:
-            # Return the latest entry
-            latest = match_name.iloc[-1]
-            for col in self.gt_cols:
-                key = col.replace("GT_", "")
-                predictions[self._map_key_to_ui(key)] = latest[col]
-            print(f"LearningManager: Found exact filename match for {current_filename}")
-            return predictions
+            # 1. Filename-based Match (Exact)
+            match_idx = self._name_index.get(current_filename)
+            if match_idx is not None:
+                # Return the latest entry
+                latest = self._records[match_idx]
+                for col in self.gt_cols:
+                    key = col.replace("GT_", "")
+                    predictions[self._map_key_to_ui(key)] = latest.get(col, np.nan)
+                print(f"LearningManager: Found exact filename match for {current_filename}")
+                return predictions
 
-        # 2. Feature-based Nearest Neighbor
-        if not self.feature_cols:
-            return {}
+            # 2. Feature-based Nearest Neighbor
+            current = {}
+            for col in self.feature_cols:
+                value = self._feature_value(current_features.get(col.replace("FEAT_", "")))
+                if value is not None:
+                    current[col] = value
             
-        # Convert current features to vector
-        current_vec = []
-        for col in self.feature_cols:
-            key = col.replace("FEAT_", "")
-            current_vec.append(current_features.get(key, 0))
-        current_vec = np.array(current_vec, dtype=float)
-        
-        vectors = self.df[self.feature_cols].fillna(0).values
-        dists = np.linalg.norm(vectors - current_vec, axis=1)
-        
-        min_idx = np.argmin(dists)
-        # min_dist = dists[min_idx] # Could use threshold
-        
-        best_row = self.df.iloc[min_idx]
-        
-        for col in self.gt_cols:
-            key = col.replace("GT_", "")
-            val = best_row[col]
-            if pd.notna(val) and str(val) != "nan":
-                 predictions[self._map_key_to_ui(key)] = val
-                 
-        return predictions
+            # k nearest over every feature set the current file can be compared on
+            # (distances are RMS per feature, so sets of different size are comparable)
+            candidates = []
+            for cols, (index, rows) in self._groups.items():
+                if not all(col in current for col in cols):
+                    continue
+                d, ids = index.query([current[col] for col in cols], k=PREDICT_NEIGHBORS)
+                candidates.extend((dist, rows[i]) for dist, i in zip(d, ids))
+            candidates.sort(key=lambda c: c[0])
+            candidates = candidates[:PREDICT_NEIGHBORS]
+            if not candidates or candidates[0][0] > PREDICT_MAX_DISTANCE:
+                return {} # Nothing similar enough
+            dists = np.array([c[0] for c in candidates])
+            
+            # Inverse-distance weighted vote per GT column
+            weights = 1.0 / (dists + 1e-6)
+            rows = [self._records[pos] for _, pos in candidates]
+            for col in self.gt_cols:
+                votes = {}
+                for w, row in zip(weights, rows):
+                    val = row.get(col, np.nan)
+                    if pd.notna(val) and str(val) != "nan":
+                        votes[val] = votes.get(val, 0.0) + w
+                if votes:
+                    key = col.replace("GT_", "")
+                    predictions[self._map_key_to_ui(key)] = max(votes, key=votes.get)
+                     
+            return predictions
 
     def save_learning_data(self, src_path, updated_meta, raw_ai_data):
         """
@@ -160,21 +272,47 @@ class LearningManager:
         for k, v in features.items():
             row[f"FEAT_{k}"] = to_native(v)
             
-        # 3. Save to Excel
-        try:
-            if os.path.exists(self.learning_file_path):
-                # Reload to be safe against concurrency (though single threaded mostly)
-                current_df = pd.read_excel(self.learning_file_path)
-                current_df = pd.concat([current_df, pd.DataFrame([row])], ignore_index=True)
+        # 3. Keep in memory now, write to the store in batches (write-behind)
+        self._append_record(row)
+        self._queue_flush(row)
+        print(f"LearningManager: Saved data for {filename}")
+
+    def _queue_flush(self, row):
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= FLUSH_BATCH_SIZE:
+                threading.Thread(target=self.flush, daemon=True).start()
             else:
-                current_df = pd.DataFrame([row])
-            
-            current_df.to_excel(self.learning_file_path, index=False)
-            self.df = current_df # Update cache
-            print(f"LearningManager: Saved data for {filename}")
-            
-        except Exception as e:
-            print(f"LearningManager: Excel Save Error: {e}")
+                self._schedule_flush_locked()
+
+    def _schedule_flush_locked(self):
+        if self._timer is None:
+            self._timer = threading.Timer(FLUSH_DELAY_SEC, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Writes pending samples to the store. Returns False if the write failed (retried later)."""
+        with self._flush_lock:
+            with self._lock:
+                rows = self._pending
+                self._pending = []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not rows:
+                return True
+                
+            try:
+                self.store.append_learning(rows)
+                print(f"LearningManager: Wrote {len(rows)} samples to {self.store.name} store")
+                return True
+            except Exception as e:
+                print(f"LearningManager: Save Error (will retry): {e}")
+                with self._lock:
+                    self._pending[:0] = rows
+                    self._schedule_flush_locked()
+                return False
 
     def _get_key_map(self):
         return {
@@ -0,0 +1,117 @@
+import re
+from collections import OrderedDict
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+")
+
+class LibraryIndex:
+    """
+    Read-only columnar index over the library DataFrame.
+
+    - Filter columns: categorical codes (int32 array) per column, built on first use.
+      Matching is the same as before: str(value) == filter value.
+    - Search columns (FileName, Group, Comment): lowercased text plus an inverted
+      token index (token -> row ids). A query matches a row if it is a substring of
+      any search column (case-insensitive, literal - not a regex).
+
+    Queries return row positions (np.ndarray) into the DataFrame the index was built from.
+    Rebuild the index whenever that DataFrame changes.
+    """
+    SEARCH_COLUMNS = ("FileName", "Group", "Comment")
+    IGNORED_FILTER_VALUES = ("", "No", "None")
+    TOKEN_CACHE_SIZE = 256
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self._df = df
+        self._codes = {} # column -> (codes, {value: code})
+
+        # Lowercased search text per column (row-aligned lists)
+        self._texts = []
+        for col in self.SEARCH_COLUMNS:
+            if col in df.columns:
+                self._texts.append(df[col].astype(str).str.lower().tolist())
+
+        # Inverted token index over all search columns
+        postings = {}
+        for texts in self._texts:
+            for row, text in enumerate(texts):
+                for token in set(TOKEN_RE.findall(text)):
+                    postings.setdefault(token, []).append(row)
+        self._postings = {t: np.unique(np.array(rows, dtype=np.int64)) for t, rows in postings.items()}
+        self._vocab = list(self._postings)
+        self._token_hits = OrderedDict() # query token -> row ids (LRU)
+
+    # --- Filters ---
+
+    def _column_codes(self, col):
+        if col not in self._codes:
+            values = self._df[col].astype(str).to_numpy()
+            categories, codes = np.unique(values, return_inverse=True)
+            self._codes[col] = (codes.astype(np.int32), {v: i for i, v in enumerate(categories)})
+        return self._codes[col]
+
+    def filter_mask(self, filters):
+        """Boolean row mask for {column: value} radio filters. Ignores empty/'No'/'None' values."""
+        mask = np.ones(self.n_rows, dtype=bool)
+        for key, value in (filters or {}).items():
+            if value is None or value in self.IGNORED_FILTER_VALUES:
+                continue
+            if key not in self._df.columns:
+                continue
+            codes, lookup = self._column_codes(key)
+            code = lookup.get(str(value))
+            if code is None:
+                return np.zeros(self.n_rows, dtype=bool)
+            mask &= (codes == code)
+        return mask
+
+    def filter_rows(self, filters):
+        return np.flatnonzero(self.filter_mask(filters))
+
+    # --- Text Search ---
+
+    def _rows_for_token(self, query_token):
+        # Rows having any indexed token that contains query_token
+        hits = self._token_hits.get(query_token)
+        if hits is not None:
+            self._token_hits.move_to_end(query_token)
+            return hits
+
+        matched = [self._postings[t] for t in self._vocab if query_token in t]
+        if matched:
+            hits = np.unique(np.concatenate(matched))
+        else:
+            hits = np.empty(0, dtype=np.int64)
+
+        self._token_hits[query_token] = hits
+        if len(self._token_hits) > self.TOKEN_CACHE_SIZE:
+            self._token_hits.popitem(last=False)
+        return hits
+
+    def search_rows(self, text, candidates=None):
+        """Row ids whose search columns contain text (lowercased substring match)."""
+        needle = (text or "").lower()
+        if candidates is None:
+            candidates = np.arange(self.n_rows)
+        if not needle:
+            return candidates
+
+        # Every \w-run of the needle lies inside one \w-run (token) of a matching text,
+        # so intersecting token hits gives a superset of the matches.
+        query_tokens = TOKEN_RE.findall(needle)
+        for token in query_tokens:
+            candidates = np.intersect1d(candidates, self._rows_for_token(token), assume_unique=True)
+            if len(candidates) == 0:
+                return candidates
+
+        # A needle that is a single token is matched exactly by the token index
+        if len(query_tokens) == 1 and query_tokens[0] == needle:
+            return candidates
+
+        return np.array([r for r in candidates if any(needle in texts[r] for texts in self._texts)], dtype=np.int64)
+
+    def query(self, filters=None, text=""):
+        """Row ids matching both the radio filters and the search text."""
+        rows = self.filter_rows(filters)
+        return self.search_rows(text, rows)
@@ -0,0 +1,163 @@
+import os
+import io
+import sys
+import threading
+import contextlib
+import concurrent.futures as cf
+from PySide6.QtCore import QThread, Signal
+from midi_probe import probe_midi
+from midi_utils import analyze_file
+
+MIDI_EXTENSIONS = (".mid", ".midi")
+WORKER_NICE = 10 # POSIX niceness of analysis workers
+BELOW_NORMAL_PRIORITY_CLASS = 0x00004000 # Windows
+
+
+def _lower_priority():
+    """Pool initializer: analysis workers run below normal priority."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), BELOW_NORMAL_PRIORITY_CLASS)
+        else:
+            os.nice(WORKER_NICE)
+    except Exception:
+        pass
+
+
+def _analyze_task(file_path):
+    # MidiAnalyzer prints per-file details; keep the worker quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        return analyze_file(file_path)
+
+
+def find_midi_files(library_path):
+    files = []
+    for dirpath, _, filenames in os.walk(library_path):
+        for name in filenames:
+            if name.lower().endswith(MIDI_EXTENSIONS):
+                files.append(os.path.join(dirpath, name))
+    return sorted(files)
+
+
+class LibraryIndexer(QThread):
+    """
+    Background pre-analysis of every MIDI file under the library folder.
+
+    Files without a valid AnalysisCache entry are analyzed (midi_utils.analyze_file)
+    on a small process pool whose workers run at low priority, and the results
+    are written to the disk cache, so later clicks are cache hits. Files that are
+    not SMF (midi_probe) are skipped without starting a worker.
+    pause() stops submitting new files (running ones finish); resume() continues.
+    """
+    progressChanged = Signal(int, int) # Done, Total
+    statusChanged = Signal(str)
+
+    def __init__(self, library_path, analysis_cache, jobs=None, parent=None):
+        super().__init__(parent)
+        self.library_path = library_path
+        self.analysis_cache = analysis_cache
+        self.jobs = jobs or max(1, (os.cpu_count() or 2) // 2)
+        self._running = True
+        self._resume = threading.Event()
+        self._resume.set()
+
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def is_paused(self):
+        return not self._resume.is_set()
+
+    def stop(self):
+        self._running = False
+        self._resume.set()
+        self.wait()
+
+    def _status(self, done, total):
+        if self.is_paused():
+            return f"Indexing paused: {done}/{total}"
+        return f"Indexing library: {done}/{total}"
+
+    def run(self):
+        self.statusChanged.emit("Scanning library...")
+        files = find_midi_files(self.library_path)
+
+        todo = []
+        skipped = 0
+        for path in files:
+            if not self._running:
+                return
+            self._resume.wait()
+            if self.analysis_cache.is_fresh(path):
+                continue
+            try:
+                probe_midi(path, notes=False)
+            except Exception as e:
+                # Unreadable, not SMF or corrupt: skip this file, keep scanning
+                print(f"LibraryIndexer: Skipping {path}: {e}")
+                skipped += 1
+                continue
+            todo.append(path)
+
+        total = len(todo)
+        if total == 0:
+            self.statusChanged.emit(f"Library indexed: {len(files)} files")
+            return
+        print(f"LibraryIndexer: {total} of {len(files)} files need analysis ({skipped} unreadable skipped)")
+
+        done = 0
+        failed = 0
+        pending = iter(todo)
+        self.progressChanged.emit(0, total)
+        self.statusChanged.emit(self._status(0, total))
+        with cf.ProcessPoolExecutor(max_workers=self.jobs, initializer=_lower_priority) as pool:
+            in_flight = {}
+            was_paused = False
+            while self._running:
+                # Keep the pool fed while not paused
+                while not self.is_paused() and len(in_flight) < self.jobs * 2:
+                    path = next(pending, None)
+                    if path is None:
+                        break
+                    in_flight[pool.submit(_analyze_task, path)] = path
+                if not in_flight:
+                    if self.is_paused():
+                        self._resume.wait(0.2)
+                        if was_paused != self.is_paused():
+                            was_paused = self.is_paused()
+                            self.statusChanged.emit(self._status(done, total))
+                        continue
+                    break
+
+                finished, _ = cf.wait(in_flight, timeout=0.2, return_when=cf.FIRST_COMPLETED)
+                for future in finished:
+                    path = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = None
+                        print(f"LibraryIndexer: Failed to analyze {path}: {e}")
+                    if result is None:
+                        failed += 1
+                    else:
+                        # Disk only: the memory LRU stays with what the user clicked
+                        self.analysis_cache.put(path, result, remember=False)
+                    done += 1
+                if finished or was_paused != self.is_paused():
+                    was_paused = self.is_paused()
+                    self.progressChanged.emit(done, total)
+                    self.statusChanged.emit(self._status(done, total))
+
+            if not self._running:
+                for future in in_flight:
+                    future.cancel()
+                return
+
+        message = f"Library indexed: {len(files)} files"
+        if failed:
+            message += f" ({failed} failed)"
+        self.statusChanged.emit(message)
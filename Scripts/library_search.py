@@ -0,0 +1,66 @@
+import threading
+from PySide6.QtCore import QThread, Signal
+
+
+class LibrarySearchWorker(QThread):
+    """
+    Runs library queries (DataManager.query -> LibraryIndex) off the UI thread.
+
+    Only the latest request is kept: a request submitted while another is waiting
+    replaces it, and a result whose request was superseded while it ran is not
+    emitted. Every request carries the caller's generation number, which comes back
+    with the row ids so the caller can also drop results it no longer wants.
+    """
+    resultsReady = Signal(int, object) # Generation, row ids (np.ndarray)
+
+    def __init__(self, data_manager, parent=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self._cond = threading.Condition()
+        self._pending = None # (generation, filters, text)
+        self._warm_up = False
+        self._running = True
+
+    def submit(self, generation, filters, text):
+        with self._cond:
+            self._pending = (generation, dict(filters or {}), text or "")
+            self._cond.notify()
+
+    def warm_up(self):
+        """Builds the library index in the background (e.g. right after loading)."""
+        with self._cond:
+            self._warm_up = True
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.wait()
+
+    def _is_superseded(self):
+        with self._cond:
+            return self._pending is not None or not self._running
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None and not self._warm_up:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                request, self._pending = self._pending, None
+                self._warm_up = False
+
+            try:
+                if request is None:
+                    self.data_manager.prepare_query()
+                    continue
+                generation, filters, text = request
+                row_ids = self.data_manager.query(filters, text)
+            except Exception as e:
+                print(f"Search failed: {e}")
+                continue
+
+            if not self._is_superseded():
+                self.resultsReady.emit(generation, row_ids)
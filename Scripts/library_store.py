@@ -0,0 +1,350 @@
+import os
+import json
+import sqlite3
+import threading
+import pandas as pd
+from file_signature import file_sha1, stat_signature, is_unchanged
+
+LIBRARY_COLUMNS = [
+    "FileName", "FilePath", "Category", "Instruments",
+    "TimeSignature", "BAR", "Chord",
+    "Root", "Group", "Comment", "_SourceFile"
+]
+# Columns the SQLite store keeps an index on
+INDEXED_COLUMNS = ["FilePath", "Root", "Category", "Chord", "BAR", "Group"]
+SEARCH_COLUMNS = ["FileName", "Group", "Comment"]
+IGNORED_FILTER_VALUES = ("", "No", "None")
+SQL_BATCH = 500 # Bound parameters per statement (SQLite limits them)
+
+BACKENDS = ("excel", "sqlite")
+
+def _quote(col):
+    # "Group" is an SQL keyword
+    return '"' + col.replace('"', '""') + '"'
+
+def _to_text(value):
+    if value is None:
+        return ""
+    try:
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, 'item'):
+        value = value.item()
+    return str(value)
+
+def _lower(value):
+    # Python's lower() (LIKE/LOWER only fold ASCII); same matching as LibraryIndex
+    return value.lower() if isinstance(value, str) else value
+
+def _to_native(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+class ExcelLibraryStore:
+    """
+    The original layout: the library in MasterLibraly.xlsx and learning rows in
+    MIDI_learning/learning_data.xlsx. Every read parses the whole workbook.
+    """
+    name = "excel"
+
+    def __init__(self, master_path=None, learning_path=None):
+        self.master_path = master_path
+        self.learning_path = learning_path
+
+    # --- Library ---
+
+    def load_library(self):
+        if self.master_path and os.path.exists(self.master_path):
+            return pd.read_excel(self.master_path)
+        return None
+
+    def save_library(self, df):
+        df.to_excel(self.master_path, index=False)
+
+    def update_library(self, df, removed_paths, rows):
+        """
+        Applies an integration delta. An xlsx cannot be patched in place, so the
+        already-updated frame df is written out.
+        """
+        self.save_library(df)
+
+    def fingerprint(self):
+        """Identity of the stored library, compared by matches() to detect outside edits."""
+        if not self.master_path or not os.path.exists(self.master_path):
+            return None
+        size, mtime_ns = stat_signature(self.master_path)
+        return {'size': size, 'mtime_ns': mtime_ns, 'hash': file_sha1(self.master_path)}
+
+    def matches(self, fingerprint):
+        if not self.master_path or not os.path.exists(self.master_path):
+            return False
+        return is_unchanged(self.master_path, fingerprint)
+
+    def append_entries(self, rows):
+        # Host workbooks/journals are the source of truth; the master is rebuilt by integration
+        pass
+
+    def query(self, filters=None, search_text="", limit=None):
+        """Same semantics as SQLiteLibraryStore.query, evaluated with pandas."""
+        from library_index import LibraryIndex
+        df = self.load_library()
+        if df is None:
+            return pd.DataFrame(columns=LIBRARY_COLUMNS)
+        df = df.fillna("")
+        rows = LibraryIndex(df).query(filters, search_text)
+        if limit is not None:
+            rows = rows[:limit]
+        return df.iloc[rows].reset_index(drop=True)
+
+    # --- Learning ---
+
+    def load_learning(self):
+        if self.learning_path and os.path.exists(self.learning_path):
+            return pd.read_excel(self.learning_path)
+        return pd.DataFrame()
+
+    def append_learning(self, rows):
+        """Appends learning rows and returns the full learning frame."""
+        if os.path.exists(self.learning_path):
+            # Reload to be safe against concurrency (though single threaded mostly)
+            current_df = pd.read_excel(self.learning_path)
+            current_df = pd.concat([current_df, pd.DataFrame(rows)], ignore_index=True)
+        else:
+            current_df = pd.DataFrame(rows)
+        current_df.to_excel(self.learning_path, index=False)
+        return current_df
+
+    def close(self):
+        pass
+
+
+class SQLiteLibraryStore:
+    """
+    Library and learning data in one SQLite file.
+
+    - library: one TEXT column per LIBRARY_COLUMNS entry, indexed on INDEXED_COLUMNS,
+      so filtered queries do not need the whole table in memory.
+    - learning: FileName/Timestamp plus the full row as JSON (FEAT_/GT_/AI_ columns vary).
+    - meta: a generation counter bumped when the library is replaced or patched by
+      integration (used as the fingerprint).
+
+    import_excel/export_excel convert from/to the current xlsx layout.
+    """
+    name = "sqlite"
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.create_function("py_lower", 1, _lower, deterministic=True)
+        self._create_schema()
+
+    def _create_schema(self):
+        cols = ", ".join(f"{_quote(c)} TEXT NOT NULL DEFAULT ''" for c in LIBRARY_COLUMNS)
+        with self._lock, self.conn:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS library (row_id INTEGER PRIMARY KEY, {cols})")
+            for col in INDEXED_COLUMNS:
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_library_{col.lower()} ON library ({_quote(col)})")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS learning (row_id INTEGER PRIMARY KEY, FileName TEXT, Timestamp TEXT, data TEXT NOT NULL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_learning_filename ON learning (FileName)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _bump_generation(self):
+        self.conn.execute("INSERT INTO meta (key, value) VALUES ('generation', '1') "
+                          "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+    def _insert_rows(self, rows):
+        """Inserts rows in order and returns their row_ids (a range)."""
+        cols = ", ".join(_quote(c) for c in LIBRARY_COLUMNS)
+        marks = ", ".join("?" for _ in LIBRARY_COLUMNS)
+        values = [tuple(_to_text(row.get(c, "")) for c in LIBRARY_COLUMNS) for row in rows]
+        # Without AUTOINCREMENT each new row_id is MAX(row_id) + 1 (callers hold the lock)
+        first = self.conn.execute("SELECT IFNULL(MAX(row_id), 0) FROM library").fetchone()[0] + 1
+        self.conn.executemany(f"INSERT INTO library ({cols}) VALUES ({marks})", values)
+        return range(first, first + len(values))
+
+    def _where(self, filters, search_text):
+        # WHERE clause and parameters shared by query/query_row_ids
+        where, params = [], []
+        for key, value in (filters or {}).items():
+            if value is None or value in IGNORED_FILTER_VALUES or key not in LIBRARY_COLUMNS:
+                continue
+            where.append(f"{_quote(key)} = ?")
+            params.append(str(value))
+
+        if search_text:
+            # Literal, case-insensitive substring
+            where.append("(" + " OR ".join(f"instr(py_lower({_quote(c)}), ?) > 0" for c in SEARCH_COLUMNS) + ")")
+            params.extend([search_text.lower()] * len(SEARCH_COLUMNS))
+        return (" WHERE " + " AND ".join(where) if where else ""), params
+
+    # --- Library ---
+
+    def load_library(self):
+        """Whole library as a DataFrame indexed by row_id, or None if the store is empty."""
+        with self._lock:
+            if self.conn.execute("SELECT 1 FROM library LIMIT 1").fetchone() is None:
+                return None
+            cols = ", ".join(_quote(c) for c in LIBRARY_COLUMNS)
+            return pd.read_sql_query(f"SELECT row_id, {cols} FROM library ORDER BY row_id", self.conn, index_col="row_id")
+
+    def save_library(self, df):
+        """Replaces the library table with df. Returns the row_ids of df's rows."""
+        rows = df.to_dict('records')
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM library")
+            row_ids = self._insert_rows(rows)
+            self._bump_generation()
+        return row_ids
+
+    def update_library(self, df, removed_paths, rows):
+        """
+        Applies an integration delta in place: deletes every row whose FilePath is in
+        removed_paths (indexed) and inserts rows. df (the full result) is not needed.
+        Returns the row_ids of the inserted rows.
+        """
+        paths = [str(p) for p in removed_paths]
+        with self._lock, self.conn:
+            for i in range(0, len(paths), SQL_BATCH):
+                batch = paths[i:i + SQL_BATCH]
+                marks = ", ".join("?" for _ in batch)
+                self.conn.execute(f"DELETE FROM library WHERE FilePath IN ({marks})", batch)
+            row_ids = self._insert_rows(rows.to_dict('records'))
+            self._bump_generation()
+        return row_ids
+
+    def append_entries(self, rows):
+        # No generation bump: these rows are also in the host journal, so the next
+        # integration replaces them by FilePath and can still patch this table
+        with self._lock, self.conn:
+            return self._insert_rows(rows)
+
+    def fingerprint(self):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return {'generation': row[0]} if row else None
+
+    def matches(self, fingerprint):
+        current = self.fingerprint()
+        return current is not None and current == fingerprint
+
+    def query(self, filters=None, search_text="", limit=None):
+        """
+        Rows matching the radio filters (exact match, empty/'No'/'None' ignored) and
+        the search text (case-insensitive substring of FileName/Group/Comment).
+        Filters on INDEXED_COLUMNS use the indexes.
+        """
+        where, params = self._where(filters, search_text)
+        cols = ", ".join(_quote(c) for c in LIBRARY_COLUMNS)
+        sql = f"SELECT {cols} FROM library{where} ORDER BY row_id"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    def query_row_ids(self, filters=None, search_text=""):
+        """row_ids (ascending) of the rows query() would return, without fetching the rows."""
+        where, params = self._where(filters, search_text)
+        with self._lock:
+            rows = self.conn.execute(f"SELECT row_id FROM library{where} ORDER BY row_id", params).fetchall()
+        return [r[0] for r in rows]
+
+    # --- Learning ---
+
+    def load_learning(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT data FROM learning ORDER BY row_id").fetchall()
+        return pd.DataFrame([json.loads(r[0]) for r in rows])
+
+    def append_learning(self, rows):
+        """Appends learning rows and returns the full learning frame."""
+        values = []
+        for row in rows:
+            native = {k: _to_native(v) for k, v in row.items()}
+            values.append((native.get("FileName"), native.get("Timestamp"), json.dumps(native, ensure_ascii=False, default=str)))
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT INTO learning (FileName, Timestamp, data) VALUES (?, ?, ?)", values)
+        return self.load_learning()
+
+    # --- Excel Import / Export ---
+
+    def import_excel(self, master_path=None, learning_path=None):
+        """Replaces library/learning tables with the content of the given xlsx files."""
+        if master_path and os.path.exists(master_path):
+            df = pd.read_excel(master_path).fillna("")
+            self.save_library(df)
+            print(f"LibraryStore: Imported {len(df)} library rows from {master_path}")
+        if learning_path and os.path.exists(learning_path):
+            ldf = pd.read_excel(learning_path)
+            with self._lock, self.conn:
+                self.conn.execute("DELETE FROM learning")
+            self.append_learning(ldf.to_dict('records'))
+            print(f"LibraryStore: Imported {len(ldf)} learning rows from {learning_path}")
+
+    def export_excel(self, master_path=None, learning_path=None):
+        """Writes the tables back in the MasterLibraly.xlsx / learning_data.xlsx layout."""
+        if master_path:
+            df = self.load_library()
+            if df is None:
+                df = pd.DataFrame(columns=LIBRARY_COLUMNS)
+            df.to_excel(master_path, index=False)
+        if learning_path:
+            self.load_learning().to_excel(learning_path, index=False)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def open_library_store(root_dir, backend="excel"):
+    """
+    Creates the store for a project root.
+    excel:  MasterLibraly.xlsx + MIDI_learning/learning_data.xlsx (default)
+    sqlite: MasterLibraly.sqlite; imported from the xlsx files on first use.
+    """
+    master_path = os.path.join(root_dir, "MasterLibraly.xlsx")
+    learning_path = os.path.join(root_dir, "MIDI_learning", "learning_data.xlsx")
+
+    if backend == "sqlite":
+        db_path = os.path.join(root_dir, "MasterLibraly.sqlite")
+        is_new = not os.path.exists(db_path)
+        store = SQLiteLibraryStore(db_path)
+        if is_new:
+            store.import_excel(master_path, learning_path)
+        return store
+
+    if backend != "excel":
+        print(f"LibraryStore: Unknown backend '{backend}', using excel")
+    return ExcelLibraryStore(master_path, learning_path)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Import/export the SQLite library store from/to the Excel layout.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("--root", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), help="Project root")
+    args = parser.parse_args()
+
+    store = SQLiteLibraryStore(os.path.join(args.root, "MasterLibraly.sqlite"))
+    master_path = os.path.join(args.root, "MasterLibraly.xlsx")
+    learning_path = os.path.join(args.root, "MIDI_learning", "learning_data.xlsx")
+    if args.command == "import":
+        store.import_excel(master_path, learning_path)
+    else:
+        store.export_excel(master_path, learning_path)
+        print(f"LibraryStore: Exported to {master_path} and {learning_path}")
+    store.close()
@@ -1,15 +1,18 @@
 import sys
 import os
-from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QMessageBox, QMenuBar, QMenu, QLineEdit, QTextEdit
+from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QMessageBox, QMenuBar, QMenu, QLineEdit, QTextEdit, QLabel
 from PySide6.QtGui import QAction
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QTimer, QThread
 import pandas as pd
 
 # Import our modules
 from data_manager import DataManager
+from library_store import open_library_store
 from midi_utils import MidiHandler
 from ui.piano_roll import PianoRollWidget
 from ui.file_list import FileListWidget
+from library_search import LibrarySearchWorker
+from library_indexer import LibraryIndexer
 from ui.filter_panel import FilterPanel
 from ui.register_dialog import RegistrationDialog
 from ui.color_dialog import ColorConfigDialog
@@ -36,8 +39,9 @@ class MainWindow(QMainWindow):
         self.db_path = os.path.join(self.project_root, "library.xlsx")
         
         # Core Logic
-        self.midi_handler = MidiHandler(self.lib_path)
-        self.data_manager = DataManager(self.db_path, self.base_dir)
+        self.store = open_library_store(self.base_dir, self.config_manager.get_storage_backend())
+        self.midi_handler = MidiHandler(self.lib_path, store=self.store)
+        self.data_manager = DataManager(self.db_path, self.base_dir, store=self.store)
         self.player = MidiPlayer()
         self.auto_play_enabled = False
         
@@ -94,6 +98,12 @@ class MainWindow(QMainWindow):
         self.main_h_layout.addWidget(self.panel_b)
         self.is_layout_swapped = False
         
+        # Status Bar (library indexing progress); the panels keep their fixed sizes
+        self.status_label = QLabel()
+        self.statusBar().setSizeGripEnabled(False)
+        self.statusBar().addPermanentWidget(self.status_label)
+        self.setFixedSize(C.WINDOW_WIDTH, C.WINDOW_HEIGHT + self.statusBar().sizeHint().height())
+        
         # Menus
         self.create_menus()
         
@@ -106,6 +116,16 @@ class MainWindow(QMainWindow):
         # State used for filtering
         self.current_filters = {}
         self.current_search_text = ""
+
+        # Search runs on a worker thread; typing is debounced
+        self._search_generation = 0
+        self.search_worker = LibrarySearchWorker(self.data_manager, self)
+        self.search_worker.resultsReady.connect(self.on_search_results)
+        self.search_worker.start()
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(C.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.apply_filters)
         
         # Restore State
         self.restore_app_state()
@@ -116,6 +136,11 @@ class MainWindow(QMainWindow):
         
         self.refresh_list()
         
+        # Pre-analyze the library in the background (results go to the analysis cache)
+        self.indexer = LibraryIndexer(self.lib_path, self.midi_handler.analysis_cache, parent=self)
+        self.indexer.statusChanged.connect(self.status_label.setText)
+        self.indexer.start(QThread.LowPriority)
+        
         # Shortcut for Media Key (Space)
         # Using QShortcut ensures it works even if focus is on child widgets
         from PySide6.QtGui import QShortcut, QKeySequence
@@ -160,6 +185,15 @@ class MainWindow(QMainWindow):
         self.auto_play_action.triggered.connect(self.toggle_auto_play)
         settings_menu.addAction(self.auto_play_action)
         
+        self.sqlite_action = QAction("Use SQLite Library (restart)", self, checkable=True)
+        self.sqlite_action.setChecked(self.store.name == "sqlite")
+        self.sqlite_action.triggered.connect(self.toggle_sqlite_store)
+        settings_menu.addAction(self.sqlite_action)
+        
+        self.pause_index_action = QAction("Pause Library Indexing", self, checkable=True)
+        self.pause_index_action.triggered.connect(self.toggle_indexing_paused)
+        settings_menu.addAction(self.pause_index_action)
+        
         # Help Menu
         help_menu = menubar.addMenu("Help")
         help_action = QAction("Manual...", self)
@@ -182,6 +216,11 @@ class MainWindow(QMainWindow):
     def open_visualization(self):
         from learning_visualizer import LearningVisualizer
         learning_path = os.path.join(self.base_dir, "MIDI_learning", "learning_data.xlsx")
+        from learning_manager import flush_all
+        flush_all()
+        if self.store.name == "sqlite":
+            # Visualizer reads the Excel layout
+            self.store.export_excel(learning_path=learning_path)
         # LearningVisualizer expects a master window but we can pass self.
         # Note: Visualizer is a Toplevel so it opens a new window.
         LearningVisualizer(self, learning_path)
@@ -220,6 +259,16 @@ class MainWindow(QMainWindow):
         dlg = HelpDialog(self)
         dlg.exec()
         
+    def toggle_sqlite_store(self, checked):
+        self.config_manager.set_storage_backend("sqlite" if checked else "excel")
+        QMessageBox.information(self, "Library Storage", "The storage backend will change after restarting the app.")
+        
+    def toggle_indexing_paused(self, checked):
+        if checked:
+            self.indexer.pause()
+        else:
+            self.indexer.resume()
+        
     def toggle_auto_play(self, checked):
         self.auto_play_enabled = checked
         if not checked:
@@ -257,20 +306,22 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event):
         # Save State
         self.config_manager.save_window_state(self)
+        # Fold registrations made this session into the host xlsx
+        self.data_manager.compact_local_journal()
+        # Write pending learning samples
+        from learning_manager import flush_all
+        flush_all()
+        self.search_timer.stop()
+        self.search_worker.stop()
+        self.indexer.stop()
         super().closeEvent(event)
 
     def refresh_list(self):
-        # Create a display copy of the dataframe
-        display_df = self.data_manager.df.copy()
-        
-        # Convert relative paths to absolute for display/usage logic
-        # We assume database stores relative paths now.
-        if not display_df.empty and 'FilePath' in display_df.columns:
-            display_df['FilePath'] = display_df['FilePath'].apply(
-                lambda p: os.path.abspath(os.path.join(self.base_dir, p)) if p and not os.path.isabs(p) else p
-            )
-            
-        self.file_list.populate(display_df)
+        # Rebind the list to the (possibly replaced or edited) library frame, show all rows
+        self._search_generation += 1 # Drop results computed for the old frame
+        self.file_list.set_library(self.data_manager.df, self.base_dir)
+        self.file_list.set_rows(None)
+        self.search_worker.warm_up()
 
     def handle_import(self, file_path):
         # 1. Analyze
@@ -322,26 +373,22 @@ class MainWindow(QMainWindow):
 
     def handle_search_text(self, text):
         self.current_search_text = text.lower()
-        self.apply_filters()
+        self.search_timer.start() # Restarts the debounce window on every keystroke
         
     def handle_filter(self, filters):
         self.current_filters = filters
+        self.search_timer.stop()
         self.apply_filters()
         
     def apply_filters(self):
-        # Get base filtered data from DataManager
-        filtered_df = self.data_manager.get_filtered_data(self.current_filters)
-        
-        # Apply Text Search if needed
-        if self.current_search_text:
-            mask = False
-            for col in ["FileName", "Group", "Comment"]:
-                if col in filtered_df.columns:
-                    mask |= filtered_df[col].astype(str).str.lower().str.contains(self.current_search_text)
-            
-            filtered_df = filtered_df[mask]
-            
-        self.file_list.populate(filtered_df)
+        # Filters + Text Search answered by the library index on the search thread
+        self._search_generation += 1
+        self.search_worker.submit(self._search_generation, self.current_filters, self.current_search_text)
+
+    def on_search_results(self, generation, row_ids):
+        if generation != self._search_generation:
+            return # A newer query (or a reload) superseded this one
+        self.file_list.set_rows(row_ids)
 
     def handle_selection(self, file_path):
         if os.path.exists(file_path):
@@ -440,6 +487,7 @@ class MainWindow(QMainWindow):
             if mask.any():
                 self.data_manager.df.loc[mask, 'FileName'] = os.path.splitext(new_name)[0]
                 self.data_manager.df.loc[mask, 'FilePath'] = new_path
+                self.data_manager.invalidate_index()
                 self.data_manager.save_db()
             
             QTimer.singleShot(0, self.refresh_list)
@@ -449,6 +497,8 @@ class MainWindow(QMainWindow):
             QTimer.singleShot(0, self.refresh_list)
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support() # Library indexer workers in a frozen build
     app = QApplication(sys.argv)
     
     app.setStyleSheet("""
@@ -456,7 +506,7 @@ if __name__ == "__main__":
             background-color: #2b2b2b;
             color: #ffffff;
         }
-        QTableWidget {
+        QTableView {
             background-color: #1e1e1e;
             gridline-color: #3e3e3e;
             selection-background-color: #3d5afe;
@@ -2,8 +2,7 @@ import sys
 import os
 import pathlib
 import pandas as pd
-import pretty_midi
-import shutil
+from checker_core import iter_check_folder, report_paths, REPORT_COLUMNS
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                                QLabel, QTextEdit, QPushButton, QProgressBar,
                                QCheckBox, QSpinBox, QHBoxLayout)
@@ -16,85 +15,46 @@ class AnalysisWorker(QThread):
     progress_signal = Signal(int) # 0-100
     finished_signal = Signal(str) # Result message
 
-    def __init__(self, target_folder, auto_fix=False, max_iterations=10):
+    def __init__(self, target_folder, auto_fix=False, jobs=None):
         super().__init__()
         self.target_folder = target_folder
         self.auto_fix = auto_fix
-        self.max_iterations = max_iterations
+        self.jobs = jobs # Worker processes (None = CPU count)
         self.is_running = True
 
     def run(self):
         target_path = pathlib.Path(self.target_folder)
         self.log_signal.emit(f"Scanning folder: {target_path}...")
         if self.auto_fix:
-            self.log_signal.emit(f"Auto-Fix Enabled (Max Iterations: {self.max_iterations})")
+            self.log_signal.emit("Auto-Fix Enabled")
 
-        midi_files = list(target_path.rglob("*.mid"))
-        if not midi_files:
-            self.log_signal.emit("No MIDI files found.")
-            self.finished_signal.emit("No MIDI files found.")
-            return
-
-        self.log_signal.emit(f"Found {len(midi_files)} MIDI files.")
+        results = {}
+        total = 0
         
-        results = []
-        total = len(midi_files)
-        
-        for i, midi_file in enumerate(midi_files):
-            if not self.is_running:
-                break
-                
-            rel_path = midi_file.relative_to(target_path)
-            status = "OK"
-            was_fixed = False
-            
-            try:
-                # Load MIDI
-                pm = pretty_midi.PrettyMIDI(str(midi_file))
-                
-                # Auto-Fix
-                if self.auto_fix:
-                    fixed_count = self.fix_overlaps(pm, midi_file)
-                    if fixed_count > 0:
-                        was_fixed = True
-                        status = f"Fixed ({fixed_count} overlaps)"
-                        self.log_signal.emit(f"Fixed {fixed_count} overlaps in {rel_path}")
-                
-                # 1. Overlap Check (Post-Fix)
-                is_overlap = self.check_overlap(pm)
-                
-                # 2. Duration (ms)
-                duration_sec = pm.get_end_time()
-                duration_ms = int(duration_sec * 1000)
-                
-                results.append({
-                    "RelativePath": str(rel_path),
-                    "HasOverlap": is_overlap,
-                    "Duration_ms": duration_ms,
-                    "Status": status
-                })
-                
-            except Exception as e:
-                self.log_signal.emit(f"Error processing {rel_path}: {e}")
-                results.append({
-                    "RelativePath": str(rel_path),
-                    "HasOverlap": "Error",
-                    "Duration_ms": 0,
-                    "Status": f"Error: {e}"
-                })
+        # Files are checked on a process pool; unchanged files reuse the previous result
+        for index, total, result in iter_check_folder(target_path, self.auto_fix, jobs=self.jobs,
+                                                      should_stop=lambda: not self.is_running,
+                                                      log=self.log_signal.emit):
+            for message in result.pop("_log", []):
+                self.log_signal.emit(message)
+            results[index] = result
             
             # Progress
-            percent = int((i + 1) / total * 100)
+            percent = int(len(results) / total * 100)
             self.progress_signal.emit(percent)
 
+        if total == 0 and self.is_running:
+            self.finished_signal.emit("No MIDI files found.")
+            return
+
         if not self.is_running:
             self.finished_signal.emit("Cancelled.")
             return
 
-        # Export
-        output_path = target_path.parent / f"{target_path.name}_check.xlsx"
+        # Export (in scan order)
+        output_path = report_paths(target_path)[0]
         try:
-            df = pd.DataFrame(results)
+            df = pd.DataFrame([results[i] for i in sorted(results)], columns=REPORT_COLUMNS)
             df.to_excel(output_path, index=False)
             self.log_signal.emit(f"Successfully created report: {output_path.name}")
             self.finished_signal.emit(f"Done. Saved to {output_path.name}")
@@ -102,94 +62,6 @@ class AnalysisWorker(QThread):
             self.log_signal.emit(f"Error saving Excel: {e}")
             self.finished_signal.emit("Error saving Excel.")
 
-    def fix_overlaps(self, pm, file_path):
-        """
-        Recursively fixes overlaps by shortening prev note by 5 ticks.
-        Returns total number of fixes made.
-        """
-        total_fixes = 0
-        file_modified = False
-        
-        for iteration in range(self.max_iterations):
-            fixes_this_pass = 0
-            
-            for inst in pm.instruments:
-                if inst.is_drum: continue
-                
-                # Group by pitch
-                notes_by_pitch = {}
-                for note in inst.notes:
-                    if note.pitch not in notes_by_pitch: notes_by_pitch[note.pitch] = []
-                    notes_by_pitch[note.pitch].append(note)
-                
-                for pitch, notes in notes_by_pitch.items():
-                    sorted_notes = sorted(notes, key=lambda x: x.start)
-                    for i in range(len(sorted_notes) - 1):
-                        curr = sorted_notes[i]
-                        next_n = sorted_notes[i+1]
-                        
-                        # Check overlap
-                        if curr.end > next_n.start + 0.001:
-                            # Calculate ticks
-                            start_tick = pm.time_to_tick(next_n.start)
-                            # Target end is 5 ticks before next start
-                            new_end_tick = start_tick - 5
-                            if new_end_tick <= pm.time_to_tick(curr.start):
-                                # If note becomes effectively zero length, maybe set to 1 tick len?
-                                new_end_tick = pm.time_to_tick(curr.start) + 1
-                            
-                            new_end_time = pm.tick_to_time(new_end_tick)
-                            curr.end = new_end_time
-                            fixes_this_pass += 1
-            
-            total_fixes += fixes_this_pass
-            if fixes_this_pass > 0:
-                file_modified = True
-            else:
-                break # No more fixes needed
-                
-        if file_modified:
-            # Create Backup
-            backup_path = str(file_path) + ".bak"
-            if not os.path.exists(backup_path):
-                shutil.copy2(file_path, backup_path)
-            
-            # Save
-            try:
-                pm.write(str(file_path))
-            except Exception as e:
-                self.log_signal.emit(f"Error saving fixed file {file_path}: {e}")
-                
-        return total_fixes
-
-    def check_overlap(self, pm):
-        has_overlap = False
-        for inst in pm.instruments:
-            if inst.is_drum:
-                continue
-            
-            # Group notes by pitch
-            notes_by_pitch = {}
-            for note in inst.notes:
-                if note.pitch not in notes_by_pitch:
-                    notes_by_pitch[note.pitch] = []
-                notes_by_pitch[note.pitch].append(note)
-            
-            # Check overlaps within each pitch
-            for pitch, notes in notes_by_pitch.items():
-                # Sort by start time
-                sorted_notes = sorted(notes, key=lambda x: x.start)
-                for i in range(len(sorted_notes) - 1):
-                    # If current note ends after next note starts -> Overlap
-                    if sorted_notes[i].end > sorted_notes[i+1].start + 0.001: 
-                        has_overlap = True
-                        break
-                if has_overlap:
-                    break
-            if has_overlap:
-                break
-        return has_overlap
-
     def stop(self):
         self.is_running = False
 
@@ -221,13 +93,7 @@ class MidiCheckerWindow(QMainWindow):
         self.chk_autofix.setStyleSheet("font-size: 14px; font-weight: bold;")
         controls_layout.addWidget(self.chk_autofix)
         
-        # Iterations
         controls_layout.addStretch()
-        controls_layout.addWidget(QLabel("Max Iterations:"))
-        self.spin_iterations = QSpinBox()
-        self.spin_iterations.setRange(1, 100)
-        self.spin_iterations.setValue(10)
-        controls_layout.addWidget(self.spin_iterations)
         
         layout.addLayout(controls_layout)
         
@@ -269,9 +135,8 @@ class MidiCheckerWindow(QMainWindow):
         self.progress.setValue(0)
         
         auto_fix = self.chk_autofix.isChecked()
-        max_iter = self.spin_iterations.value()
         
-        self.worker = AnalysisWorker(folder_path, auto_fix, max_iter)
+        self.worker = AnalysisWorker(folder_path, auto_fix)
         self.worker.log_signal.connect(self.log)
         self.worker.progress_signal.connect(self.progress.setValue)
         self.worker.finished_signal.connect(self.on_finished)
@@ -306,4 +171,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support() # Process pool workers in frozen builds
     main()
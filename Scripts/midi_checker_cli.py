@@ -0,0 +1,154 @@
+import sys
+import os
+import csv
+import json
+import argparse
+import pathlib
+from checker_core import iter_check_folder, report_paths, REPORT_COLUMNS
+from checker_rules import RULES
+
+FORMATS = ("jsonl", "csv", "xlsx")
+
+
+class JsonLinesWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, row):
+        self.stream.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        self.stream.flush()
+
+    def close(self, rows_in_order):
+        pass
+
+
+class CsvWriter:
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.DictWriter(stream, fieldnames=REPORT_COLUMNS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.stream.flush()
+
+    def close(self, rows_in_order):
+        pass
+
+
+class XlsxWriter:
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, row):
+        pass
+
+    def close(self, rows_in_order):
+        import pandas as pd
+        pd.DataFrame(rows_in_order, columns=REPORT_COLUMNS).to_excel(self.path, index=False)
+
+
+def default_output(folder, fmt):
+    return report_paths(folder)[0].with_suffix("." + fmt)
+
+
+def log(message):
+    # Progress/log lines go to stderr so stdout can carry the report
+    print(message, file=sys.stderr, flush=True)
+
+
+def has_issue(row):
+    return row.get("HasOverlap") is True or row.get("HasOverlap") == "Error" or bool(row.get("Issues"))
+
+
+def run(folder, fmt="xlsx", output=None, auto_fix=False, jobs=None, use_cache=True, quiet=False, rules=None):
+    """Checks folder and writes the report. Returns the rows in scan order."""
+    output = output or str(default_output(folder, fmt))
+    to_stdout = output == "-"
+    if fmt == "xlsx" and to_stdout:
+        raise ValueError("xlsx cannot be written to stdout")
+
+    stream = None
+    if fmt == "xlsx":
+        writer = XlsxWriter(output)
+    else:
+        stream = sys.stdout if to_stdout else open(output, 'w', encoding='utf-8', newline='')
+        writer = JsonLinesWriter(stream) if fmt == "jsonl" else CsvWriter(stream)
+
+    results = {}
+    try:
+        for index, total, result in iter_check_folder(folder, auto_fix, jobs=jobs, use_cache=use_cache,
+                                                      log=log, rules=rules):
+            for message in result.pop("_log", []):
+                log(message)
+            results[index] = result
+            writer.write(result)
+            if not quiet and (len(results) % 100 == 0 or len(results) == total):
+                log(f"Progress: {len(results)}/{total}")
+        rows = [results[i] for i in sorted(results)]
+        writer.close(rows)
+    finally:
+        if stream is not None and not to_stdout:
+            stream.close()
+
+    if not to_stdout:
+        log(f"Report: {output}")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Headless MIDI Checker: check all MIDI files under a folder (overlaps, zero-length notes, "
+                    "tempo map, pitch range, ...) and optionally fix overlapping notes.",
+        epilog="jsonl/csv rows are written as results arrive; xlsx is written at the end in scan order. "
+               "Exit code: 0 = clean, 1 = issues or errors found, 130 = interrupted.")
+    parser.add_argument("folder", nargs="?", help="Folder to scan recursively for *.mid")
+    parser.add_argument("--fix", action="store_true", help="Auto-fix overlaps (-5 ticks, keeps .bak backups)")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Worker processes (default: CPU count, 1 = no pool)")
+    parser.add_argument("--format", "-f", choices=FORMATS, default="xlsx", help="Report format (default: xlsx)")
+    parser.add_argument("--output", "-o", default=None, help="Report path ('-' = stdout for jsonl/csv). Default: <folder>_check.<format>")
+    parser.add_argument("--no-cache", action="store_true", help="Re-check every file, ignoring <folder>_check.cache.json")
+    parser.add_argument("--rules", "-r", default=None, help="Comma-separated rules to run (default: all, see --list-rules)")
+    parser.add_argument("--list-rules", action="store_true", help="Print the available rules and exit")
+    parser.add_argument("--quiet", "-q", action="store_true", help="No progress lines")
+    args = parser.parse_args(argv)
+
+    if args.list_rules:
+        for name, rule in RULES.items():
+            print(f"{name:20} {rule.description}")
+        return 0
+    if not args.folder:
+        parser.error("folder is required")
+
+    rules = None
+    if args.rules:
+        rules = [r.strip() for r in args.rules.split(",") if r.strip()]
+        unknown = [r for r in rules if r not in RULES]
+        if unknown:
+            parser.error(f"Unknown rule(s): {', '.join(unknown)} (see --list-rules)")
+
+    folder = pathlib.Path(args.folder.strip('"'))
+    if not folder.is_dir():
+        parser.error(f"Not a folder: {folder}")
+    if args.format == "xlsx" and args.output == "-":
+        parser.error("xlsx cannot be written to stdout; use --format jsonl or csv")
+
+    try:
+        rows = run(folder, args.format, args.output, args.fix, args.jobs, not args.no_cache, args.quiet, rules)
+    except KeyboardInterrupt:
+        log("Cancelled.")
+        return 130
+    except BrokenPipeError:
+        # Reader (e.g. head) closed stdout
+        sys.stdout = open(os.devnull, 'w')
+        return 0
+
+    issues = sum(1 for row in rows if has_issue(row))
+    log(f"Done. {len(rows)} files, {issues} with issues or errors.")
+    return 1 if issues else 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
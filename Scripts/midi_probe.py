@@ -0,0 +1,226 @@
+import os
+import sys
+import struct
+
+# Data bytes after a channel status (by high nibble)
+CHANNEL_DATA_LEN = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+META_TEXT = 0x01
+META_LYRICS = 0x05
+META_END_OF_TRACK = 0x2F
+META_TEMPO = 0x51
+META_TIME_SIGNATURE = 0x58
+META_KEY_SIGNATURE = 0x59
+
+DEFAULT_TEMPO_US = 500000 # 120 BPM
+
+
+class MidiProbeError(ValueError):
+    pass
+
+
+def _read_varlen(data, pos, end):
+    value = 0
+    while True:
+        if pos >= end:
+            raise MidiProbeError("Truncated variable-length value")
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
+
+
+def _tick_converter(resolution, tempo_events):
+    """
+    tick -> seconds with pretty_midi's rules: tempo from track 0 only, a tempo at
+    tick 0 replaces the 120 BPM default, repeated tempi are ignored.
+    """
+    scales = [(0, 60.0 / (120.0 * resolution))]
+    for tick, us_per_beat in tempo_events:
+        tick_scale = 60.0 / ((6e7 / us_per_beat) * resolution)
+        if tick == 0:
+            scales = [(0, tick_scale)]
+        elif tick_scale != scales[-1][1]:
+            scales.append((tick, tick_scale))
+
+    # Seconds at the start of each segment (same accumulation as pretty_midi)
+    starts = [0.0]
+    for (tick, scale), (next_tick, _) in zip(scales, scales[1:]):
+        starts.append(starts[-1] + scale * (next_tick - tick))
+
+    def to_seconds(tick):
+        i = len(scales) - 1
+        while scales[i][0] > tick:
+            i -= 1
+        return starts[i] + scales[i][1] * (tick - scales[i][0])
+
+    return scales, to_seconds
+
+
+def probe_midi(file_path, notes=True):
+    """
+    Reads an SMF file's header, meta events and (optionally) note pairing without
+    building pretty_midi objects. Returns a dict:
+      format, n_tracks, resolution, max_tick
+      tempo (first BPM), tempo_changes [(seconds, bpm)] - as pretty_midi.get_tempo_changes
+      time_signature ('4/4' if none), time_signatures [(seconds, numerator, denominator)]
+      n_notes (notes=True, else None)
+      end_time: seconds of the last event as pretty_midi.get_end_time counts it
+                (notes=True); with notes=False the last channel/text event
+                (note-offs included), which is the same for ordinary files.
+    Raises MidiProbeError for files that are not SMF or are malformed
+    (truncated chunks, zero tempo or division).
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+
+    if data[:4] != b'MThd' or len(data) < 14:
+        raise MidiProbeError("Not a standard MIDI file")
+    header_len = struct.unpack('>I', data[4:8])[0]
+    fmt, n_tracks, resolution = struct.unpack('>HHH', data[8:14])
+    if header_len < 6:
+        raise MidiProbeError("Header chunk too short")
+    if resolution == 0:
+        raise MidiProbeError("Division of 0 ticks per beat")
+    pos = 8 + header_len
+
+    tempo_events = [] # (tick, us per beat), track 0
+    ts_events = [] # (tick, numerator, denominator), track 0
+    end_ticks = [] # ticks that pretty_midi's get_end_time considers
+    n_notes = 0
+    max_tick = 0
+    track_idx = 0
+
+    while pos + 8 <= len(data):
+        chunk_type = data[pos:pos + 4]
+        chunk_len = struct.unpack('>I', data[pos + 4:pos + 8])[0]
+        pos += 8
+        chunk_end = min(pos + chunk_len, len(data))
+        if chunk_type != b'MTrk':
+            pos = chunk_end # Unknown chunk
+            continue
+
+        tick = 0
+        status = 0
+        open_notes = {} # (channel, pitch) -> [start ticks]
+        controls = {} # channel -> last control change / pitch bend tick
+        note_channels = set()
+        last_event_tick = 0
+        p = pos
+        while p < chunk_end:
+            delta, p = _read_varlen(data, p, chunk_end)
+            tick += delta
+            if p >= chunk_end:
+                break
+            byte = data[p]
+
+            if byte == 0xFF: # Meta
+                if p + 1 >= chunk_end:
+                    raise MidiProbeError("Truncated meta event")
+                meta_type = data[p + 1]
+                length, p = _read_varlen(data, p + 2, chunk_end)
+                if p + length > chunk_end:
+                    raise MidiProbeError("Truncated meta event")
+                payload = data[p:p + length]
+                p += length
+                if meta_type == META_END_OF_TRACK:
+                    break
+                if track_idx == 0:
+                    if meta_type == META_TEMPO and length >= 3:
+                        us_per_beat = int.from_bytes(payload[:3], 'big')
+                        if us_per_beat == 0:
+                            raise MidiProbeError("Tempo of 0 microseconds per beat")
+                        tempo_events.append((tick, us_per_beat))
+                    elif meta_type == META_TIME_SIGNATURE and length >= 2:
+                        ts_events.append((tick, payload[0], 2 ** payload[1]))
+                        end_ticks.append(tick)
+                    elif meta_type == META_KEY_SIGNATURE:
+                        end_ticks.append(tick)
+                if meta_type in (META_TEXT, META_LYRICS):
+                    end_ticks.append(tick)
+                last_event_tick = tick
+                continue
+            if byte in (0xF0, 0xF7): # SysEx
+                length, p = _read_varlen(data, p + 1, chunk_end)
+                if p + length > chunk_end:
+                    raise MidiProbeError("Truncated SysEx event")
+                p += length
+                continue
+
+            if byte & 0x80:
+                status = byte
+                p += 1
+            elif not status:
+                raise MidiProbeError("Running status without a previous status byte")
+            kind = status & 0xF0
+            n_data = CHANNEL_DATA_LEN.get(kind)
+            if n_data is None: # System common/real-time inside a track: skip
+                continue
+            if p + n_data > chunk_end:
+                raise MidiProbeError("Truncated channel event")
+            last_event_tick = tick
+
+            if notes:
+                channel = status & 0x0F
+                if kind in (0x80, 0x90):
+                    pitch, velocity = data[p], data[p + 1]
+                    key = (channel, pitch)
+                    if kind == 0x90 and velocity > 0:
+                        open_notes.setdefault(key, []).append(tick)
+                    elif key in open_notes:
+                        # Same pairing as pretty_midi: closes notes from earlier ticks,
+                        # keeps a note-on from this tick if something was closed
+                        starts = open_notes[key]
+                        closed = [s for s in starts if s != tick]
+                        kept = [s for s in starts if s == tick]
+                        if closed:
+                            n_notes += len(closed)
+                            note_channels.add(channel)
+                            end_ticks.append(tick)
+                        if closed and kept:
+                            open_notes[key] = kept
+                        else:
+                            del open_notes[key]
+                elif kind in (0xB0, 0xE0):
+                    controls[channel] = tick
+            p += n_data
+
+        if notes:
+            # Control changes/pitch bends only count on channels that have notes
+            end_ticks += [t for ch, t in controls.items() if ch in note_channels]
+        else:
+            end_ticks.append(last_event_tick)
+        max_tick = max(max_tick, tick)
+        track_idx += 1
+        pos = chunk_end
+
+    scales, to_seconds = _tick_converter(resolution, tempo_events)
+    tempo_changes = [(to_seconds(t), 60.0 / (scale * resolution)) for t, scale in scales]
+    end_ticks += [t for t, _ in scales]
+    time_signatures = [(to_seconds(t), num, den) for t, num, den in ts_events]
+
+    return {
+        'format': fmt,
+        'n_tracks': n_tracks,
+        'resolution': resolution,
+        'max_tick': max_tick,
+        'tempo': tempo_changes[0][1],
+        'tempo_changes': tempo_changes,
+        'time_signature': f"{ts_events[0][1]}/{ts_events[0][2]}" if ts_events else "4/4",
+        'time_signatures': time_signatures,
+        'n_notes': n_notes if notes else None,
+        'end_time': to_seconds(max(end_ticks)) if end_ticks else 0.0
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python midi_probe.py file.mid [...]
+    for path in sys.argv[1:]:
+        try:
+            info = probe_midi(path)
+        except (OSError, MidiProbeError) as e:
+            print(f"{path}: Error: {e}")
+            continue
+        print(f"{os.path.basename(path)}: {info['time_signature']} {info['tempo']:.1f} BPM, "
+              f"{info['n_tracks']} tracks, {info['n_notes']} notes, {info['end_time']:.3f}s")
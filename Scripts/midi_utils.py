@@ -5,13 +5,107 @@ import math
 import pandas as pd
 from datetime import datetime
 import hashlib
+from analysis_cache import AnalysisCache
+
+def analyze_file(file_path):
+    """
+    Parses the file and runs MidiAnalyzer/detect_key/detect_groove.
+    Depends only on the file content, so the result is cacheable.
+    Module-level so worker processes (library_indexer) can run it.
+    """
+    # Add EnsembleGenerator to path to find midi_analyzer
+    import sys
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    root_dir = os.path.dirname(script_dir)
+    ensemble_dir = os.path.join(root_dir, "EnsembleGenerator")
+    if ensemble_dir not in sys.path:
+        sys.path.append(ensemble_dir)
+        
+    from midi_analyzer import MidiAnalyzer
+    from utils import detect_key, get_tempo_map # Import utils from EnsembleGenerator
+    
+    # Use simple load first to check validity and get basic notes for preview
+    try:
+        pm = pretty_midi.PrettyMIDI(file_path)
+    except Exception as e:
+        print(f"Error loading MIDI {file_path}: {e}")
+        return None
+
+    # Detailed Analysis
+    analyzer = MidiAnalyzer(pm) # Pass midi_data
+    # Note: analyzer.analyze() returns a LIST of note analysis objects, not a dict.
+    # We need to construct the dict expected by this script manually.
+    note_analysis_list = analyzer.analyze()
+    
+    # Helper: Extract Info
+    key_info = detect_key(pm)
+    root_str = "C"
+    scale_str = "Major"
+    chord_str = "C Major"
+    if key_info:
+         from constants import get_note_name
+         root_str = get_note_name(key_info[0])
+         scale_str = key_info[1]
+         chord_str = f"{root_str} {scale_str}"
+         
+    groove_str = "8-beat"
+    if pm.instruments and not pm.instruments[0].is_drum:
+         groove_str = analyzer.detect_groove(pm.instruments[0])
+         
+    # Style Features (feature vector for LearningManager's nearest-neighbour prediction)
+    style_features = analyzer.extract_style_features()
+    
+    # Calculate duration
+    tempo_map = get_tempo_map(pm)
+    tempo = tempo_map.bpm_at(0)
+    end_time = pm.get_end_time()
+    # Calculate bars roughly (4/4, follows tempo changes)
+    bars = max(1, int(round(tempo_map.seconds_to_beats(end_time) / 4.0)))
+
+    analysis_result = {
+         'groove': groove_str,
+         'instrument': pm.instruments[0].name if pm.instruments else "Piano",
+         'chord': chord_str,
+         'root': root_str,
+         'scale': scale_str,
+         'style': 'Melody', # Default
+         'time_signature': '4/4', # Default or read from changes
+         'duration_bars': bars,
+         'tempo': tempo,
+         'comment_suffix': '',
+         'style_features': style_features
+    }
+    
+    # Notes for UI Piano Roll: the analyzer's note array (NOTE_DTYPE), shared, not copied
+    notes_data = analyzer.notes
+    max_velocity = int(notes_data['velocity'].max()) if len(notes_data) else 0
+
+    return {
+        'time_signature': analysis_result['time_signature'],
+        'duration_bars': analysis_result['duration_bars'],
+        'max_velocity': max_velocity,
+        'notes': notes_data,
+        'tempo': analysis_result['tempo'],
+        'analysis_result': analysis_result
+    }
+
 
 class MidiHandler:
-    def __init__(self, library_path):
+    def __init__(self, library_path, store=None, analysis_cache=None):
         self.library_path = library_path
+        self.store = store # Learning data backend (None = learning_data.xlsx)
+        self.analysis_cache = analysis_cache or AnalysisCache()
+        self._learning_manager = None
         if not os.path.exists(self.library_path):
             os.makedirs(self.library_path)
 
+    def _get_learning_manager(self):
+        # Process-wide instance; save_learning_data keeps it current
+        if self._learning_manager is None:
+            from learning_manager import get_learning_manager
+            self._learning_manager = get_learning_manager(store=self.store)
+        return self._learning_manager
+
     def load_midi(self, file_path):
         """Loads a MIDI file using pretty_midi."""
         try:
@@ -24,83 +118,15 @@ class MidiHandler:
     def analyze_midi(self, file_path):
         """
         Analyzes a MIDI file to extract metadata for the preview and database using MidiAnalyzer.
+        The file analysis is cached (see analysis_cache.py); learning overrides and
+        category guessing are applied on top on every call.
         """
-        # Add EnsembleGenerator to path to find midi_analyzer
-        import sys
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        root_dir = os.path.dirname(script_dir)
-        ensemble_dir = os.path.join(root_dir, "EnsembleGenerator")
-        if ensemble_dir not in sys.path:
-            sys.path.append(ensemble_dir)
-            
-        from midi_analyzer import MidiAnalyzer
-        from midi_analyzer import MidiAnalyzer
-        from utils import detect_key, get_tempo_at_time # Import utils from EnsembleGenerator
-        
-        # Use simple load first to check validity and get basic notes for preview
-        pm = self.load_midi(file_path)
-        if not pm:
+        base = self.analysis_cache.get_or_compute(file_path, self._analyze_base)
+        if not base:
             return None
-
-        # Detailed Analysis
-        analyzer = MidiAnalyzer(pm) # Pass midi_data
-        # Note: analyzer.analyze() returns a LIST of note analysis objects, not a dict.
-        # We need to construct the dict expected by this script manually.
-        note_analysis_list = analyzer.analyze()
-        
-        # Helper: Extract Info
-        key_info = detect_key(pm)
-        root_str = "C"
-        scale_str = "Major"
-        chord_str = "C Major"
-        if key_info:
-             from constants import get_note_name
-             root_str = get_note_name(key_info[0])
-             scale_str = key_info[1]
-             chord_str = f"{root_str} {scale_str}"
-             
-        groove_str = "8-beat"
-        if pm.instruments and not pm.instruments[0].is_drum:
-             groove_str = analyzer.detect_groove(pm.instruments[0])
-             
-        # Style Features (Approximation for Learning)
-        # We need to extract features from the note list if possible, or dummy it.
-        style_features = {} 
         
-        # Calculate duration
-        tempo = get_tempo_at_time(pm, 0)
-        end_time = pm.get_end_time()
-        beat_cursor = 0.0
-        # Calculate bars roughly
-        bars = max(1, int(round(end_time / (60.0 / tempo) / 4.0)))
-
-        analysis_result = {
-             'groove': groove_str,
-             'instrument': pm.instruments[0].name if pm.instruments else "Piano",
-             'chord': chord_str,
-             'root': root_str,
-             'scale': scale_str,
-             'style': 'Melody', # Default
-             'time_signature': '4/4', # Default or read from changes
-             'duration_bars': bars,
-             'tempo': tempo,
-             'comment_suffix': '',
-             'style_features': style_features
-        }
-        
-        # Prepare notes for UI Piano Roll
-        notes_data = []
-        max_velocity = 0
-        for instrument in pm.instruments:
-            for note in instrument.notes:
-                notes_data.append({
-                    'pitch': note.pitch,
-                    'start': note.start,
-                    'end': note.end,
-                    'velocity': note.velocity
-                })
-                if note.velocity > max_velocity:
-                    max_velocity = note.velocity
+        analysis_result = base['analysis_result']
+        notes_data = base['notes']
 
         # Construct result dictionary matching expectation + new metadata
         # infer_metadata is now populated by analysis_result
@@ -121,16 +147,13 @@ class MidiHandler:
             "DurationBars": analysis_result.get('duration_bars', 4),
             "CommentSuffix": analysis_result.get('comment_suffix', ''),
             
-            # Internal fields for Learning
-            "_raw_ai_result": analysis_result
+            # Internal fields for Learning (copy: the cached result must stay untouched)
+            "_raw_ai_result": dict(analysis_result)
         }
         
-        # --- Data-Driven Refinement ---
         # --- Data-Driven Refinement ---
         try:
-             from learning_manager import LearningManager
-             # Default path handling inside manager now
-             lm = LearningManager()
+             lm = self._get_learning_manager()
              
              # Extract features to pass
              features = analysis_result.get('style_features', {})
@@ -145,7 +168,7 @@ class MidiHandler:
              print(f"Prediction Error: {e}")
 
         # Basic Category Guessing
-        avg_pitch = sum(n['pitch'] for n in notes_data) / len(notes_data) if notes_data else 60
+        avg_pitch = float(notes_data['pitch'].mean()) if len(notes_data) else 60
         if avg_pitch < 48:
             inferred_meta["Category"] = "Bass"
         elif analysis_result.get('chord'): # Strong chord indication
@@ -156,12 +179,16 @@ class MidiHandler:
         return {
             'time_signature': analysis_result['time_signature'],
             'duration_bars': analysis_result['duration_bars'],
-            'max_velocity': max_velocity,
+            'max_velocity': base['max_velocity'],
             'notes': notes_data,
             'tempo': analysis_result['tempo'],
             'inferred_meta': inferred_meta
         }
 
+    def _analyze_base(self, file_path):
+        """Cached part of analyze_midi (see analyze_file)."""
+        return analyze_file(file_path)
+
     def copy_to_library(self, src_path, target_filename=None):
         """
         Copies the file to the MIDI_Library/[Hostname]/ folder. 
@@ -211,10 +238,7 @@ class MidiHandler:
         if not raw_ai: return 
 
         try:
-             from learning_manager import LearningManager
-             # We can instantiate it fresh, or share singleton? 
-             # Fresh is safer for file locks/updates.
-             lm = LearningManager()
+             lm = self._get_learning_manager()
              lm.save_learning_data(src_path, updated_meta, raw_ai)
              
         except Exception as e:
@@ -1,27 +1,178 @@
-from PySide6.QtWidgets import QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView
-from PySide6.QtCore import Qt, Signal, QMimeData, QUrl
+from PySide6.QtWidgets import QTableView, QAbstractItemView, QHeaderView
+from PySide6.QtCore import Qt, Signal, QMimeData, QUrl, QAbstractTableModel, QModelIndex
 from PySide6.QtGui import QDrag
+import numpy as np
 import os
 
-class FileListWidget(QTableWidget):
+# (Header, source columns in the library frame - first one present wins)
+LIST_COLUMNS = [
+    ("FileName", ("FileName",)),
+    ("Key", ("Root",)),
+    ("Category", ("Category",)),
+    ("Inst", ("Instruments",)),
+    ("Beat", ("TimeSignature",)),
+    ("BAR", ("BAR", "Bar")),
+    ("Chord", ("Chord",)),
+    ("Group", ("Group",)),
+]
+
+class LibraryTableModel(QAbstractTableModel):
+    """
+    Table model over the library frame's column arrays.
+
+    The frame is never copied or iterated: each column is kept as a numpy array and
+    the visible rows are a row-id array into it (set_rows). Cell text is formatted
+    only when the view asks for it, so only rows on screen cost anything.
+    Sorting is done here on the row-id array (argsort over the column text) instead
+    of a proxy comparing cells one by one.
+    """
+    cellEdited = Signal(int, int, str) # Row, Column, Text
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._columns = [np.empty(0, dtype=object) for _ in LIST_COLUMNS]
+        self._paths = np.empty(0, dtype=object)
+        self._base_dir = ""
+        self._rows = np.empty(0, dtype=np.int64)
+        self._text_cache = {} # column -> np.ndarray of str over all rows (for sorting)
+        self._edits = {} # (row_id, column) -> text typed into the list
+        self._abs_paths = {} # row_id -> absolute path
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+
+    def set_library(self, df, base_dir=""):
+        """Points the model at df's columns (no per-row work). Shows no rows until set_rows."""
+        self.beginResetModel()
+        n = len(df)
+        self._columns = []
+        for _, sources in LIST_COLUMNS:
+            col = next((c for c in sources if c in df.columns), None)
+            self._columns.append(df[col].to_numpy(dtype=object) if col else np.full(n, "", dtype=object))
+        self._paths = df['FilePath'].to_numpy(dtype=object) if 'FilePath' in df.columns else np.full(n, "", dtype=object)
+        self._base_dir = base_dir or ""
+        self._rows = np.empty(0, dtype=np.int64)
+        self._text_cache = {}
+        self._edits = {}
+        self._abs_paths = {}
+        self.endResetModel()
+
+    def set_rows(self, row_ids=None):
+        """Shows the given row positions of the library frame (None = all rows)."""
+        if row_ids is None:
+            row_ids = np.arange(len(self._paths))
+        self.beginResetModel()
+        self._rows = np.asarray(row_ids, dtype=np.int64)
+        if self._sort_column >= 0:
+            self._rows = self._sorted(self._rows, self._sort_column, self._sort_order)
+        self.endResetModel()
+
+    def row_id(self, row):
+        return int(self._rows[row])
+
+    def cell_text(self, row_id, column):
+        edited = self._edits.get((row_id, column))
+        if edited is not None:
+            return edited
+        return str(self._columns[column][row_id])
+
+    def file_path(self, row):
+        """Absolute path of the file shown in view row `row`."""
+        row_id = self.row_id(row)
+        path = self._abs_paths.get(row_id)
+        if path is None:
+            # Library stores paths relative to the app folder
+            p = self._paths[row_id]
+            if not isinstance(p, str) or not p:
+                path = ""
+            elif not os.path.isabs(p):
+                path = os.path.abspath(os.path.join(self._base_dir, p))
+            else:
+                path = p
+            self._abs_paths[row_id] = path
+        return path
+
+    # --- QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(LIST_COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return LIST_COLUMNS[section][0]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.cell_text(self.row_id(index.row()), index.column())
+        if role == Qt.UserRole:
+            return self.file_path(index.row())
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable | Qt.ItemIsDragEnabled
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        text = str(value)
+        col = index.column()
+
+        # Auto-Correction Logic
+        if col == 1: # Key
+            text = text.capitalize() # c# -> C#
+
+        row_id = self.row_id(index.row())
+        self._edits[(row_id, col)] = text
+        self._text_cache.pop(col, None)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        self.cellEdited.emit(index.row(), col, text)
+        return True
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        if len(self._rows) == 0:
+            return
+        self.layoutAboutToBeChanged.emit()
+        self._rows = self._sorted(self._rows, column, order)
+        self.layoutChanged.emit()
+
+    def _sorted(self, rows, column, order):
+        if column < 0 or len(rows) == 0:
+            return rows
+        texts = self._text_cache.get(column)
+        if texts is None:
+            # Same ordering as the old item-based list: plain text comparison
+            texts = np.array([self.cell_text(r, column) for r in range(len(self._paths))], dtype=str)
+            self._text_cache[column] = texts
+        order_idx = np.argsort(texts[rows], kind='stable')
+        if order == Qt.DescendingOrder:
+            order_idx = order_idx[::-1]
+        return rows[order_idx]
+
+
+class FileListWidget(QTableView):
     fileSelected = Signal(str) # Path
     fileRenamed = Signal(str, str) # OldPath, NewName (FileName cell text)
 
     def __init__(self):
         super().__init__()
-        self.setColumnCount(8)
-        self.setHorizontalHeaderLabels([
-            "FileName", "Key", "Category", 
-            "Inst", "Beat", "BAR", 
-            "Chord", "Group"
-        ])
-        
+        self.list_model = LibraryTableModel(self)
+        self.setModel(self.list_model)
+
         header = self.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.Interactive) 
-        header.setStretchLastSection(False) 
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setStretchLastSection(False)
         self.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
-        
-        # Set Min Widths 
+
+        # Set Min Widths
         self.setColumnWidth(0, 200) # FileName
         self.setColumnWidth(1, 40)  # Key
         self.setColumnWidth(2, 60)  # Category
@@ -30,113 +181,49 @@ class FileListWidget(QTableWidget):
         self.setColumnWidth(5, 30)  # BAR
         self.setColumnWidth(6, 60)  # Chord
         self.setColumnWidth(7, 80)  # Group
-        
+
         self.horizontalHeader().setMinimumSectionSize(30)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        
+        # Fixed row height: the view never measures rows it does not draw
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+
         self.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.setSelectionMode(QAbstractItemView.SingleSelection)
         self.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed) # Allow edit
         self.setSortingEnabled(True)
         self.setDragEnabled(True)
-        
-        self.itemSelectionChanged.connect(self.on_selection_changed)
-        self.itemChanged.connect(self.on_item_changed)
-        
-        self.is_populating = False
-        self.is_updating = False
-
-    def populate(self, df):
-        self.is_populating = True
-        self.setSortingEnabled(False)
-        self.setRowCount(0)
-        self.setRowCount(len(df))
-        
-        # Columns: FileName, Key, Category, Inst, Beat, BAR, Chord, Group
-        
-        for row_idx, (_, row_data) in enumerate(df.iterrows()):
-            # 0. FileName
-            file_name = str(row_data.get('FileName', ''))
-            item0 = QTableWidgetItem(file_name)
-            item0.setData(Qt.UserRole, row_data.get('FilePath', ''))
-            self.setItem(row_idx, 0, item0)
-            
-            # 1. Key (Root)
-            item1 = QTableWidgetItem(str(row_data.get('Root', '')))
-            self.setItem(row_idx, 1, item1)
-
-            # 2. Category
-            item2 = QTableWidgetItem(str(row_data.get('Category', '')))
-            self.setItem(row_idx, 2, item2)
-            
-            # 3. Inst (Instruments)
-            item3 = QTableWidgetItem(str(row_data.get('Instruments', '')))
-            self.setItem(row_idx, 3, item3)
-            
-            # 4. Beat (TimeSignature)
-            item4 = QTableWidgetItem(str(row_data.get('TimeSignature', '')))
-            self.setItem(row_idx, 4, item4)
-            
-            # 5. BAR
-            # Try BAR, then Bar
-            val = row_data.get('BAR', row_data.get('Bar', ''))
-            item5 = QTableWidgetItem(str(val)) 
-            self.setItem(row_idx, 5, item5)
-            
-            # 6. Chord
-            item6 = QTableWidgetItem(str(row_data.get('Chord', '')))
-            self.setItem(row_idx, 6, item6)
-            
-            # 7. Group
-            item7 = QTableWidgetItem(str(row_data.get('Group', '')))
-            item7.setFlags(item7.flags() | Qt.ItemIsEditable) 
-            self.setItem(row_idx, 7, item7)
-            
-        self.setSortingEnabled(True)
-        self.is_populating = False
-        
+
+        self.selectionModel().selectionChanged.connect(self.on_selection_changed)
+        self.list_model.cellEdited.connect(self.on_cell_edited)
+
+    def set_library(self, df, base_dir=""):
+        """Binds the list to the library frame (call again after the frame changes)."""
+        self.list_model.set_library(df, base_dir)
+
+    def set_rows(self, row_ids=None):
+        """Shows the given library row positions (None = all)."""
+        self.list_model.set_rows(row_ids)
+
         # Prevent Column 0 collapse
         if self.columnWidth(0) < 50:
             self.setColumnWidth(0, 200)
 
-    def on_selection_changed(self):
-        items = self.selectedItems()
-        if items:
-            row = self.currentRow()
-            first_item = self.item(row, 0)
-            if first_item:
-                path = first_item.data(Qt.UserRole)
-                if path:
-                    self.fileSelected.emit(path)
-
-    def on_item_changed(self, item):
-        if self.is_populating or self.is_updating: return
-        
-        row = item.row()
-        col = item.column()
-        text = item.text()
-        
-        # Auto-Correction Logic
-        corrected_text = text
-        if col == 1: # Key
-            corrected_text = text.capitalize() # c# -> C#
-        elif col == 6: # Chord
-             # Simplistic: "major" -> "Major", "minor" -> "minor" (wait convention?)
-             # User said "Uppercase". 
-             # Let's just Capitalize first letter for visual consistency?
-             # Or keep user input if complex?
-             # For Key, definitely C, D, etc.
-             pass
-        
-        if corrected_text != text:
-             self.is_updating = True
-             item.setText(corrected_text)
-             self.is_updating = False
-             text = corrected_text # Use corrected for emit
+    def current_path(self):
+        index = self.currentIndex()
+        if not index.isValid():
+            return ""
+        return self.list_model.file_path(index.row())
+
+    def on_selection_changed(self, selected, deselected):
+        if self.selectionModel().hasSelection():
+            path = self.current_path()
+            if path:
+                self.fileSelected.emit(path)
 
+    def on_cell_edited(self, row, col, text):
         # If FileName column changed
         if col == 0:
-            old_path = item.data(Qt.UserRole)
+            old_path = self.list_model.file_path(row)
             if old_path:
                 self.fileRenamed.emit(old_path, text)
         else:
@@ -144,17 +231,13 @@ class FileListWidget(QTableWidget):
             pass
 
     def startDrag(self, supportedActions):
-        row = self.currentRow()
-        if row < 0: return
-        
-        first_item = self.item(row, 0)
-        path = first_item.data(Qt.UserRole)
+        path = self.current_path()
         if not path: return
-        
+
         mime = QMimeData()
         url = QUrl.fromLocalFile(path)
         mime.setUrls([url])
-        
+
         drag = QDrag(self)
         drag.setMimeData(mime)
         drag.exec(supportedActions)
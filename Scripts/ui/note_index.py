@@ -0,0 +1,75 @@
+import numpy as np
+
+
+class NoteIndex:
+    """
+    Per-pitch interval index over piano roll notes: a NOTE_DTYPE array
+    (EnsembleGenerator/note_array.py) or a list of dicts with pitch/start/end.
+
+    For every pitch the notes are kept sorted by start, together with the longest
+    note duration of that pitch. A note overlapping [t0, t1] must then start in
+    [t0 - max_duration, t1], which is one binary search per pitch; only the few
+    candidates in that slice are checked against their end time.
+    """
+    def __init__(self, notes):
+        n = len(notes)
+        self.n_notes = n
+        if isinstance(notes, np.ndarray):
+            pitch = notes['pitch'].astype(np.int64)
+            start = notes['start'].astype(float)
+            end = notes['end'].astype(float)
+        else:
+            pitch = np.fromiter((note['pitch'] for note in notes), dtype=np.int64, count=n)
+            start = np.fromiter((note['start'] for note in notes), dtype=float, count=n)
+            end = np.fromiter((note['end'] for note in notes), dtype=float, count=n)
+
+        # Sorted by (pitch, start); pitch p occupies [bounds[p], bounds[p + 1])
+        order = np.lexsort((start, pitch))
+        self._order = order
+        self._pitch = pitch[order]
+        self._start = start[order]
+        self._end = end[order]
+        self._bounds = np.searchsorted(self._pitch, np.arange(129))
+
+        duration = self._end - self._start
+        self._max_duration = np.zeros(128)
+        for p in np.unique(self._pitch):
+            if 0 <= p < 128:
+                lo, hi = self._bounds[p], self._bounds[p + 1]
+                self._max_duration[p] = duration[lo:hi].max()
+
+    def __len__(self):
+        return self.n_notes
+
+    def _slice(self, pitch, t0, t1):
+        # Positions (in sorted order) of notes of `pitch` overlapping [t0, t1]
+        lo, hi = self._bounds[pitch], self._bounds[pitch + 1]
+        if lo == hi:
+            return np.empty(0, dtype=np.int64)
+        starts = self._start[lo:hi]
+        first = np.searchsorted(starts, t0 - self._max_duration[pitch], side='left')
+        last = np.searchsorted(starts, t1, side='right')
+        pos = np.arange(lo + first, lo + last)
+        return pos[self._end[pos] >= t0]
+
+    def visible(self, t0, t1, min_pitch=0, max_pitch=127):
+        """
+        Indices into the original note list of notes overlapping [t0, t1] within
+        the pitch range, in original order (so overlapping notes stack as before).
+        """
+        min_pitch = max(0, int(min_pitch))
+        max_pitch = min(127, int(max_pitch))
+        parts = [self._slice(p, t0, t1) for p in range(min_pitch, max_pitch + 1)
+                 if self._bounds[p] != self._bounds[p + 1]]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(self._order[np.concatenate(parts)])
+
+    def note_at(self, t, pitch):
+        """Index of the note of `pitch` sounding at time t (latest start wins), or None."""
+        if not 0 <= pitch < 128:
+            return None
+        pos = self._slice(pitch, t, t)
+        if len(pos) == 0:
+            return None
+        return int(self._order[pos[-1]])
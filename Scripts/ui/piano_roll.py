@@ -1,7 +1,11 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QScrollArea, QPushButton, QHBoxLayout, QLabel, QFrame
-from PySide6.QtGui import QPainter, QColor, QPen, QBrush, QDrag, QFont
-from PySide6.QtCore import Qt, Signal, QMimeData, QSize, QUrl, QPoint
+from PySide6.QtGui import QPainter, QColor, QPen, QBrush, QDrag, QFont, QPixmap
+from PySide6.QtCore import Qt, Signal, QMimeData, QSize, QUrl, QPoint, QRect
 import os
+import numpy as np
+from ui.note_index import NoteIndex
+
+NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
 
 class PianoRollCanvas(QWidget):
     hoverChanged = Signal(str) # New Signal
@@ -12,6 +16,8 @@ class PianoRollCanvas(QWidget):
         self.setMouseTracking(True) # For overlay
         
         self.notes = []
+        self.note_index = NoteIndex([]) # Built once per note list (set_data)
+        self.hover_note = None # Index into self.notes under the cursor
         self.view_page_start = 0.0 
         self.view_duration = 0.0
         self.tempo = 120.0
@@ -29,7 +35,16 @@ class PianoRollCanvas(QWidget):
         
         # Mouse Info
         self.mouse_pos = None
-        self.overlay_info = ""
+
+        # Pre-rendered grid + notes (the "scene") for the visible strip of the canvas
+        # plus a margin above and below. Repaints (hover, scroll within the margin)
+        # only blit it and draw the crosshair on top; the canvas is 128 keys tall,
+        # so caching all of it would cost hundreds of MB at high zoom.
+        self._scene_layer = None
+        self._layer_rect = QRect() # Canvas area the scene layer covers
+        self._layer_key = None # (w, key_height, ts_num, dpr) the layer was drawn for
+        self._scene_dirty = True
+        self._note_colors = None # pitch class -> QColor (from ConfigManager)
 
         # Sizing
         self.setMinimumWidth(600)
@@ -37,8 +52,21 @@ class PianoRollCanvas(QWidget):
 
     def update_height(self):
         self.setMinimumHeight(128 * self.key_height)
+        self.invalidate_layers()
+
+    def invalidate_layers(self):
+        """Redraw the cached scene layer on next paint (it is also re-keyed on size/zoom)."""
+        self._scene_dirty = True
+        self.update()
+
+    def invalidate_colors(self):
+        """Note colors changed in ConfigManager."""
+        self._note_colors = None
+        self.invalidate_layers()
 
     def set_data(self, notes, tempo, ts_num, page_start_beat):
+        if notes is not self.notes or len(self.note_index) != len(notes):
+            self.note_index = NoteIndex(notes)
         self.notes = notes
         self.tempo = tempo
         self.time_signature_num = ts_num
@@ -49,9 +77,10 @@ class PianoRollCanvas(QWidget):
         self.view_page_start = page_start_beat * seconds_per_beat
         self.view_duration = 2 * beats_per_bar * seconds_per_beat
         
-        self.update()
+        self.invalidate_layers()
 
     def mouseMoveEvent(self, event):
+        old_pos = self.mouse_pos
         self.mouse_pos = event.pos()
         
         # Calc Time
@@ -70,62 +99,69 @@ class PianoRollCanvas(QWidget):
             beat_in_bar = int(total_beats % self.time_signature_num) + 1
             
             info_text = f"Bar {bar} : Beat {beat_in_bar}"
+
+            # Note under the cursor (binary search in the note index)
+            self.hover_note = self.note_at(event.pos())
+            if self.hover_note is not None:
+                note = self.notes[self.hover_note]
+                info_text += f" | {self.note_name(int(note['pitch']))} (vel {int(note['velocity'])})"
         
         self.hoverChanged.emit(info_text)
-        self.update()
+        self._update_crosshair(old_pos)
 
     def leaveEvent(self, event):
+        old_pos = self.mouse_pos
         self.mouse_pos = None
+        self.hover_note = None
         self.hoverChanged.emit("")
-        self.update()
+        self._update_crosshair(old_pos)
 
-    def update_overlay_info(self):
-        if not self.mouse_pos: return
-        
-        # Y -> Pitch
-        y = self.mouse_pos.y()
+    def _crosshair_rects(self, pos):
+        # Thin strips covering the crosshair lines at pos
+        return [QRect(0, pos.y() - 1, self.width(), 3), QRect(pos.x() - 1, 0, 3, self.height())]
+
+    def _update_crosshair(self, old_pos):
+        # Repaint only where the old and new crosshair lines are
+        for pos in (old_pos, self.mouse_pos):
+            if pos is not None:
+                for rect in self._crosshair_rects(pos):
+                    self.update(rect)
+
+    def pitch_at(self, y):
         # Pitch 127 is 0.
-        pitch = 127 - int(y / self.key_height)
-        if pitch < 0: pitch = 0
-        if pitch > 127: pitch = 127
-        
-        note_names = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
-        note_name = f"{note_names[pitch % 12]}{pitch // 12 - 1}"
-        
-        # X -> Time
-        x = self.mouse_pos.x()
-        w = self.width()
-        if w == 0: return
-        
-        if self.view_duration > 0:
-            rel_t = (x / w) * self.view_duration
-            abs_t = self.view_page_start + rel_t
-            
-            seconds_per_beat = 60.0 / self.tempo
-            total_beats = abs_t / seconds_per_beat
-            
-            bar = int(total_beats / self.time_signature_num) + 1
-            remainder = total_beats % self.time_signature_num
-            beat = int(remainder) + 1
-            tick = int((remainder - int(remainder)) * 100) # Simple decimal tick
-            
-            self.overlay_info = f"{note_name} | {bar}:{beat}:{tick}"
-        else:
-            self.overlay_info = note_name
+        return max(0, min(127, 127 - int(y / self.key_height)))
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.fillRect(self.rect(), self.bg_color)
-        
+    def time_at(self, x):
         w = self.width()
-        h = self.height()
-        
-        # --- Time Mapping ---
-        def time_to_x(t):
-            if self.view_duration <= 0: return 0
-            rel_t = t - self.view_page_start
-            return (rel_t / self.view_duration) * w
-
+        if w <= 0 or self.view_duration <= 0:
+            return None
+        return self.view_page_start + (x / w) * self.view_duration
+
+    def note_at(self, pos):
+        """Index into self.notes of the note under pos, or None."""
+        t = self.time_at(pos.x())
+        if t is None:
+            return None
+        return self.note_index.note_at(t, self.pitch_at(pos.y()))
+
+    @staticmethod
+    def note_name(pitch):
+        return f"{NOTE_NAMES[pitch % 12]}{pitch // 12 - 1}"
+
+    def _layer_pixmap(self, w, h, dpr):
+        pixmap = QPixmap(int(w * dpr), int(h * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        return pixmap
+
+    def _layer_area(self, rect):
+        # Full-width band around rect, extended by half a viewport above and below
+        visible = self.visibleRegion().boundingRect().united(rect)
+        margin = visible.height() // 2
+        top = max(0, visible.top() - margin)
+        bottom = min(self.height(), visible.bottom() + 1 + margin)
+        return QRect(0, top, self.width(), max(1, bottom - top))
+
+    def _draw_grid(self, painter, w, h):
         # --- Draw Horiz Grid (Pitches) ---
         # Draw Octave Lines
         font = QFont() # Default font
@@ -175,17 +211,38 @@ class PianoRollCanvas(QWidget):
                 
             painter.drawLine(bx, 0, bx, h)
 
+    def _render_scene(self, area, dpr):
+        w = area.width()
+        pixmap = self._layer_pixmap(w, area.height(), dpr)
+        pixmap.fill(self.bg_color)
+        painter = QPainter(pixmap)
+        # Draw in canvas coordinates; everything outside the area is clipped
+        painter.translate(0, -area.top())
+        self._draw_grid(painter, w, self.height())
+
+        if self._note_colors is None:
+            self._note_colors = [QColor(self.config.get_note_color(pc)) for pc in range(12)]
+        note_colors = self._note_colors
+
+        # --- Time Mapping ---
+        def time_to_x(t):
+            if self.view_duration <= 0: return 0
+            rel_t = t - self.view_page_start
+            return (rel_t / self.view_duration) * w
+
         # --- Draw Notes ---
-        if self.notes:
-            for note in self.notes:
-                start = note['start']
-                end = note['end']
-                
-                if end < self.view_page_start: continue
-                if start > (self.view_page_start + self.view_duration): continue
+        # Only notes inside the page (interval index instead of a full scan)
+        page_end = self.view_page_start + self.view_duration
+        if len(self.notes):
+            for i in self.note_index.visible(self.view_page_start, page_end):
+                note = self.notes[i]
+                start = float(note['start'])
+                end = float(note['end'])
                 
-                pitch = note['pitch']
+                pitch = int(note['pitch'])
                 y = (127 - pitch) * self.key_height
+                if y + self.key_height < area.top() or y > area.bottom():
+                    continue
                 
                 x1 = time_to_x(start)
                 x2 = time_to_x(end)
@@ -197,11 +254,10 @@ class PianoRollCanvas(QWidget):
                 if (x1 + rect_w) > w: 
                     rect_w = w - x1
 
-                vel = note['velocity']
+                vel = int(note['velocity'])
                 
-                # Color from Config
-                pitch_class = pitch % 12
-                base_color = self.config.get_note_color(pitch_class)
+                # Color from Config (cached per pitch class)
+                base_color = note_colors[pitch % 12]
                 
                 # Alpha formula
                 alpha = int((vel / 127.0) ** 3 * 255)
@@ -218,6 +274,34 @@ class PianoRollCanvas(QWidget):
                     painter.setPen(QPen(border_col, 1))
                     painter.drawRect(x1, y, rect_w, self.key_height)
 
+        painter.end()
+        return pixmap
+
+    def paintEvent(self, event):
+        w = self.width()
+        h = self.height()
+        dpr = self.devicePixelRatioF()
+
+        rect = event.rect()
+
+        # Rebuild the cached layer after data/zoom/size/color changes,
+        # or when scrolling exposes canvas outside the cached band
+        layer_key = (w, self.key_height, self.time_signature_num, dpr)
+        if (self._scene_dirty or self._scene_layer is None or self._layer_key != layer_key
+                or not self._layer_rect.contains(rect)):
+            self._scene_layer = None # Release the old layer before allocating the new one
+            self._layer_rect = self._layer_area(rect)
+            self._scene_layer = self._render_scene(self._layer_rect, dpr)
+            self._layer_key = layer_key
+            self._scene_dirty = False
+
+        painter = QPainter(self)
+        # Blit only the exposed part (crosshair moves expose thin strips)
+        src_y = rect.y() - self._layer_rect.y()
+        painter.drawPixmap(rect, self._scene_layer,
+                           QRect(int(rect.x() * dpr), int(src_y * dpr),
+                                 int(rect.width() * dpr), int(rect.height() * dpr)))
+
         # --- Overlay Crosshair ---
         if self.mouse_pos:
             # painter.setPen(QPen(Qt.white, 1)) # Removed text drawing
@@ -448,7 +532,7 @@ class PianoRollWidget(QWidget):
         new_scroll_val = int(new_dist_from_top - (viewport_h / 2))
         
         scroll_bar.setValue(new_scroll_val)
-        self.canvas.update()
+        self.canvas.invalidate_layers()
 
     def auto_scroll_focus(self):
         # Default C3=48. 
@@ -459,10 +543,9 @@ class PianoRollWidget(QWidget):
         
         target_pitch = 60 # C4 (Middle C)
         
-        if self.notes:
-            pitches = [n['pitch'] for n in self.notes]
-            if pitches:
-                target_pitch = sum(pitches) / len(pitches)
+        if len(self.notes):
+            # NOTE_DTYPE array from MidiHandler.analyze_midi
+            target_pitch = float(np.mean(self.notes['pitch']))
         
         view_h = self.scroll.height()
         
@@ -486,4 +569,4 @@ class PianoRollWidget(QWidget):
                 break
     
     def refresh_colors(self):
-        self.canvas.update()
+        self.canvas.invalidate_colors()
@@ -22,6 +22,7 @@ FILTER_ROW_SPACING = 2
 
 # Search Bar
 SEARCH_PLACEHOLDER = "Search..."
+SEARCH_DEBOUNCE_MS = 150 # Wait this long after the last keystroke before searching
 
 # Master Lists
 CHORD_LIST = [